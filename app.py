@@ -1,10 +1,14 @@
 from flask import Flask, render_template, redirect, url_for, request, flash, jsonify
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from models import db, User, ParametresGlobaux
+from core.sqlite_profil import appliquer_profil
+from core.compression import installer_compression
+from core.json_rapide import FournisseurJSON
 import secrets 
 import os
 import webbrowser
 from threading import Timer
+import click
 
 app = Flask(__name__)
 
@@ -14,14 +18,27 @@ if not os.path.exists("database"):
 
 
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
-DB_PATH = os.path.join(BASE_DIR, "database", "cave.db")
+# Base utilisée : CAVE_BASE si défini (base synthétique de benchmarks/donnees.py...)
+DB_PATH = os.environ.get('CAVE_BASE') or os.path.join(BASE_DIR, "database", "cave.db")
 
 app.config['SECRET_KEY'] = secrets.token_hex(32)
 app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{DB_PATH}"
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Profil SQLite (WAL, cache, mmap, busy_timeout...) : surcharge des valeurs de core/sqlite_profil.py
+app.config['SQLITE_PROFIL'] = {}
+# Durée maximale (secondes) des statistiques du tableau de bord en cache
+app.config['TABLEAU_BORD_TTL'] = 60
+# Compression gzip des réponses (niveau 1-9, taille minimale en octets)
+app.config['COMPRESSION_NIVEAU'] = 6
+app.config['COMPRESSION_TAILLE_MIN'] = 1024
 
 # Initialisation
+# Encodage JSON : orjson s'il est installé, module json sinon (core/json_rapide.py)
+app.json = FournisseurJSON(app)
 db.init_app(app)
+with app.app_context():
+    appliquer_profil(db.engine, app.config['SQLITE_PROFIL'])
+installer_compression(app)
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
@@ -35,6 +52,21 @@ def load_user(user_id):
 def init_database():
     with app.app_context():
         db.create_all()
+
+        # Index ajoutés après la création de la base
+        from core.index import creer_index_manquants
+        for nom in creer_index_manquants():
+            print(f"✓ Index créé: {nom}")
+
+        # Index de recherche plein texte (abonnés, produits)
+        from core.recherche import installer_index_recherche
+        with db.engine.begin() as conn:
+            installer_index_recherche(conn)
+
+        # Compteurs de version des tables (ETag), tenus par triggers
+        from core.versions import installer_compteurs
+        with db.engine.begin() as conn:
+            installer_compteurs(conn)
         
         # Créer utilisateur admin par défaut si aucun utilisateur n'existe
         if User.query.count() == 0:
@@ -71,6 +103,86 @@ def init_database():
             print("✓ Base de données initialisée")
             print("✓ Utilisateur admin créé (admin/admin123)")
 
+        # Soldes abonnés absents (bases antérieures)
+        from core.soldes import initialiser_soldes_manquants
+        if initialiser_soldes_manquants():
+            db.session.commit()
+
+        # Cumul journalier des ventes absent (bases antérieures)
+        from core.ventes_journalieres import initialiser_ventes_manquantes
+        if initialiser_ventes_manquantes():
+            db.session.commit()
+
+# Commandes d'administration (flask --app app <commande>)
+@app.cli.command('reconstruire-soldes')
+def reconstruire_soldes_command():
+    """Recalcule entièrement les soldes des abonnés"""
+    from core.soldes import reconstruire_soldes
+    db.create_all()
+    n = reconstruire_soldes()
+    db.session.commit()
+    print(f"✓ {n} solde(s) abonné(s) reconstruit(s)")
+
+@app.cli.command('reconstruire-ventes')
+@click.option('--depuis', default=None, help="Premier jour (AAAA-MM-JJ), tout l'historique par défaut")
+@click.option('--jusqu-au', 'jusqu_au', default=None, help="Dernier jour inclus (AAAA-MM-JJ)")
+def reconstruire_ventes_command(depuis, jusqu_au):
+    """Recalcule le cumul journalier des ventes depuis les consommations"""
+    from datetime import date
+    from core.ventes_journalieres import reconstruire
+    db.create_all()
+    n = reconstruire(date.fromisoformat(depuis) if depuis else None,
+                     date.fromisoformat(jusqu_au) if jusqu_au else None)
+    db.session.commit()
+    print(f"✓ {n} ligne(s) de cumul journalier reconstruite(s)")
+
+@app.cli.command('releve-stock')
+def releve_stock_command():
+    """Enregistre la valorisation du stock du jour (à planifier en fin de journée)"""
+    from core.valorisation import enregistrer_releve, valeur_actuelle
+    init_database()
+    with app.app_context():
+        enregistrer_releve()
+        valeur = valeur_actuelle()
+    print(f"✓ Stock valorisé à {valeur['valeur_achat']:,.0f} (achat) / {valeur['valeur_vente']:,.0f} (vente)")
+
+@app.cli.command('verifier-index')
+def verifier_index_command():
+    """Échoue si une requête d'endpoint parcourt une table complète (routes GET
+    de l'application et variantes de core/index.py)"""
+    import sys
+    from core.index import verifier_plans
+    init_database()
+    if 'abonnes' not in app.blueprints:
+        register_blueprints()
+    problemes = verifier_plans(app)
+    for url, table, sql in problemes:
+        if table is None:
+            print(f"✗ {url}: {sql}")
+        else:
+            print(f"✗ {url}: parcours complet de '{table}'\n    {sql}")
+    if problemes:
+        sys.exit(1)
+    print("✓ Aucun parcours complet de table")
+
+@app.cli.command('facturer-mois')
+@click.argument('date_limite')
+@click.option('--taille-lot', default=200, show_default=True, type=click.IntRange(min=1),
+              help="Abonnés par transaction")
+def facturer_mois_command(date_limite, taille_lot):
+    """Facture les consommations non facturées jusqu'à DATE_LIMITE (AAAA-MM-JJ incluse)"""
+    from datetime import datetime, time
+    from core.facturation import facturer_periode
+    init_database()
+    limite = datetime.combine(datetime.fromisoformat(date_limite).date(), time.max)
+
+    def progression(rapport):
+        print(f"  lot {rapport['lots']}: {rapport['abonnes_traites']}/{rapport['abonnes_total']} abonné(s), "
+              f"{rapport['lignes_facturees']} ligne(s), {rapport['duree']:.1f}s")
+
+    rapport = facturer_periode(limite, taille_lot=taille_lot, progression=progression)
+    print(f"✓ {rapport['factures_creees']} facture(s), {rapport['lignes_facturees']} consommation(s) facturée(s)")
+
 # Routes principales
 @app.route('/')
 def index():
@@ -114,44 +226,13 @@ def home():
 @app.route('/dashboard')
 @login_required
 def dashboard():
-    from datetime import datetime, timedelta
-    from models import Produit, Abonne, Facture, Consommation
-    from sqlalchemy import func
-    
-    # Statistiques générales
-    stats = {
-        'total_produits': Produit.query.filter_by(actif=True).count(),
-        'total_abonnes': Abonne.query.filter_by(actif=True).count(),
-        'produits_stock_critique': Produit.query.filter(Produit.stock <= Produit.stock_alerte).count(),
-    }
-    
-    # Statistiques du jour
-    aujourd_hui = datetime.now().date()
-    debut_jour = datetime.combine(aujourd_hui, datetime.min.time())
-    
-    ventes_jour = db.session.query(func.sum(Consommation.montant_total)).filter(
-        Consommation.date >= debut_jour
-    ).scalar() or 0
-    
-    factures_impayees = db.session.query(func.sum(Facture.montant_ttc)).filter(
-        Facture.statut.in_(['impayee', 'partielle'])
-    ).scalar() or 0
-    
-    stats['ventes_jour'] = ventes_jour
-    stats['factures_impayees'] = factures_impayees
-    
-    # Produits en stock critique
-    produits_critiques = Produit.query.filter(
-        Produit.stock <= Produit.stock_alerte,
-        Produit.actif == True
-    ).limit(10).all()
+    from core import tableau_bord
     
-    # Dernières consommations
-    dernieres_conso = Consommation.query.order_by(Consommation.date.desc()).limit(10).all()
+    # Statistiques en cache, tenues à jour par les écritures (au plus une requête)
+    stats, dernieres_conso = tableau_bord.statistiques(app.config['TABLEAU_BORD_TTL'])
     
     return render_template('dashboard.html', 
                          stats=stats,
-                         produits_critiques=produits_critiques,
                          dernieres_conso=dernieres_conso)
 
 @app.route('/abonnes')
@@ -202,6 +283,7 @@ def register_blueprints():
     from routes.api_paiements import paiements_bp
     from routes.api_consommations import consommations_bp
     from routes.api_stock import stock_bp
+    from routes.api_evenements import evenements_bp
     
     app.register_blueprint(abonnes_bp, url_prefix='/api')
     app.register_blueprint(produits_bp, url_prefix='/api')
@@ -209,6 +291,7 @@ def register_blueprints():
     app.register_blueprint(paiements_bp, url_prefix='/api')
     app.register_blueprint(consommations_bp, url_prefix='/api')
     app.register_blueprint(stock_bp, url_prefix='/api')
+    app.register_blueprint(evenements_bp, url_prefix='/api')
 
 def open_browser():
     """Ouvre le navigateur automatiquement"""
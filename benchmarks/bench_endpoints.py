@@ -0,0 +1,287 @@
+# benchmarks/bench_endpoints.py
+"""Temps et requêtes SQL de chaque endpoint des blueprints, par échelle de données.
+
+Usage : python -m benchmarks.bench_endpoints [--echelles petite,moyenne] [--repetitions 5]
+        [--sortie reference.json] [--comparer ancienne.json] [--dossier /tmp/bases]
+        [--graine 42] [--jusqu-au AAAA-MM-JJ]
+
+Pour chaque échelle, une base est générée par benchmarks/donnees.py (ou
+reprise de --dossier si elle y est déjà) puis copiée : les écritures ne
+touchent que la copie. L'application (app.py) est chargée dans un
+sous-processus sur cette copie (variable CAVE_BASE), connectée en admin, et
+appelée par le client de test Flask :
+- chaque route GET des blueprints (identifiants = 1, l'abonné et le produit
+  les plus actifs), plus quelques variantes de paramètres ;
+- un scénario d'écritures (création, modification, paiement, suppression...)
+  rejoué à chaque répétition sur des entités neuves.
+Par endpoint : statut, premier appel (ms_froid), minimum et médiane des
+--repetitions appels suivants, requêtes SQL et taille du corps du dernier
+appel. --sortie écrit la référence (benchmarks/reference.py) ; --comparer
+la compare à une référence précédente et échoue (code 1) en cas de
+régression.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+
+from benchmarks import donnees, reference
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Routes GET non mesurées : pages de connexion et flux SSE sans fin
+EXCLUS = {'static', 'index', 'login', 'logout', 'evenements.flux_evenements'}
+
+VARIANTES = [
+    '/api/consommations?limite=1000',
+    '/api/consommations?fields=id,abonne,montant_total&limite=1000',
+    '/api/consommations?abonne_id=1&total=true',
+    '/api/produits?recherche=fla',
+    '/api/abonnes?recherche=tra',
+    '/api/factures?statut=impayee',
+    '/api/paiements/series?pas=mois',
+    '/api/stock/valeur?par=categorie',
+    '/api/stock/mouvements?limite=1000',
+]
+
+
+# --- Scénario d'écritures ---
+# Chaque étape : (nom, fonction(ctx, n) -> (méthode, url, json), fonction(ctx, réponse) ou None).
+# ctx garde les identifiants créés au cours d'une répétition ; n distingue les répétitions.
+def _garder(cle, chemin=('data', 'id')):
+    def garder(ctx, donnees_reponse):
+        for c in chemin:
+            donnees_reponse = donnees_reponse[c]
+        ctx[cle] = donnees_reponse
+    return garder
+
+
+def _dernier_produit(ctx, _):
+    from models import db, Produit
+    ctx['produit'] = db.session.scalar(db.select(db.func.max(Produit.id)))
+    db.session.remove()
+
+
+ECRITURES = [
+    ('POST /api/categories', lambda ctx, n: ('post', '/api/categories', {'nom': f'Catégorie bench {n}'}),
+     _garder('categorie')),
+    ('POST /api/fournisseurs', lambda ctx, n: ('post', '/api/fournisseurs', {'nom': f'Fournisseur bench {n}'}),
+     _garder('fournisseur')),
+    ('POST /api/abonnes', lambda ctx, n: ('post', '/api/abonnes', {
+        'nom': 'Bench', 'prenom': f'Abonné {n}', 'telephone': f'69{n:06d}'}), _garder('abonne')),
+    ('PUT /api/abonnes/<id>', lambda ctx, n: ('put', f"/api/abonnes/{ctx['abonne']}", {
+        'adresse': 'Ouaga 2000', 'limite_credit': 50000}), None),
+    ('POST /api/produits', lambda ctx, n: ('post', '/api/produits', {
+        'nom': f'Produit bench {n}', 'type': '65cl', 'prix_vente': 700, 'prix_achat': 450, 'stock': 500,
+        'categorie_id': ctx['categorie'], 'fournisseur_id': ctx['fournisseur']}), _dernier_produit),
+    ('PUT /api/produits/<id>', lambda ctx, n: ('put', f"/api/produits/{ctx['produit']}", {
+        'prix_vente': 750, 'stock_alerte': 20}), None),
+    ('POST /api/stock/entree', lambda ctx, n: ('post', '/api/stock/entree', {
+        'produit_id': ctx['produit'], 'quantite': 48}), None),
+    ('POST /api/stock/sortie', lambda ctx, n: ('post', '/api/stock/sortie', {
+        'produit_id': ctx['produit'], 'quantite': 2}), None),
+    ('POST /api/stock/ajustement', lambda ctx, n: ('post', '/api/stock/ajustement', {
+        'produit_id': ctx['produit'], 'nouveau_stock': 540, 'commentaire': 'Inventaire'}), None),
+    ('POST /api/consommations', lambda ctx, n: ('post', '/api/consommations', {
+        'abonne_id': ctx['abonne'], 'produit_id': ctx['produit'], 'quantite': 3}), _garder('consommation')),
+    ('PUT /api/consommations/<id>', lambda ctx, n: ('put', f"/api/consommations/{ctx['consommation']}", {
+        'quantite': 4, 'note': 'Corrigée'}), None),
+    ('POST /api/consommations/ticket', lambda ctx, n: ('post', '/api/consommations/ticket', {
+        'abonne_id': ctx['abonne'], 'lignes': [{'produit_id': ctx['produit'], 'quantite': 2},
+                                               {'produit_id': 1, 'quantite': 1}]}), None),
+    ('POST /api/factures', lambda ctx, n: ('post', '/api/factures', {
+        'abonne_id': ctx['abonne'], 'consommation_ids': [ctx['consommation']]}), _garder('facture')),
+    ('PUT /api/factures/<id>', lambda ctx, n: ('put', f"/api/factures/{ctx['facture']}", {'note': 'Relance'}), None),
+    ('POST /api/paiements', lambda ctx, n: ('post', '/api/paiements', {
+        'facture_id': ctx['facture'], 'montant': 1000, 'mode_paiement': 'especes'}),
+     _garder('paiement', ('paiement_id',))),
+    ('PUT /api/paiements/<id>', lambda ctx, n: ('put', f"/api/paiements/{ctx['paiement']}", {
+        'montant': 1500, 'mode_paiement': 'mobile_money'}), None),
+    ('DELETE /api/paiements/<id>', lambda ctx, n: ('delete', f"/api/paiements/{ctx['paiement']}", None), None),
+    ('DELETE /api/factures/<id>', lambda ctx, n: ('delete', f"/api/factures/{ctx['facture']}", None), None),
+    ('DELETE /api/consommations/<id>', lambda ctx, n: ('delete', f"/api/consommations/{ctx['consommation']}", None),
+     None),
+    ('DELETE /api/produits/<id>', lambda ctx, n: ('delete', f"/api/produits/{ctx['produit']}", None), None),
+    ('DELETE /api/abonnes/<id>', lambda ctx, n: ('delete', f"/api/abonnes/{ctx['abonne']}", None), None),
+]
+
+
+# --- Mesure (sous-processus, CAVE_BASE = copie de la base) ---
+class Compteur:
+    """Nombre de requêtes SQL exécutées sur l'engine"""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.n = 0
+        event.listen(engine, 'before_cursor_execute', self._compter)
+
+    def _compter(self, *args):
+        self.n += 1
+
+
+def appeler(client, compteur, methode, url, corps=None):
+    """(statut, ms, requêtes, corps) d'un appel"""
+    compteur.n = 0
+    debut = time.perf_counter()
+    reponse = getattr(client, methode)(url, json=corps)
+    donnees_reponse = reponse.get_data()
+    duree = (time.perf_counter() - debut) * 1000
+    return reponse.status_code, duree, compteur.n, donnees_reponse
+
+
+def resumer(appels):
+    """Mesure d'un endpoint : appels[0] est le premier appel (à froid)"""
+    froid = appels[0][1]
+    suivants = appels[1:] or appels
+    statut, _, requetes, corps = suivants[-1]
+    durees = [duree for _, duree, _, _ in suivants]
+    return {'status': statut, 'ms_froid': round(froid, 2), 'ms_min': round(min(durees), 2),
+            'ms_median': round(statistics.median(durees), 2), 'requetes': requetes, 'octets': len(corps)}
+
+
+def routes_get(app):
+    """URLs des routes GET des blueprints, identifiants à 1"""
+    urls = []
+    for regle in sorted(app.url_map.iter_rules(), key=lambda r: r.rule):
+        if 'GET' not in regle.methods or regle.endpoint in EXCLUS or '.' not in regle.endpoint:
+            continue
+        urls.append(regle.rule.replace('<int:id>', '1').replace('<int:abonne_id>', '1'))
+    return urls
+
+
+def mesurer_base(repetitions):
+    import app as application
+    from models import db
+
+    app = application.app
+    app.config['TESTING'] = True
+    application.init_database()
+    application.register_blueprints()
+    client = app.test_client()
+    reponse = client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+    if reponse.status_code != 302:
+        raise RuntimeError(f'Connexion admin impossible ({reponse.status_code})')
+    with app.app_context():
+        compteur = Compteur(db.engine)
+
+    resultats = {}
+    for url in routes_get(app) + VARIANTES:
+        appels = [appeler(client, compteur, 'get', url) for _ in range(repetitions + 1)]
+        resultats[f'GET {url}'] = resumer(appels)
+
+    appels = {nom: [] for nom, _, _ in ECRITURES}
+    for n in range(repetitions + 1):
+        ctx = {}
+        for nom, requete, suite in ECRITURES:
+            methode, url, corps = requete(ctx, n)
+            appel = appeler(client, compteur, methode, url, corps)
+            appels[nom].append(appel)
+            if suite and appel[0] < 300:
+                with app.app_context():
+                    suite(ctx, json.loads(appel[3]))
+    resultats.update((nom, resumer(a)) for nom, a in appels.items())
+
+    # Facturation mensuelle : une seule exécution utile (le mois en cours)
+    appel = appeler(client, compteur, 'post', '/api/factures/mensuelles', {'date_limite': date.today().isoformat()})
+    resultats['POST /api/factures/mensuelles'] = resumer([appel])
+    return resultats
+
+
+# --- Orchestration ---
+def base_echelle(echelle, parametres, graine, jusqu_au, dossier):
+    """Chemin de la base générée pour l'échelle (reprise si déjà présente)"""
+    chemin = os.path.join(dossier, f'{echelle}-{graine}-{jusqu_au.isoformat()}.db')
+    if not os.path.exists(chemin):
+        debut = time.perf_counter()
+        compteurs = donnees.generer(chemin + '.tmp', graine=graine, jusqu_au=jusqu_au, **parametres)
+        os.replace(chemin + '.tmp', chemin)
+        print(f"  base générée en {time.perf_counter() - debut:.1f}s : "
+              + ', '.join(f'{n} {table}' for table, n in compteurs.items()))
+    return chemin
+
+
+def mesurer_echelle(base, repetitions):
+    """Mesure dans un sous-processus : app.py lit CAVE_BASE à l'import et crée
+    ./database dans le dossier courant"""
+    with tempfile.TemporaryDirectory() as travail:
+        copie = os.path.join(travail, 'cave.db')
+        shutil.copyfile(base, copie)
+        fichier = os.path.join(travail, 'resultats.json')
+        env = {**os.environ, 'CAVE_BASE': copie,
+               'PYTHONPATH': os.pathsep.join(filter(None, [RACINE, os.environ.get('PYTHONPATH')]))}
+        processus = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_endpoints', '--mesurer', copie, '--resultat', fichier,
+             '--repetitions', str(repetitions)],
+            cwd=travail, env=env, capture_output=True, text=True)
+        if processus.returncode != 0:
+            sys.exit(f"✗ Mesure impossible :\n{processus.stderr}")
+        with open(fichier, encoding='utf-8') as f:
+            return json.load(f)
+
+
+def afficher(endpoints):
+    print(f"  {'endpoint':<66}{'statut':>7}{'froid':>9}{'min':>9}{'médiane':>9}{'req.':>6}{'Ko':>9}")
+    for nom, m in endpoints.items():
+        print(f"  {nom:<66}{m['status']:>7}{m['ms_froid']:>9.1f}{m['ms_min']:>9.1f}{m['ms_median']:>9.1f}"
+              f"{m['requetes']:>6}{m['octets'] / 1024:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--echelles', default='petite,moyenne', help="Parmi : " + ', '.join(donnees.ECHELLES))
+    parser.add_argument('--repetitions', type=int, default=5)
+    parser.add_argument('--sortie', help="Référence JSON à écrire")
+    parser.add_argument('--comparer', help="Référence JSON précédente")
+    parser.add_argument('--seuil', type=float, default=reference.SEUIL)
+    parser.add_argument('--dossier', help="Dossier des bases générées (conservées entre deux exécutions)")
+    parser.add_argument('--graine', type=int, default=42)
+    parser.add_argument('--jusqu-au', type=date.fromisoformat, default=date.today(),
+                        help="Dernier jour des données (AAAA-MM-JJ), aujourd'hui par défaut")
+    parser.add_argument('--mesurer', help=argparse.SUPPRESS)
+    parser.add_argument('--resultat', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mesurer:
+        resultats = mesurer_base(args.repetitions)
+        with open(args.resultat, 'w', encoding='utf-8') as f:
+            json.dump(resultats, f)
+        return
+
+    echelles = [e for e in args.echelles.split(',') if e]
+    inconnues = set(echelles) - set(donnees.ECHELLES)
+    if inconnues:
+        sys.exit(f"✗ Échelle(s) inconnue(s) : {', '.join(sorted(inconnues))}")
+
+    with tempfile.TemporaryDirectory() as temporaire:
+        dossier = args.dossier or temporaire
+        os.makedirs(dossier, exist_ok=True)
+        mesures = {}
+        for echelle in echelles:
+            parametres = donnees.parametres_echelle(echelle)
+            print(f"[{echelle}] " + ', '.join(f'{cle}={v}' for cle, v in parametres.items()))
+            base = base_echelle(echelle, parametres, args.graine, args.jusqu_au, dossier)
+            endpoints = mesurer_echelle(base, args.repetitions)
+            afficher(endpoints)
+            mesures[echelle] = {
+                'parametres': {**parametres, 'graine': args.graine, 'jusqu_au': args.jusqu_au.isoformat()},
+                'endpoints': endpoints,
+            }
+
+    if args.sortie:
+        reference.ecrire(args.sortie, mesures)
+        print(f"✓ Référence écrite : {args.sortie}")
+    if args.comparer:
+        ecarts = reference.comparer(reference.charger(args.comparer), {'echelles': mesures}, args.seuil)
+        reference.afficher(ecarts)
+        if any(regression for *_, regression in ecarts):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
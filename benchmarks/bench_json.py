@@ -0,0 +1,180 @@
+# benchmarks/bench_json.py
+"""Réponse JSON de /api/consommations sur une grande liste.
+
+Usage : python -m benchmarks.bench_json [--lignes 100000] [--repetitions 3]
+
+Compare, pour une page de toutes les lignes (plafond LIMITE_MAX levé) :
+- l'ancien chemin : objets ORM chargés selon les champs (charger_orm), un
+  dictionnaire par ligne, jsonify avec le fournisseur par défaut de Flask
+  (module json) ;
+- le même chemin avec FournisseurJSON (orjson s'il est installé) ;
+- le chemin actuel de l'endpoint : select() des colonnes, lignes écrites
+  directement en JSON par core/json_rapide.reponse_liste.
+Les trois corps sont décodés et comparés : le programme échoue (code 1)
+s'ils diffèrent.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from flask_login import LoginManager
+from sqlalchemy import insert
+from sqlalchemy.orm import joinedload, selectinload, load_only
+from sqlalchemy.orm.relationships import RelationshipProperty
+from models import db, Abonne, Produit, Consommation, Facture
+from core import json_rapide, pagination
+from core.json_rapide import FournisseurJSON
+from routes import serialiseurs
+
+
+def creer_app(chemin):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{chemin}'
+    app.config['LOGIN_DISABLED'] = True
+    app.json = FournisseurJSON(app)
+    db.init_app(app)
+    LoginManager().init_app(app)
+    from routes.api_consommations import consommations_bp
+    app.register_blueprint(consommations_bp, url_prefix='/api')
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def remplir(lignes):
+    random.seed(42)
+    debut = datetime(2024, 1, 1)
+    db.session.execute(insert(Abonne), [
+        {'numero_abonne': f'ABN{i:05d}', 'nom': f'Abonné {i}', 'prenom': 'Awa' if i % 3 else None,
+         'telephone': f'70{i:06d}'}
+        for i in range(1, 501)
+    ])
+    db.session.execute(insert(Produit), [
+        {'code_produit': f'PRD{i:04d}', 'nom': f'Produit {i}', 'prix_achat': 400, 'prix_vente': 650.5}
+        for i in range(1, 41)
+    ])
+    db.session.execute(insert(Facture), [
+        {'numero_facture': f'FAC-{i:06d}', 'abonne_id': i % 500 + 1, 'date_emission': debut}
+        for i in range(1, 2001)
+    ])
+    db.session.execute(insert(Consommation), [{
+        'abonne_id': random.randint(1, 500), 'produit_id': random.randint(1, 40),
+        'quantite': q, 'prix_unitaire': 650.5, 'montant_total': q * 650.5,
+        'date': debut + timedelta(seconds=37 * i, microseconds=i % 7 * 1000),
+        'facture_id': random.randint(1, 2000) if i % 2 else None,
+        'note': 'livré "à domicile"' if i % 10 == 0 else '',
+    } for i, q in enumerate(random.choices(range(1, 6), k=lignes))])
+    db.session.commit()
+
+
+def _relation(attribut):
+    return isinstance(attribut.property, RelationshipProperty)
+
+
+def _cles_locales(relation):
+    mapper = relation.property.parent
+    return [mapper.get_property_by_column(c).class_attribute for c in relation.property.local_columns]
+
+
+def charger_orm(forme, query, champs):
+    """Plan de chargement de l'ancien chemin ORM, déduit des dépendances des
+    champs : load_only des colonnes lues, joinedload des relations simples,
+    selectinload des collections"""
+    colonnes, chemins = set(), {}
+
+    def ajouter(chemin, attributs):
+        if not chemin:
+            colonnes.update(attributs)
+        elif chemins.get(chemin, ()) is not None:
+            chemins[chemin] = chemins.get(chemin, set()) | set(attributs)
+
+    for cle in champs:
+        for dependance in forme.champs[cle].dependances:
+            dependance = dependance if isinstance(dependance, tuple) else (dependance,)
+            relations = tuple(a for a in dependance if _relation(a))
+            for i, relation in enumerate(relations):
+                ajouter(relations[:i], _cles_locales(relation))
+            fin = [a for a in dependance if not _relation(a)]
+            if relations and not fin:
+                chemins[relations] = None       # objet lié en entier
+            else:
+                ajouter(relations, fin)
+
+    def options(prefixe):
+        resultat = []
+        for chemin in [c for c in chemins if len(c) == len(prefixe) + 1 and c[:-1] == prefixe]:
+            strategie = selectinload if chemin[-1].property.uselist else joinedload
+            imbriquees = options(chemin)
+            if chemins[chemin] is not None:
+                imbriquees.append(load_only(*chemins[chemin]))
+            resultat.append(strategie(chemin[-1]).options(*imbriquees))
+        return resultat
+
+    return query.options(load_only(*colonnes), *options(()))
+
+
+def ancien_chemin(app, fournisseur):
+    champs = tuple(serialiseurs.consommation.champs)
+    query = charger_orm(serialiseurs.consommation, Consommation.query, champs)
+    elements = query.order_by(Consommation.date.desc(), Consommation.id.desc()).all()
+    donnees = [serialiseurs.consommation(c, champs) for c in elements]
+    reponse = fournisseur.response({'success': True, 'data': donnees, 'next_cursor': None})
+    db.session.remove()
+    return reponse.get_data()
+
+
+def chemin_lignes(client, lignes):
+    return client.get(f'/api/consommations?limite={lignes}').get_data()
+
+
+def mesurer(fonction, repetitions):
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        corps = fonction()
+        durees.append(time.perf_counter() - debut)
+    return min(durees) * 1000, corps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lignes', type=int, default=100000)
+    parser.add_argument('--repetitions', type=int, default=3)
+    args = parser.parse_args()
+
+    pagination.LIMITE_MAX = args.lignes     # une seule page pour la mesure
+    with tempfile.TemporaryDirectory() as dossier:
+        app = creer_app(os.path.join(dossier, 'cave.db'))
+        with app.app_context():
+            remplir(args.lignes)
+        client = app.test_client()
+
+        with app.test_request_context():
+            mesures = [
+                ('ORM + dict + json', *mesurer(lambda: ancien_chemin(app, DefaultJSONProvider(app)), args.repetitions)),
+                ('ORM + dict + FournisseurJSON', *mesurer(lambda: ancien_chemin(app, app.json), args.repetitions)),
+            ]
+        mesures.append(('select + lignes', *mesurer(lambda: chemin_lignes(client, args.lignes), args.repetitions)))
+
+        encodeur = 'orjson' if json_rapide.orjson else 'json (orjson absent)'
+        print(f"{args.lignes} consommations, une page — FournisseurJSON : {encodeur}")
+        print(f"{'chemin':<32}{'ms':>10}{'Mo':>8}{'gain':>8}")
+        reference = mesures[0][1]
+        for nom, duree, corps in mesures:
+            print(f"{nom:<32}{duree:>10.0f}{len(corps) / 1e6:>8.1f}{reference / duree:>7.1f}x")
+
+        donnees = [json.loads(corps)['data'] for _, _, corps in mesures]
+        if any(d != donnees[0] for d in donnees[1:]) or len(donnees[0]) != args.lignes:
+            print("✗ Les réponses diffèrent")
+            sys.exit(1)
+        print("✓ Réponses identiques")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+# benchmarks/bench_lecture.py
+"""Listes et statistiques : objets ORM vs lecture par select() (core/lecture.py).
+
+Usage : python -m benchmarks.bench_lecture [--lignes 100000] [--repetitions 5]
+
+Pour chaque liste, une page de 1000 lignes : l'ancien chemin (objets ORM
+chargés par bench_json.charger_orm, un dictionnaire par ligne, jsonify) contre
+l'endpoint actuel (select() des colonnes, enregistrements, JSON écrit ligne
+à ligne). Suivent les statistiques des paiements (boucle Python sur tous les
+objets contre GROUP BY) et un parcours complet des consommations comme pour
+un export (Query.all() contre lecture.lignes par paquets).
+Temps : meilleur de --repetitions ; mémoire : pic tracemalloc d'un appel.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from flask import jsonify
+from sqlalchemy import insert
+from models import db, Abonne, Produit, Consommation, Facture, Paiement, StockLog
+from core import lecture, soldes
+from routes import serialiseurs
+from benchmarks.bench_json import creer_app, remplir, charger_orm
+
+MODES = ['especes', 'mobile_money', 'cheque', 'virement']
+
+
+def completer(lignes):
+    """Paiements, mouvements de stock et soldes en plus des données de bench_json"""
+    random.seed(7)
+    debut = datetime(2024, 1, 1)
+    db.session.execute(insert(Paiement), [{
+        'facture_id': random.randint(1, 2000), 'montant': random.choice([500, 1000, 2500.5]),
+        'mode_paiement': random.choice(MODES), 'date_paiement': debut + timedelta(minutes=i),
+    } for i in range(lignes // 2)])
+    db.session.execute(insert(StockLog), [{
+        'produit_id': random.randint(1, 40), 'type_mouvement': 'sortie', 'quantite': 1,
+        'stock_avant': 100, 'stock_apres': 99, 'date': debut + timedelta(seconds=37 * i),
+    } for i in range(lignes)])
+    soldes.initialiser_soldes_manquants()
+    db.session.commit()
+
+
+def enregistrer_routes(app):
+    from routes.api_abonnes import abonnes_bp
+    from routes.api_produits import produits_bp
+    from routes.api_factures import factures_bp
+    from routes.api_paiements import paiements_bp
+    from routes.api_stock import stock_bp
+    for bp in (abonnes_bp, produits_bp, factures_bp, paiements_bp, stock_bp):
+        app.register_blueprint(bp, url_prefix='/api')
+
+
+# url, forme, requête et tri de l'ancien chemin
+LISTES = [
+    ('/api/consommations', serialiseurs.consommation, lambda: Consommation.query,
+     (Consommation.date.desc(), Consommation.id.desc())),
+    ('/api/paiements', serialiseurs.paiement, lambda: Paiement.query,
+     (Paiement.date_paiement.desc(), Paiement.id.desc())),
+    ('/api/factures', serialiseurs.facture, lambda: Facture.query,
+     (Facture.date_emission.desc(), Facture.id.desc())),
+    ('/api/abonnes', serialiseurs.abonne, lambda: Abonne.query.filter_by(actif=True), (Abonne.nom, Abonne.id)),
+    ('/api/stock/mouvements', serialiseurs.mouvement_stock, lambda: StockLog.query,
+     (StockLog.date.desc(), StockLog.id.desc())),
+]
+
+
+def liste_orm(forme, query, tri):
+    champs = tuple(forme.champs)
+    objets = charger_orm(forme, query(), champs).order_by(*tri).limit(1000).all()
+    corps = jsonify({'success': True, 'data': [forme(o, champs) for o in objets]}).get_data()
+    db.session.remove()
+    return corps
+
+
+def statistiques_orm():
+    """Ancienne version de get_statistiques_paiements"""
+    stats_par_mode = {}
+    paiements = Paiement.query.all()
+    for p in paiements:
+        if p.mode_paiement not in stats_par_mode:
+            stats_par_mode[p.mode_paiement] = {'count': 0, 'total': 0}
+        stats_par_mode[p.mode_paiement]['count'] += 1
+        stats_par_mode[p.mode_paiement]['total'] += p.montant
+    corps = jsonify({'total_paiements': len(paiements), 'par_mode': stats_par_mode}).get_data()
+    db.session.remove()
+    return corps
+
+
+def export_orm():
+    total = sum(c.montant_total for c in Consommation.query.order_by(Consommation.id).all())
+    db.session.remove()
+    return total
+
+
+def export_lecture():
+    requete = serialiseurs.consommation.requete(('id', 'montant_total')).order_by(Consommation.id)
+    return sum(l.montant_total for l in lecture.lignes(requete))
+
+
+def mesurer(fonction, repetitions):
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction()
+        durees.append(time.perf_counter() - debut)
+    tracemalloc.start()
+    fonction()
+    pic = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(durees) * 1000, pic / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lignes', type=int, default=100000)
+    parser.add_argument('--repetitions', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as dossier:
+        app = creer_app(os.path.join(dossier, 'cave.db'))
+        enregistrer_routes(app)
+        with app.app_context():
+            remplir(args.lignes)
+            completer(args.lignes)
+        client = app.test_client()
+
+        def endpoint(url):
+            return lambda: client.get(url).get_data()
+
+        cas = [(url, lambda f=forme, q=query, t=tri: liste_orm(f, q, t), endpoint(f'{url}?limite=1000'))
+               for url, forme, query, tri in LISTES]
+        cas.append(('/api/paiements/statistiques', statistiques_orm, endpoint('/api/paiements/statistiques')))
+        cas.append((f'export ({args.lignes} consommations)', export_orm, export_lecture))
+
+        print(f"{args.lignes} consommations, {args.lignes // 2} paiements, {args.lignes} mouvements de stock")
+        print(f"{'':<40}{'ORM ms':>9}{'Mo':>7}{'select ms':>11}{'Mo':>7}{'gain':>7}")
+        with app.test_request_context():
+            for nom, avant, apres in cas:
+                duree_avant, memoire_avant = mesurer(avant, args.repetitions)
+                duree_apres, memoire_apres = mesurer(apres, args.repetitions)
+                print(f"{nom:<40}{duree_avant:>9.1f}{memoire_avant:>7.1f}{duree_apres:>11.1f}"
+                      f"{memoire_apres:>7.1f}{duree_avant / duree_apres:>6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+# benchmarks/bench_recherche.py
+"""Recherche abonnés/produits : LIKE '%terme%' vs index FTS5.
+
+Usage : python -m benchmarks.bench_recherche [--lignes 50000] [--repetitions 20]
+
+Simule la saisie au clavier dans la recherche (préfixes successifs).
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from sqlalchemy import create_engine, insert, select
+from models import db, Abonne, Produit
+from core.recherche import installer_index_recherche, filtrer
+
+NOMS = ['Traoré', 'Ouedraogo', 'Sawadogo', 'Kaboré', 'Compaoré', 'Zongo', 'Ilboudo', 'Kinda',
+        'Tapsoba', 'Nikiema', 'Bationo', 'Yameogo', 'Sanou', 'Diallo', 'Coulibaly', 'Ouattara']
+PRENOMS = ['Awa', 'Issa', 'Mariam', 'Boukary', 'Salif', 'Aminata', 'Adama', 'Fatou', 'Rasmané', 'Alizèta']
+PRODUITS = ['Flag', 'Brakina', 'Castel', 'Beaufort', 'Guinness', 'Sucrerie', 'Coca', 'Fanta',
+            'Sprite', 'Vin rouge', 'Whisky', 'Eau minérale', 'Jus bissap', 'Jus gingembre']
+TYPES = ['33cl', '50cl', '65cl', '1L', '1.5L', 'canette', 'bouteille', 'carton']
+SAISIES = ['t', 'tr', 'tra', 'trao', 'traor', 'k', 'ka', 'kab', 'zon', 'awa', '7012', 'ABN001']
+SAISIES_PRODUITS = ['f', 'fl', 'fla', 'bra', 'gui', 'jus', 'jus gi', '65cl', 'PRD01']
+
+
+def preparer_base(chemin, lignes):
+    random.seed(42)
+    engine = create_engine(f'sqlite:///{chemin}')
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Abonne.__table__), [{
+            'numero_abonne': f'ABN{i:06d}', 'nom': random.choice(NOMS), 'prenom': random.choice(PRENOMS),
+            'telephone': f'7{random.randint(0, 9999999):07d}', 'actif': True
+        } for i in range(1, lignes + 1)])
+        conn.execute(insert(Produit.__table__), [{
+            'code_produit': f'PRD{i:06d}', 'nom': f'{random.choice(PRODUITS)} {i}', 'type': random.choice(TYPES),
+            'prix_achat': 400, 'prix_vente': 600, 'stock': 100, 'stock_alerte': 10, 'actif': True
+        } for i in range(1, lignes + 1)])
+        installer_index_recherche(conn)
+    return engine
+
+
+def mesurer(engine, modele, saisies, fts_actif, repetitions):
+    tri = Abonne.nom if modele is Abonne else Produit.nom
+    debut = time.perf_counter()
+    with engine.connect() as conn:
+        for _ in range(repetitions):
+            for terme in saisies:
+                query = filtrer(select(modele.id).where(modele.actif == True), modele, terme, fts_actif)
+                conn.execute(query.order_by(tri).limit(50)).all()
+    return (time.perf_counter() - debut) / (repetitions * len(saisies)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lignes', type=int, default=50000)
+    parser.add_argument('--repetitions', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as dossier:
+        engine = preparer_base(os.path.join(dossier, 'cave.db'), args.lignes)
+        print(f"{args.lignes} abonnés, {args.lignes} produits — ms par recherche (50 premiers résultats)")
+        print(f"{'table':<10}{'LIKE':>10}{'FTS5':>10}{'gain':>8}")
+        for modele, saisies in ((Abonne, SAISIES), (Produit, SAISIES_PRODUITS)):
+            like = mesurer(engine, modele, saisies, False, args.repetitions)
+            fts = mesurer(engine, modele, saisies, True, args.repetitions)
+            print(f"{modele.__tablename__:<10}{like:>10.2f}{fts:>10.2f}{like / fts:>7.1f}x")
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
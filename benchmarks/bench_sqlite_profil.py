@@ -0,0 +1,113 @@
+# benchmarks/bench_sqlite_profil.py
+"""Débit concurrent lecture/écriture : SQLite par défaut vs profil de production.
+
+Usage : python -m benchmarks.bench_sqlite_profil [--duree 5] [--lecteurs 3] [--ecrivains 2]
+
+Les écrivains simulent des caisses (une consommation + un mouvement de stock
+par transaction), les lecteurs un rapport (agrégats sur les consommations).
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import create_engine, func, select, insert
+from sqlalchemy.exc import OperationalError
+from models import db, Abonne, Produit, Consommation, StockLog
+from core.sqlite_profil import appliquer_profil
+
+LIGNES_INITIALES = 20000
+
+
+def preparer_base(chemin):
+    engine = create_engine(f'sqlite:///{chemin}')
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Abonne.__table__), [
+            {'numero_abonne': f'ABN{i:05d}', 'nom': f'Abonne {i}', 'telephone': '70000000', 'actif': True}
+            for i in range(1, 101)
+        ])
+        conn.execute(insert(Produit.__table__), [
+            {'code_produit': f'PRD{i:05d}', 'nom': f'Produit {i}', 'prix_achat': 400, 'prix_vente': 600,
+             'stock': 10 ** 6, 'stock_alerte': 10, 'actif': True}
+            for i in range(1, 51)
+        ])
+        conn.execute(insert(Consommation.__table__), [
+            {'abonne_id': i % 100 + 1, 'produit_id': i % 50 + 1, 'quantite': 1, 'prix_unitaire': 600,
+             'montant_total': 600, 'date': datetime.now()}
+            for i in range(LIGNES_INITIALES)
+        ])
+    engine.dispose()
+
+
+def executer(chemin, profil, duree, lecteurs, ecrivains):
+    # Sans profil : comportement actuel (journal DELETE, timeout pysqlite 5 s)
+    engine = create_engine(f'sqlite:///{chemin}', pool_size=lecteurs + ecrivains)
+    if profil:
+        appliquer_profil(engine)
+    compteurs = {'lectures': 0, 'ecritures': 0, 'verrous': 0}
+    verrou = threading.Lock()
+    fin = time.perf_counter() + duree
+
+    def compter(cle):
+        with verrou:
+            compteurs[cle] += 1
+
+    def lecteur():
+        while time.perf_counter() < fin:
+            try:
+                with engine.connect() as conn:
+                    conn.execute(select(Consommation.produit_id, func.sum(Consommation.montant_total))
+                                 .group_by(Consommation.produit_id)).all()
+                compter('lectures')
+            except OperationalError:
+                compter('verrous')
+
+    def ecrivain(n):
+        i = 0
+        while time.perf_counter() < fin:
+            i += 1
+            try:
+                with engine.connect().execution_options(ecriture=True) as conn, conn.begin():
+                    conn.execute(insert(Consommation.__table__).values(
+                        abonne_id=n + 1, produit_id=i % 50 + 1, quantite=1, prix_unitaire=600,
+                        montant_total=600, date=datetime.now()))
+                    conn.execute(Produit.__table__.update()
+                                 .where(Produit.id == i % 50 + 1)
+                                 .values(stock=Produit.stock - 1))
+                    conn.execute(insert(StockLog.__table__).values(
+                        produit_id=i % 50 + 1, type_mouvement='sortie', quantite=1, date=datetime.now()))
+                compter('ecritures')
+            except OperationalError:
+                compter('verrous')
+
+    threads = [threading.Thread(target=lecteur) for _ in range(lecteurs)]
+    threads += [threading.Thread(target=ecrivain, args=(n,)) for n in range(ecrivains)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    engine.dispose()
+    return {cle: valeur / duree if cle != 'verrous' else valeur for cle, valeur in compteurs.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--duree', type=float, default=5)
+    parser.add_argument('--lecteurs', type=int, default=3)
+    parser.add_argument('--ecrivains', type=int, default=2)
+    args = parser.parse_args()
+
+    print(f"{args.lecteurs} lecteur(s), {args.ecrivains} écrivain(s), {args.duree:g} s par profil")
+    print(f"{'profil':<12}{'lectures/s':>12}{'écritures/s':>13}{'verrous':>9}")
+    for nom, profil in (('défaut', False), ('production', True)):
+        with tempfile.TemporaryDirectory() as dossier:
+            chemin = os.path.join(dossier, 'cave.db')
+            preparer_base(chemin)
+            r = executer(chemin, profil, args.duree, args.lecteurs, args.ecrivains)
+        print(f"{nom:<12}{r['lectures']:>12.1f}{r['ecritures']:>13.1f}{r['verrous']:>9}")
+
+
+if __name__ == '__main__':
+    main()
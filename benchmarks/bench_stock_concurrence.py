@@ -0,0 +1,134 @@
+# benchmarks/bench_stock_concurrence.py
+"""Ventes concurrentes sur un même produit : aucune décrémentation perdue.
+
+Usage : python -m benchmarks.bench_stock_concurrence [--threads 8] [--ventes 200] [--stock 1000]
+
+Chaque thread enchaîne des ventes d'une unité dans sa propre transaction.
+Le mode « naïf » reproduit l'ancien code (lecture du stock en Python puis
+écriture), le mode « service » passe par core.stock ; chacun est exécuté avec
+la configuration SQLite par défaut et avec le profil de production.
+Par défaut, pysqlite n'ouvre la transaction qu'à la première écriture : la
+lecture naïve se fait hors transaction et des ventes sont perdues. Avec le
+profil, elles échouent en « database is locked » au lieu d'être perdues.
+Le programme échoue (code 1) si le service perd une mise à jour, laisse un
+stock négatif ou produit un journal incohérent.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from flask import Flask
+from sqlalchemy import insert, select, func
+from sqlalchemy.exc import OperationalError
+from models import db, Produit, StockLog
+from core import stock
+from core.sqlite_profil import appliquer_profil
+
+
+def creer_app(chemin, profil):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{chemin}'
+    db.init_app(app)
+    with app.app_context():
+        if profil:
+            appliquer_profil(db.engine)
+        db.create_all()
+    return app
+
+
+def vente_naive(produit_id):
+    produit = db.session.get(Produit, produit_id)
+    if produit.stock < 1:
+        raise stock.StockInsuffisant(produit_id, produit.stock)
+    stock_avant = produit.stock
+    time.sleep(0)  # laisse les autres caisses lire la même valeur
+    produit.stock = stock_avant - 1
+    db.session.add(StockLog(produit_id=produit_id, type_mouvement='sortie', quantite=1,
+                            stock_avant=stock_avant, stock_apres=stock_avant - 1))
+
+
+def vente_service(produit_id):
+    stock.sortie(produit_id, 1)
+
+
+def executer(mode, profil, threads, ventes, stock_initial):
+    with tempfile.TemporaryDirectory() as dossier:
+        app = creer_app(os.path.join(dossier, 'cave.db'), profil)
+        with app.app_context():
+            produit_id = db.session.execute(insert(Produit).returning(Produit.id).values(
+                code_produit='PRD00001', nom='Flag', prix_achat=450, prix_vente=600,
+                stock=stock_initial, stock_alerte=10, actif=True)).scalar()
+            db.session.commit()
+
+        vendre = vente_naive if mode == 'naif' else vente_service
+        compteurs = {'vendues': 0, 'refusees': 0, 'erreurs': 0}
+        verrou = threading.Lock()
+
+        def caisse():
+            with app.app_context():
+                for _ in range(ventes):
+                    try:
+                        vendre(produit_id)
+                        db.session.commit()
+                        cle = 'vendues'
+                    except stock.StockInsuffisant:
+                        db.session.rollback()
+                        cle = 'refusees'
+                    except OperationalError:
+                        db.session.rollback()
+                        cle = 'erreurs'
+                    with verrou:
+                        compteurs[cle] += 1
+
+        debut = time.perf_counter()
+        caisses = [threading.Thread(target=caisse) for _ in range(threads)]
+        for t in caisses:
+            t.start()
+        for t in caisses:
+            t.join()
+        duree = time.perf_counter() - debut
+
+        with app.app_context():
+            final = db.session.get(Produit, produit_id).stock
+            logs = db.session.execute(select(func.count(), func.count(func.distinct(StockLog.stock_apres)))
+                                      .where(StockLog.produit_id == produit_id)).one()
+            db.engine.dispose()
+    return {
+        **compteurs,
+        'stock_final': final,
+        'attendu': stock_initial - compteurs['vendues'],
+        'perdues': final - (stock_initial - compteurs['vendues']),
+        'logs': logs[0],
+        'logs_distincts': logs[1],
+        'duree': duree,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--ventes', type=int, default=200, help="ventes tentées par thread")
+    parser.add_argument('--stock', type=int, default=1000, help="stock initial (inférieur au total pour tester le refus)")
+    args = parser.parse_args()
+
+    print(f"{args.threads} caisse(s) x {args.ventes} vente(s), stock initial {args.stock}")
+    print(f"{'mode':<20}{'vendues':>9}{'refusées':>10}{'erreurs':>9}{'final':>7}{'attendu':>9}{'perdues':>9}{'logs':>6}{'durée':>8}")
+    echec = False
+    for mode, profil in (('naif', False), ('naif', True), ('service', False), ('service', True)):
+        r = executer(mode, profil, args.threads, args.ventes, args.stock)
+        nom = f"{mode} ({'production' if profil else 'défaut'})"
+        print(f"{nom:<20}{r['vendues']:>9}{r['refusees']:>10}{r['erreurs']:>9}{r['stock_final']:>7}"
+              f"{r['attendu']:>9}{r['perdues']:>9}{r['logs']:>6}{r['duree']:>7.2f}s")
+        if mode == 'service':
+            echec = echec or (r['perdues'] != 0 or r['stock_final'] < 0
+                              or r['logs'] != r['vendues'] or r['logs_distincts'] != r['vendues'])
+    if echec:
+        print("✗ Le service de stock a perdu ou dupliqué des mises à jour")
+        sys.exit(1)
+    print("✓ Aucune mise à jour perdue par le service de stock")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,310 @@
+# benchmarks/donnees.py
+"""Génère une base synthétique au schéma de models.py (comme database/cave.db).
+
+Usage : python -m benchmarks.donnees --sortie /tmp/cave.db [--echelle moyenne]
+        [--abonnes N] [--produits N] [--mois N] [--consommations-par-jour N]
+        [--graine 42] [--jusqu-au AAAA-MM-JJ] [--ecraser]
+
+À graine et date de fin égales, les données sont identiques d'une exécution
+à l'autre (seules changent les empreintes des mots de passe et les dates de
+mise à jour des tables dérivées). La base
+contient :
+- les comptes par défaut (admin/admin123, vendeur/vendeur123) et les
+  paramètres de la cave ;
+- catégories, fournisseurs, produits et abonnés ;
+- `mois` mois de consommations jusqu'à la date de fin, plus nombreuses le
+  week-end. Abonnés et produits sont tirés selon une loi de Zipf :
+  l'identifiant 1 est le plus actif ;
+- le journal de stock (StockLog) qui va avec : stock initial, une sortie par
+  consommation et une réception quand le stock ne suffit plus ;
+- une facture par abonné et par mois échu, et ses paiements (complets,
+  partiels ou absents) ;
+- les tables dérivées : soldes, cumul journalier des ventes, compteurs de
+  numérotation, relevé de valeur du stock et index de recherche.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from itertools import accumulate
+from flask import Flask
+from sqlalchemy import insert, update, bindparam
+from models import (db, User, ParametresGlobaux, Categorie, Fournisseur, Produit, Abonne, Consommation,
+                    Facture, Paiement, StockLog, SequenceNumero)
+from core import soldes, ventes_journalieres, valorisation
+from core.recherche import installer_index_recherche
+from benchmarks.bench_recherche import NOMS, PRENOMS
+
+ECHELLES = {
+    'petite': {'abonnes': 50, 'produits': 40, 'mois': 2, 'consommations_par_jour': 40},
+    'moyenne': {'abonnes': 500, 'produits': 150, 'mois': 6, 'consommations_par_jour': 300},
+    'grande': {'abonnes': 2000, 'produits': 400, 'mois': 24, 'consommations_par_jour': 800},
+}
+
+# Catégorie -> (produits, prix d'achat possibles)
+CATALOGUE = {
+    'Bière': (['Flag', 'Brakina', 'Castel', 'Beaufort', 'Guinness', 'Sobbra'], [350, 400, 450, 500]),
+    'Sucrerie': (['Coca', 'Fanta', 'Sprite', 'Youzou', 'Top Ananas'], [200, 250, 300]),
+    'Vin': (['Vin rouge', 'Vin blanc', 'Rosé', 'Vin de palme'], [1500, 2500, 4000]),
+    'Spiritueux': (['Whisky', 'Gin', 'Vodka', 'Rhum'], [3000, 6000, 9000]),
+    'Eau': (['Eau minérale', 'Lafi', 'Jirma'], [150, 200, 300]),
+    'Jus': (['Jus bissap', 'Jus gingembre', 'Jus de tamarin', 'Dolo'], [150, 250]),
+    'Snack': (['Arachides', 'Brochettes', 'Chips', 'Poulet braisé'], [300, 500, 1500]),
+}
+TYPES = ['33cl', '50cl', '65cl', '1L', '1.5L', 'canette', 'bouteille', 'portion']
+FOURNISSEURS = ['Brakina', 'SODIBO', 'Castel Burkina', 'Distri Faso', 'Grossiste Zogona',
+                'Marché Rood Woko', 'Import Boissons', 'Lafi SA']
+MODES = {'especes': 6, 'mobile_money': 5, 'cheque': 1, 'carte': 1, 'virement': 1}
+
+
+def _poids_zipf(n, exposant=0.8):
+    return list(accumulate(1 / (i + 1) ** exposant for i in range(n)))
+
+
+def _debut_mois(jour, decalage=0):
+    mois = jour.year * 12 + jour.month - 1 + decalage
+    return date(mois // 12, mois % 12 + 1, 1)
+
+
+class Generateur:
+    """Remplit la base de l'application courante (app_context requis)"""
+
+    def __init__(self, abonnes, produits, mois, consommations_par_jour, graine=42, jusqu_au=None):
+        self.nb_abonnes = abonnes
+        self.nb_produits = produits
+        self.mois = mois
+        self.par_jour = consommations_par_jour
+        self.fin = jusqu_au or date.today()
+        self.debut = _debut_mois(self.fin, -(mois - 1))
+        self.rng = random.Random(graine)
+        self.compteurs = dict.fromkeys(['consommations', 'stock_log', 'factures', 'paiements'], 0)
+        self.sequences = {}
+
+    def _inserer(self, modele, lignes):
+        if lignes:
+            db.session.execute(insert(modele.__table__), lignes)
+
+    # --- Référentiel ---
+    def referentiel(self):
+        rng = self.rng
+        for username, role, nom, mot_de_passe in (('admin', 'admin', 'Administrateur', 'admin123'),
+                                                  ('vendeur', 'vendeur', 'Vendeur', 'vendeur123')):
+            utilisateur = User(username=username, role=role, nom_complet=nom)
+            utilisateur.set_password(mot_de_passe)
+            db.session.add(utilisateur)
+        db.session.add(ParametresGlobaux(nom_cave='Cave Gestion', devise='FCFA', taux_tva_defaut=18.0))
+
+        categories = list(CATALOGUE)
+        self._inserer(Categorie, [{'id': i, 'nom': nom} for i, nom in enumerate(categories, 1)])
+        self._inserer(Fournisseur, [{'id': i, 'nom': nom, 'telephone': f'25{rng.randrange(10 ** 6):06d}'}
+                                    for i, nom in enumerate(FOURNISSEURS, 1)])
+
+        ouverture = datetime.combine(self.debut, datetime.min.time()) - timedelta(days=30)
+        self.produits = []
+        for i in range(1, self.nb_produits + 1):
+            categorie = rng.randrange(len(categories))
+            noms, prix = CATALOGUE[categories[categorie]]
+            prix_achat = float(rng.choice(prix))
+            self.produits.append({
+                'id': i, 'code_produit': f'PRD{i:05d}', 'nom': f'{rng.choice(noms)} {i}', 'type': rng.choice(TYPES),
+                'prix_achat': prix_achat, 'prix_vente': float(round(prix_achat * rng.uniform(1.2, 1.8) / 25) * 25),
+                'stock': rng.randint(60, 240), 'stock_alerte': rng.randint(10, 30),
+                'unite': 'unité', 'categorie_id': categorie + 1 if rng.random() < 0.95 else None,
+                'fournisseur_id': rng.randint(1, len(FOURNISSEURS)) if rng.random() < 0.8 else None,
+                'actif': rng.random() < 0.97, 'date_creation': ouverture,
+            })
+
+        self.abonnes = []
+        for i in range(1, self.nb_abonnes + 1):
+            self.abonnes.append({
+                'id': i, 'numero_abonne': f'ABN{i:05d}', 'nom': rng.choice(NOMS),
+                'prenom': rng.choice(PRENOMS) if rng.random() < 0.9 else None,
+                'telephone': f'7{rng.randrange(10 ** 7):07d}',
+                'date_inscription': ouverture + timedelta(minutes=i), 'actif': rng.random() < 0.95,
+                'limite_credit': float(rng.choice([0, 0, 25000, 50000, 100000])),
+            })
+        self._inserer(Produit, self.produits)
+        self._inserer(Abonne, self.abonnes)
+        self.sequences[('ABN', '')] = self.nb_abonnes
+        self.sequences[('PRD', '')] = self.nb_produits
+
+        # Stock initial : une réception par produit
+        self.stock = {p['id']: p['stock'] for p in self.produits}
+        self._inserer(StockLog, [{
+            'produit_id': p['id'], 'type_mouvement': 'entree', 'quantite': p['stock'], 'stock_avant': 0,
+            'stock_apres': p['stock'], 'date': ouverture, 'utilisateur': 'admin',
+            'commentaire': 'Stock initial', 'reference': f'ENT-{ouverture:%Y%m%d}-{p["id"]}',
+        } for p in self.produits])
+        self.compteurs['stock_log'] += len(self.produits)
+        db.session.flush()
+
+    # --- Consommations, stock, factures, paiements ---
+    def activite(self, progression=None):
+        rng = self.rng
+        poids_abonnes = _poids_zipf(self.nb_abonnes)
+        poids_produits = _poids_zipf(self.nb_produits, 1.0)
+        noms = {a['id']: f"{a['nom']} {a['prenom'] or ''}".strip() for a in self.abonnes}
+        prix = {p['id']: p['prix_vente'] for p in self.produits}
+        conso_id = 0
+        jour = self.debut
+        while jour <= self.fin:
+            consommations, journal = [], []
+            mois = jour.month
+            while jour <= self.fin and jour.month == mois:
+                n = round(self.par_jour * rng.uniform(0.7, 1.3) * (1.4 if jour.weekday() >= 4 else 1))
+                secondes = sorted(rng.randrange(10 * 3600, 24 * 3600) for _ in range(n))
+                abonnes = rng.choices(range(1, self.nb_abonnes + 1), cum_weights=poids_abonnes, k=n)
+                produits = rng.choices(range(1, self.nb_produits + 1), cum_weights=poids_produits, k=n)
+                for seconde, abonne_id, produit_id in zip(secondes, abonnes, produits):
+                    moment = datetime.combine(jour, datetime.min.time()) + timedelta(
+                        seconds=seconde, microseconds=rng.randrange(10 ** 6))
+                    quantite = rng.choices((1, 2, 3, 4, 6), (50, 25, 12, 8, 5))[0]
+                    stock = self.stock[produit_id]
+                    if stock < quantite:
+                        reception = rng.choice((48, 96, 144))
+                        arrivee = moment - timedelta(minutes=1)
+                        journal.append({
+                            'produit_id': produit_id, 'type_mouvement': 'entree', 'quantite': reception,
+                            'stock_avant': stock, 'stock_apres': stock + reception, 'date': arrivee,
+                            'utilisateur': 'admin', 'commentaire': 'Réception de marchandise',
+                            'reference': f'ENT-{arrivee:%Y%m%d%H%M%S}',
+                        })
+                        stock += reception
+                    journal.append({
+                        'produit_id': produit_id, 'type_mouvement': 'sortie', 'quantite': quantite,
+                        'stock_avant': stock, 'stock_apres': stock - quantite, 'date': moment,
+                        'utilisateur': 'vendeur', 'commentaire': f'Vente à {noms[abonne_id]}',
+                    })
+                    self.stock[produit_id] = stock - quantite
+                    conso_id += 1
+                    consommations.append({
+                        'id': conso_id, 'abonne_id': abonne_id, 'produit_id': produit_id, 'quantite': quantite,
+                        'prix_unitaire': prix[produit_id], 'montant_total': quantite * prix[produit_id],
+                        'date': moment, 'facture_id': None, 'note': '',
+                    })
+                jour += timedelta(days=1)
+
+            # Mois échu : facturé au début du mois suivant ; le mois en cours reste ouvert
+            if jour <= self.fin:
+                self._facturer(consommations, _debut_mois(jour))
+            self._inserer(Consommation, consommations)
+            self._inserer(StockLog, journal)
+            self.compteurs['consommations'] += len(consommations)
+            self.compteurs['stock_log'] += len(journal)
+            if progression:
+                progression(mois, dict(self.compteurs))
+
+        produits = Produit.__table__
+        db.session.execute(
+            update(produits).where(produits.c.id == bindparam('pid')).values(stock=bindparam('stock')),
+            [{'pid': pid, 'stock': stock} for pid, stock in self.stock.items()]
+        )
+
+    def _facturer(self, consommations, jour_emission):
+        rng = self.rng
+        totaux = {}
+        for c in consommations:
+            totaux[c['abonne_id']] = totaux.get(c['abonne_id'], 0) + c['montant_total']
+        periode = f'{jour_emission:%Y%m}'
+        fin = datetime.combine(self.fin, datetime.max.time())
+        factures, paiements, ids = [], [], {}
+        for numero, abonne_id in enumerate(sorted(totaux), self.sequences.get(('FAC', periode), 0) + 1):
+            facture_id = self.compteurs['factures'] + len(factures) + 1
+            ids[abonne_id] = facture_id
+            emission = datetime.combine(jour_emission, datetime.min.time()) + timedelta(hours=8, seconds=numero)
+            montant = totaux[abonne_id]
+            paye = 0
+            tirage = rng.random()
+            if tirage < 0.85:
+                versements = [montant] if tirage < 0.65 else [max(100.0, round(montant * rng.uniform(0.3, 0.8), -2))]
+                for versement in versements:
+                    moment = emission + timedelta(days=rng.randint(1, 28), seconds=rng.randrange(36000))
+                    if moment > fin or versement > montant:
+                        continue
+                    mode = rng.choices(list(MODES), list(MODES.values()))[0]
+                    paiements.append({
+                        'facture_id': facture_id, 'montant': versement, 'mode_paiement': mode,
+                        'reference': f'MM{rng.randrange(10 ** 8):08d}' if mode == 'mobile_money' else None,
+                        'date_paiement': moment, 'recu_par': 'admin', 'note': '',
+                    })
+                    paye += versement
+            factures.append({
+                'id': facture_id, 'numero_facture': f'FAC-{periode}-{numero:04d}', 'abonne_id': abonne_id,
+                'montant_ht': montant, 'taux_tva': 18.0, 'montant_tva': 0.0, 'montant_ttc': montant,
+                'statut': 'payee' if paye >= montant else 'partielle' if paye > 0 else 'impayee',
+                'date_emission': emission, 'date_echeance': emission + timedelta(days=30),
+                'created_by_id': 1, 'note': '',
+            })
+            self.sequences[('FAC', periode)] = numero
+        for c in consommations:
+            c['facture_id'] = ids[c['abonne_id']]
+        self._inserer(Facture, factures)
+        self._inserer(Paiement, paiements)
+        self.compteurs['factures'] += len(factures)
+        self.compteurs['paiements'] += len(paiements)
+
+    # --- Tables dérivées ---
+    def derives(self):
+        self._inserer(SequenceNumero, [{'prefixe': prefixe, 'periode': periode, 'valeur': valeur}
+                                       for (prefixe, periode), valeur in sorted(self.sequences.items())])
+        soldes.reconstruire_soldes()
+        ventes_journalieres.reconstruire()
+        db.session.commit()
+        valorisation.enregistrer_releve(self.fin)
+        with db.engine.begin() as conn:
+            installer_index_recherche(conn)
+
+
+def generer(chemin, abonnes, produits, mois, consommations_par_jour, graine=42, jusqu_au=None, progression=None):
+    """Crée la base chemin (qui ne doit pas exister) ; retourne les nombres de lignes"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{os.path.abspath(chemin)}'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        generateur = Generateur(abonnes, produits, mois, consommations_par_jour, graine, jusqu_au)
+        generateur.referentiel()
+        generateur.activite(progression)
+        generateur.derives()
+        db.session.remove()
+        db.engine.dispose()
+    return {'abonnes': abonnes, 'produits': produits, **generateur.compteurs}
+
+
+def parametres_echelle(echelle, **surcharges):
+    """Paramètres d'une échelle nommée, surchargés par les valeurs non nulles"""
+    return {**ECHELLES[echelle], **{cle: v for cle, v in surcharges.items() if v is not None}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sortie', required=True, help="Fichier SQLite à créer")
+    parser.add_argument('--echelle', choices=ECHELLES, default='moyenne')
+    parser.add_argument('--abonnes', type=int)
+    parser.add_argument('--produits', type=int)
+    parser.add_argument('--mois', type=int)
+    parser.add_argument('--consommations-par-jour', type=int)
+    parser.add_argument('--graine', type=int, default=42)
+    parser.add_argument('--jusqu-au', type=date.fromisoformat, help="Dernier jour (AAAA-MM-JJ), aujourd'hui par défaut")
+    parser.add_argument('--ecraser', action='store_true', help="Remplace le fichier s'il existe")
+    args = parser.parse_args()
+
+    if os.path.exists(args.sortie):
+        if not args.ecraser:
+            sys.exit(f"✗ {args.sortie} existe déjà (--ecraser pour le remplacer)")
+        os.remove(args.sortie)
+
+    parametres = parametres_echelle(args.echelle, abonnes=args.abonnes, produits=args.produits, mois=args.mois,
+                                    consommations_par_jour=args.consommations_par_jour)
+    debut = time.perf_counter()
+    compteurs = generer(args.sortie, graine=args.graine, jusqu_au=args.jusqu_au,
+                        progression=lambda mois, c: print(f"  mois {mois:02d}: {c['consommations']} consommation(s)"),
+                        **parametres)
+    print(f"✓ {args.sortie} généré en {time.perf_counter() - debut:.1f}s : "
+          + ', '.join(f'{n} {table}' for table, n in compteurs.items()))
+
+
+if __name__ == '__main__':
+    main()
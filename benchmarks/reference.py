@@ -0,0 +1,113 @@
+# benchmarks/reference.py
+"""Compare deux références de bench_endpoints et signale les régressions.
+
+Usage : python -m benchmarks.reference ancienne.json nouvelle.json [--seuil 1.25] [--marge-ms 2]
+
+Une référence est le fichier JSON écrit par bench_endpoints --sortie :
+{"meta": {...}, "echelles": {echelle: {"parametres": {...}, "endpoints":
+{"GET /api/...": {"status", "ms_froid", "ms_min", "ms_median", "requetes",
+"octets"}}}}}. Un endpoint régresse si sa médiane dépasse l'ancienne de plus
+de --seuil (et d'au moins --marge-ms : les endpoints de quelques
+millisecondes sont bruités), s'il exécute plus de requêtes SQL ou si son
+code de statut change. Le programme échoue (code 1) en cas de régression.
+"""
+import argparse
+import json
+import platform
+import sqlite3
+import subprocess
+import sys
+from datetime import datetime
+import sqlalchemy
+
+SEUIL = 1.25
+MARGE_MS = 2.0
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def ecrire(chemin, echelles):
+    """Écrit la référence {echelle: {"parametres", "endpoints"}} et son contexte"""
+    reference = {
+        'meta': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'commit': _commit(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'sqlalchemy': sqlalchemy.__version__,
+        },
+        'echelles': echelles,
+    }
+    with open(chemin, 'w', encoding='utf-8') as f:
+        json.dump(reference, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def charger(chemin):
+    with open(chemin, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def comparer(ancienne, nouvelle, seuil=SEUIL, marge_ms=MARGE_MS):
+    """Liste des écarts (echelle, endpoint, motif, regression) ; les
+    endpoints ou échelles présents d'un seul côté sont signalés sans être
+    des régressions"""
+    ecarts = []
+    for echelle, apres in nouvelle['echelles'].items():
+        avant = ancienne['echelles'].get(echelle)
+        if avant is None:
+            ecarts.append((echelle, '*', 'échelle absente de l\'ancienne référence', False))
+            continue
+        if avant['parametres'] != apres['parametres']:
+            ecarts.append((echelle, '*', 'paramètres de données différents : comparaison indicative', False))
+        for nom, mesure in apres['endpoints'].items():
+            ancien = avant['endpoints'].get(nom)
+            if ancien is None:
+                ecarts.append((echelle, nom, 'nouvel endpoint', False))
+                continue
+            if mesure['status'] != ancien['status']:
+                ecarts.append((echelle, nom, f"statut {ancien['status']} -> {mesure['status']}", True))
+            if mesure['requetes'] > ancien['requetes']:
+                ecarts.append((echelle, nom, f"requêtes SQL {ancien['requetes']} -> {mesure['requetes']}", True))
+            if (mesure['ms_median'] > ancien['ms_median'] * seuil
+                    and mesure['ms_median'] - ancien['ms_median'] >= marge_ms):
+                ecarts.append((echelle, nom, f"médiane {ancien['ms_median']:.1f} -> {mesure['ms_median']:.1f} ms "
+                                             f"(x{mesure['ms_median'] / max(ancien['ms_median'], 1e-3):.2f})", True))
+        for nom in avant['endpoints'].keys() - apres['endpoints'].keys():
+            ecarts.append((echelle, nom, 'endpoint disparu', False))
+    return ecarts
+
+
+def afficher(ecarts):
+    if not ecarts:
+        print("✓ Aucun écart")
+        return
+    for echelle, nom, motif, regression in ecarts:
+        print(f"{'✗' if regression else '·'} [{echelle}] {nom} : {motif}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('ancienne')
+    parser.add_argument('nouvelle')
+    parser.add_argument('--seuil', type=float, default=SEUIL)
+    parser.add_argument('--marge-ms', type=float, default=MARGE_MS)
+    args = parser.parse_args()
+
+    ancienne, nouvelle = charger(args.ancienne), charger(args.nouvelle)
+    print(f"{ancienne['meta'].get('commit') or '?'} ({ancienne['meta']['date']}) -> "
+          f"{nouvelle['meta'].get('commit') or '?'} ({nouvelle['meta']['date']})")
+    ecarts = comparer(ancienne, nouvelle, args.seuil, args.marge_ms)
+    afficher(ecarts)
+    if any(regression for *_, regression in ecarts):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
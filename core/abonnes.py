@@ -1,8 +1,9 @@
 # core/abonnes.py
-from core.crud import create, read, update, log_action
+from core.crud import create, read, update, log_action, operation
 from core.ventes import _facture_active
 
 # --- Créer un nouvel abonné ---
+@operation
 def creer_abonne(nom, telephone=None, utilisateur_id=None):
     data = {
         "nom": nom,
@@ -21,6 +22,7 @@ def rechercher_abonne(critere):
     return resultats
 
 # --- Mettre à jour les infos d’un abonné ---
+@operation
 def modifier_abonne(abonne_id, nom=None, telephone=None, utilisateur_id=None):
     data = {}
     if nom: data["nom"] = nom
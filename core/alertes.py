@@ -0,0 +1,81 @@
+# core/alertes.py
+"""Flux des alertes de stock.
+
+Chaque écriture qui fait passer un produit actif sous son seuil d'alerte
+(stock <= stock_alerte), ou l'en fait ressortir, ajoute un événement dans
+alerte_stock, dans la même transaction. Les clients interrogent le flux avec
+le dernier identifiant reçu (curseur) au lieu de relire le catalogue.
+SQLite n'ayant qu'un écrivain à la fois, les identifiants deviennent visibles
+dans l'ordre : un curseur ne saute aucun événement.
+"""
+from sqlalchemy import select, func
+from models import db, Produit, AlerteStock
+from core import evenements
+
+LIMITE_FLUX = 100
+
+
+def _critique(stock, stock_alerte, actif):
+    return bool(actif) and stock <= stock_alerte
+
+
+def seuil_franchi(produit_id, critique_avant, critique_apres, stock, stock_alerte):
+    """Enregistre l'événement si l'état critique a changé"""
+    if critique_avant == critique_apres:
+        return None
+    alerte = AlerteStock(
+        produit_id=produit_id,
+        type='critique' if critique_apres else 'normal',
+        stock=stock,
+        stock_alerte=stock_alerte
+    )
+    db.session.add(alerte)
+    evenements.publier('stock', 'alerte', {
+        'produit_id': produit_id, 'type': alerte.type, 'stock': stock, 'stock_alerte': stock_alerte
+    })
+    return alerte
+
+
+def stock_modifie(produit_id, stock_avant, stock_apres, stock_alerte, actif):
+    """Mouvement de stock (core/stock.py)"""
+    return seuil_franchi(produit_id, _critique(stock_avant, stock_alerte, actif),
+                         _critique(stock_apres, stock_alerte, actif), stock_apres, stock_alerte)
+
+
+def etat_produit(produit):
+    """État critique courant d'un objet Produit, à comparer après modification"""
+    return _critique(produit.stock, produit.stock_alerte, produit.actif)
+
+
+def produit_modifie(produit, critique_avant):
+    """Modification directe d'un produit (stock, seuil, activation)"""
+    return seuil_franchi(produit.id, critique_avant, etat_produit(produit),
+                         produit.stock, produit.stock_alerte)
+
+
+def dernier_curseur():
+    return db.session.execute(select(func.max(AlerteStock.id))).scalar() or 0
+
+
+def flux(depuis=0, limite=LIMITE_FLUX):
+    """Événements d'identifiant > depuis, du plus ancien au plus récent"""
+    lignes = db.session.execute(
+        select(AlerteStock.id, AlerteStock.produit_id, AlerteStock.type, AlerteStock.stock,
+               AlerteStock.stock_alerte, AlerteStock.date, Produit.nom, Produit.unite)
+        .join(Produit, Produit.id == AlerteStock.produit_id)
+        .where(AlerteStock.id > depuis)
+        .order_by(AlerteStock.id)
+        .limit(limite + 1)
+    ).all()
+    suite = len(lignes) > limite
+    evenements = [{
+        'id': l.id,
+        'produit_id': l.produit_id,
+        'produit': l.nom,
+        'unite': l.unite,
+        'type': l.type,
+        'stock': l.stock,
+        'stock_alerte': l.stock_alerte,
+        'date': l.date.isoformat(),
+    } for l in lignes[:limite]]
+    return evenements, (evenements[-1]['id'] if evenements else depuis), suite
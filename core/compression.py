@@ -0,0 +1,75 @@
+# core/compression.py
+"""Compression gzip des réponses, négociée sur Accept-Encoding.
+
+Les réponses textuelles (JSON, HTML, CSS, JS) d'au moins COMPRESSION_TAILLE_MIN
+octets sont compressées au niveau COMPRESSION_NIVEAU. Une réponse produite par
+morceaux (générateur) est compressée au fil de l'eau : chaque morceau est
+vidé (Z_SYNC_FLUSH) pour partir aussitôt, sans attendre la fin du corps. Le
+flux d'événements (text/event-stream) et les fichiers envoyés tels quels
+(statiques, send_file) ne sont pas touchés.
+"""
+import zlib
+from flask import request
+
+NIVEAU_DEFAUT = 6
+TAILLE_MIN_DEFAUT = 1024    # octets ; en dessous, l'en-tête gzip coûte plus qu'il ne gagne
+
+TYPES_COMPRESSIBLES = ('application/json', 'text/html', 'text/css', 'text/plain',
+                       'text/csv', 'application/javascript', 'text/javascript')
+
+
+def _compresseur(niveau):
+    # wbits 16 + MAX_WBITS : en-tête et somme de contrôle gzip
+    return zlib.compressobj(niveau, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+
+def _flux_compresse(source, niveau):
+    compresseur = _compresseur(niveau)
+    try:
+        for morceau in source:
+            if isinstance(morceau, str):
+                morceau = morceau.encode()
+            if morceau:
+                yield compresseur.compress(morceau) + compresseur.flush(zlib.Z_SYNC_FLUSH)
+        yield compresseur.flush()
+    finally:
+        # Fermeture du générateur d'origine (stream_with_context, curseurs...)
+        if hasattr(source, 'close'):
+            source.close()
+
+
+def _compressible(reponse):
+    if reponse.status_code < 200 or reponse.status_code in (204, 206, 304):
+        return False
+    if reponse.direct_passthrough or 'Content-Encoding' in reponse.headers:
+        return False
+    return reponse.mimetype in TYPES_COMPRESSIBLES
+
+
+def installer_compression(app):
+    """Enregistre la compression sur l'application (config COMPRESSION_*)"""
+    app.config.setdefault('COMPRESSION_NIVEAU', NIVEAU_DEFAUT)
+    app.config.setdefault('COMPRESSION_TAILLE_MIN', TAILLE_MIN_DEFAUT)
+
+    @app.after_request
+    def compresser(reponse):
+        if not _compressible(reponse):
+            return reponse
+        reponse.vary.add('Accept-Encoding')
+        if request.method == 'HEAD' or not request.accept_encodings['gzip']:
+            return reponse
+
+        niveau = app.config['COMPRESSION_NIVEAU']
+        if reponse.is_streamed:
+            reponse.response = _flux_compresse(reponse.response, niveau)
+            reponse.headers.pop('Content-Length', None)
+        else:
+            donnees = reponse.get_data()
+            if len(donnees) < app.config['COMPRESSION_TAILLE_MIN']:
+                return reponse
+            compresseur = _compresseur(niveau)
+            reponse.set_data(compresseur.compress(donnees) + compresseur.flush())
+        reponse.headers['Content-Encoding'] = 'gzip'
+        return reponse
+
+    return compresser
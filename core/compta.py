@@ -1,8 +1,9 @@
 # core/compta.py
 from datetime import datetime
-from core.crud import create, read, update, log_action
+from core.crud import create, read, update, log_action, operation
 
 # --- Enregistrer une recette (entrée d’argent) ---
+@operation
 def enregistrer_recette(montant, reference, description="", utilisateur_id=None):
     data = {
         "date_operation": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
@@ -15,6 +16,7 @@ def enregistrer_recette(montant, reference, description="", utilisateur_id=None)
     log_action(utilisateur_id, "RECETTE", f"{montant} enregistré ({reference})")
 
 # --- Enregistrer une dépense (sortie d’argent) ---
+@operation
 def enregistrer_depense(montant, reference, description="", utilisateur_id=None):
     data = {
         "date_operation": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
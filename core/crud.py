@@ -2,7 +2,12 @@
 import sqlite3
 import os
 import hashlib
+import threading
+from contextlib import contextmanager
+from functools import wraps
 from datetime import datetime
+from core.journal import INSERT_JOURNAL, creer_ecrivain
+from core.numerotation import allouer_sqlite, creer_table_sqlite
 
 DB_PATH = os.path.join("database", "app.db")
 
@@ -12,22 +17,86 @@ TABLES_VALIDES = [
     "paiements", "fournisseurs", "compta", "mouvements_stock", "journal_log"
 ]
 
-# --- Utilitaires ---
+# --- Connexions ---
+_local = threading.local()
+_journal = None
+
 def connect_db():
     return sqlite3.connect(DB_PATH)
 
+def connexion():
+    """Connexion du thread courant, ouverte une seule fois puis réutilisée"""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = connect_db()
+        conn.row_factory = sqlite3.Row
+        creer_table_sqlite(conn)
+        _local.conn = conn
+        _local.profondeur = 0
+        _local.journal_en_attente = []
+    return conn
+
+def fermer_connexion():
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+@contextmanager
+def transaction():
+    """Regroupe une opération métier dans une seule transaction.
+    Les appels imbriqués réutilisent la transaction englobante :
+    seul le niveau le plus externe valide (ou annule)."""
+    conn = connexion()
+    _local.profondeur += 1
+    try:
+        yield conn
+        if _local.profondeur == 1:
+            conn.commit()
+            # Le journal différé n'est transmis qu'une fois la transaction validée
+            lignes, _local.journal_en_attente = _local.journal_en_attente, []
+            if lignes:
+                journal().ecrire(lignes)
+    except Exception:
+        if _local.profondeur == 1:
+            conn.rollback()
+            _local.journal_en_attente = []
+        raise
+    finally:
+        _local.profondeur -= 1
+
+def operation(fonction):
+    """Exécute une fonction métier dans une seule transaction"""
+    @wraps(fonction)
+    def wrapper(*args, **kwargs):
+        with transaction():
+            return fonction(*args, **kwargs)
+    return wrapper
+
+# --- Utilitaires ---
 def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
 
-def log_action(utilisateur_id, action, description, statut="succes"):
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO journal_log (utilisateur_id, action, description, statut)
-        VALUES (?, ?, ?, ?)
-    """, (utilisateur_id, action, description, statut))
-    conn.commit()
-    conn.close()
+def journal():
+    """Écrivain différé du journal (démarré au premier usage)"""
+    global _journal
+    if _journal is None:
+        _journal = creer_ecrivain(connect_db)
+    return _journal
+
+def log_action(utilisateur_id, action, description, statut="succes", sync=False):
+    """Journalise une action.
+    Par défaut l'écriture est différée et groupée (core/journal.py) ; avec
+    sync=True la ligne est écrite dans la transaction en cours, donc durable
+    dès sa validation."""
+    ligne = (utilisateur_id, action, description, statut)
+    if sync:
+        with transaction() as conn:
+            conn.execute(INSERT_JOURNAL, ligne)
+    elif getattr(_local, "profondeur", 0):
+        _local.journal_en_attente.append(ligne)
+    else:
+        journal().ecrire([ligne])
 
 def _valider_table_colonnes(table, colonnes):
     if table not in TABLES_VALIDES:
@@ -40,20 +109,24 @@ def _valider_table_colonnes(table, colonnes):
 def generer_numero(table):
     _valider_table_colonnes(table, [])
     prefix = {"abonnes": "ABN", "factures": "FAC"}.get(table, "GEN")
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute(f"SELECT COUNT(*) FROM {table}")
-    n = cur.fetchone()[0] + 1
-    conn.close()
     if table == "factures":
-        return f"{prefix}-{datetime.now().year}-{n:04d}"
+        periode = str(datetime.now().year)
+    elif prefix == "GEN":
+        periode = table     # un compteur par table sous le préfixe commun
+    else:
+        periode = ""
+    # Amorce du compteur sur une base existante : ancien calcul par COUNT(*)
+    amorce = lambda: connexion().execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    with transaction() as conn:
+        n = allouer_sqlite(conn, prefix, periode, amorce)
+    if table == "factures":
+        return f"{prefix}-{periode}-{n:04d}"
     return f"{prefix}-{n:05d}"
 
 # --- CRUD principal ---
 def create(table, data, utilisateur_id=None):
     _valider_table_colonnes(table, data.keys())
-    conn = connect_db()
-    try:
+    with transaction() as conn:
         cur = conn.cursor()
 
         # numéros automatiques
@@ -76,60 +149,33 @@ def create(table, data, utilisateur_id=None):
             _maj_facture_et_compta(conn, cur, data["facture_id"], data["montant"], data["mode"], utilisateur_id)
 
         log_action(utilisateur_id, f"CREATE:{table}", f"Insertion dans {table} ID={inserted_id}")
-        conn.commit()
         return inserted_id
 
-    except Exception as e:
-        conn.rollback()
-        raise e
-    finally:
-        conn.close()
-
 def read(table, conditions=None):
     _valider_table_colonnes(table, conditions.keys() if conditions else [])
-    conn = connect_db()
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
+    cur = connexion().cursor()
     if conditions:
         clause = " AND ".join([f"{k}=?" for k in conditions.keys()])
         cur.execute(f"SELECT * FROM {table} WHERE {clause}", tuple(conditions.values()))
     else:
         cur.execute(f"SELECT * FROM {table}")
-    rows = [dict(row) for row in cur.fetchall()]
-    conn.close()
-    return rows
+    return [dict(row) for row in cur.fetchall()]
 
 def update(table, data, conditions, utilisateur_id=None):
     _valider_table_colonnes(table, list(data.keys()) + list(conditions.keys()))
-    conn = connect_db()
-    try:
-        cur = conn.cursor()
+    with transaction() as conn:
         champs = ", ".join([f"{k}=?" for k in data.keys()])
         conds = " AND ".join([f"{k}=?" for k in conditions.keys()])
-        cur.execute(f"UPDATE {table} SET {champs} WHERE {conds}",
-                    tuple(data.values()) + tuple(conditions.values()))
+        conn.execute(f"UPDATE {table} SET {champs} WHERE {conds}",
+                     tuple(data.values()) + tuple(conditions.values()))
         log_action(utilisateur_id, f"UPDATE:{table}", f"Mise à jour {conditions}")
-        conn.commit()
-    except Exception as e:
-        conn.rollback()
-        raise e
-    finally:
-        conn.close()
 
 def delete(table, conditions, utilisateur_id=None):
     _valider_table_colonnes(table, list(conditions.keys()))
-    conn = connect_db()
-    try:
-        cur = conn.cursor()
+    with transaction() as conn:
         conds = " AND ".join([f"{k}=?" for k in conditions.keys()])
-        cur.execute(f"DELETE FROM {table} WHERE {conds}", tuple(conditions.values()))
+        conn.execute(f"DELETE FROM {table} WHERE {conds}", tuple(conditions.values()))
         log_action(utilisateur_id, f"DELETE:{table}", f"Suppression {conditions}")
-        conn.commit()
-    except Exception as e:
-        conn.rollback()
-        raise e
-    finally:
-        conn.close()
 
 # --- Automatismes internes ---
 def _maj_stock_apres_vente(conn, cur, produit_id, quantite, utilisateur_id):
@@ -148,4 +194,4 @@ def _maj_stock_apres_vente(conn, cur, produit_id, quantite, utilisateur_id):
 
 def _maj_facture_et_compta(conn, cur, facture_id, montant, mode, utilisateur_id):
     cur.execute("UPDATE factures SET statut='payee' WHERE id=?", (facture_id,))
-    log_action(utilisateur_id, "PAIEMENT", f"Facture {facture_id} réglée ({montant} {mode})")
+    log_action(utilisateur_id, "PAIEMENT", f"Facture {facture_id} réglée ({montant} {mode})", sync=True)
@@ -0,0 +1,110 @@
+# core/evenements.py
+"""Bus d'événements en mémoire pour le flux SSE (/api/events).
+
+Les chemins d'écriture annoncent leurs changements avec publier() : les
+événements sont gardés dans la session et diffusés seulement quand la
+transaction est validée (oubliés si elle est annulée). Chaque événement reçoit
+un identifiant croissant et reste dans un tampon circulaire de TAILLE_TAMPON
+entrées ; un client qui se reconnecte avec Last-Event-ID rejoue ce qu'il a
+manqué, ou reçoit un événement 'reset' si le tampon ne remonte plus assez
+loin. Le bus est propre au processus : avec plusieurs workers, chacun ne voit
+que ses propres écritures.
+"""
+import json
+import threading
+from collections import deque
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from models import db
+
+SUJETS = ('consommations', 'stock', 'paiements', 'factures')
+TAILLE_TAMPON = 1000
+INTERVALLE_PING = 15    # secondes entre deux commentaires de maintien
+
+_tampon = deque(maxlen=TAILLE_TAMPON)
+_condition = threading.Condition()
+_etat = {'dernier_id': 0}
+
+
+def _serialiser(valeur):
+    if isinstance(valeur, datetime):
+        return valeur.isoformat()
+    raise TypeError(f'Type non sérialisable: {type(valeur).__name__}')
+
+
+# --- Publication ---
+def diffuser(evenements):
+    """Ajoute au tampon et réveille les abonnés ; evenements : [(sujet, type, data)]"""
+    if not evenements:
+        return
+    with _condition:
+        for sujet, type_evenement, data in evenements:
+            _etat['dernier_id'] += 1
+            _tampon.append((_etat['dernier_id'], sujet, json.dumps(
+                {'type': type_evenement, 'data': data}, default=_serialiser, ensure_ascii=False
+            )))
+        _condition.notify_all()
+
+
+def publier(sujet, type_evenement, data):
+    """Événement diffusé à la validation de la transaction courante"""
+    db.session.info.setdefault('evenements', []).append((sujet, type_evenement, data))
+
+
+@event.listens_for(Session, 'after_commit')
+def _diffuser(session):
+    diffuser(session.info.pop('evenements', None))
+
+
+@event.listens_for(Session, 'after_rollback')
+def _oublier(session):
+    session.info.pop('evenements', None)
+
+
+# --- Abonnement ---
+def dernier_id():
+    with _condition:
+        return _etat['dernier_id']
+
+
+def _depuis(curseur, sujets):
+    """Événements d'identifiant > curseur ; None si le tampon a perdu la suite"""
+    if _tampon and curseur < _tampon[0][0] - 1:
+        return None
+    return [e for e in _tampon if e[0] > curseur and e[1] in sujets]
+
+
+def _trame(id_evenement, sujet, donnees):
+    return f'id: {id_evenement}\nevent: {sujet}\ndata: {donnees}\n\n'
+
+
+def abonner(sujets=SUJETS, curseur=None, arret=None):
+    """Générateur de trames SSE pour les sujets demandés.
+
+    curseur : Last-Event-ID du client (None = seulement les nouveaux
+    événements). arret : threading.Event optionnel pour terminer le flux."""
+    sujets = frozenset(sujets)
+    with _condition:
+        if curseur is None or curseur > _etat['dernier_id']:
+            # Nouveau client, ou identifiant d'un processus précédent
+            if curseur is not None:
+                yield _trame(_etat['dernier_id'], 'reset', '{}')
+            curseur = _etat['dernier_id']
+    yield 'retry: 3000\n\n'
+
+    while arret is None or not arret.is_set():
+        with _condition:
+            evenements = _depuis(curseur, sujets)
+            if evenements == [] and _etat['dernier_id'] == curseur:
+                _condition.wait(INTERVALLE_PING)
+                evenements = _depuis(curseur, sujets)
+            dernier = _etat['dernier_id']
+
+        if evenements is None:
+            yield _trame(dernier, 'reset', '{}')
+        elif evenements:
+            yield ''.join(_trame(*e) for e in evenements)
+        elif dernier == curseur:
+            yield ': ping\n\n'
+        curseur = dernier
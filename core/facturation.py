@@ -0,0 +1,121 @@
+# core/facturation.py
+"""Facturation de fin de mois par lots.
+
+Une facture par abonné actif ayant des consommations non facturées jusqu'à
+la date limite. Chaque lot d'abonnés est traité dans sa propre transaction,
+entièrement en SQL ensembliste : insertion groupée des factures, rattachement
+des consommations par un seul UPDATE ... FROM, totaux par SUM.
+"""
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, insert, func
+from models import db, Abonne, Consommation, Facture
+from core import soldes, numerotation, evenements
+
+TAILLE_LOT = 200
+
+
+def abonnes_a_facturer(date_limite):
+    """[(abonne_id, nb_lignes)] des abonnés actifs à facturer"""
+    return db.session.execute(
+        select(Consommation.abonne_id, func.count())
+        .join(Abonne, Abonne.id == Consommation.abonne_id)
+        .where(Consommation.facture_id.is_(None),
+               Consommation.date <= date_limite,
+               Abonne.actif == True)
+        .group_by(Consommation.abonne_id)
+        .order_by(Consommation.abonne_id)
+    ).all()
+
+
+def _facturer_lot(abonne_ids, date_limite, date_echeance, createur_id, note):
+    """Crée les factures d'un lot d'abonnés ; retourne (ids factures, nb lignes)"""
+    # Verrou d'écriture pris d'entrée, y compris hors requête HTTP (CLI)
+    db.session.connection(execution_options={'ecriture': True})
+    # La liste a été lue avant les lots : ne garder que les abonnés ayant
+    # encore des lignes non facturées (une autre écriture a pu les facturer)
+    abonne_ids = db.session.execute(
+        select(Consommation.abonne_id).distinct()
+        .where(Consommation.abonne_id.in_(abonne_ids),
+               Consommation.facture_id.is_(None),
+               Consommation.date <= date_limite)
+        .order_by(Consommation.abonne_id)
+    ).scalars().all()
+    if not abonne_ids:
+        return [], 0
+    numeros = numerotation.numeros_factures(len(abonne_ids))
+    maintenant = datetime.utcnow()
+    lignes = db.session.execute(
+        insert(Facture).returning(Facture.id, sort_by_parameter_order=True),
+        [{
+            'numero_facture': numero,
+            'abonne_id': abonne_id,
+            'date_emission': maintenant,
+            'date_echeance': date_echeance,
+            'created_by_id': createur_id,
+            'statut': 'impayee',
+            'note': note
+        } for numero, abonne_id in zip(numeros, abonne_ids)]
+    ).scalars().all()
+
+    # Rattachement des consommations (UPDATE ... FROM facture)
+    rattachees = db.session.execute(
+        update(Consommation)
+        .where(Consommation.abonne_id == Facture.abonne_id,
+               Facture.id.in_(lignes),
+               Consommation.facture_id.is_(None),
+               Consommation.date <= date_limite)
+        .values(facture_id=Facture.id),
+        execution_options={'synchronize_session': False}
+    ).rowcount
+
+    # Totaux calculés par SQL (même règle que Facture.calculer_montants)
+    total = (select(func.coalesce(func.sum(Consommation.montant_total), 0))
+             .where(Consommation.facture_id == Facture.id)
+             .scalar_subquery())
+    db.session.execute(
+        update(Facture)
+        .where(Facture.id.in_(lignes))
+        .values(montant_ht=total, montant_ttc=total),
+        execution_options={'synchronize_session': False}
+    )
+    soldes.factures_creees(lignes)
+    evenements.publier('factures', 'lot', {'facture_ids': lignes, 'abonne_ids': abonne_ids})
+    evenements.publier('consommations', 'facturation', {'abonne_ids': abonne_ids})
+    return lignes, rattachees
+
+
+def facturer_periode(date_limite, date_echeance=None, createur_id=None, note='',
+                     taille_lot=TAILLE_LOT, progression=None):
+    """Facture toutes les consommations non facturées jusqu'à date_limite (incluse).
+    progression(rapport) est appelée après chaque lot validé."""
+    date_echeance = date_echeance or datetime.now() + timedelta(days=30)
+    debut = time.perf_counter()
+    a_facturer = abonnes_a_facturer(date_limite)
+    db.session.commit()
+
+    rapport = {
+        'abonnes_total': len(a_facturer),
+        'abonnes_traites': 0,
+        'factures_creees': 0,
+        'lignes_facturees': 0,
+        'lots': 0,
+        'duree': 0.0,
+    }
+    for i in range(0, len(a_facturer), taille_lot):
+        abonne_ids = [abonne_id for abonne_id, _ in a_facturer[i:i + taille_lot]]
+        try:
+            factures, lignes = _facturer_lot(abonne_ids, date_limite, date_echeance, createur_id, note)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        rapport['abonnes_traites'] += len(abonne_ids)
+        rapport['factures_creees'] += len(factures)
+        rapport['lignes_facturees'] += lignes
+        rapport['lots'] += 1
+        rapport['duree'] = time.perf_counter() - debut
+        if progression:
+            progression(dict(rapport))
+    rapport['duree'] = time.perf_counter() - debut
+    return rapport
@@ -1,9 +1,10 @@
 # core/fournisseurs.py
 from datetime import datetime
-from core.crud import create, read, update, log_action
+from core.crud import create, read, update, log_action, operation
 from core.produits import _mouvement_stock
 
 # --- Créer un fournisseur ---
+@operation
 def creer_fournisseur(nom, contact=None, utilisateur_id=None):
     data = {
         "nom": nom,
@@ -18,6 +19,7 @@ def lister_fournisseurs():
     return read("fournisseurs")
 
 # --- Modifier un fournisseur ---
+@operation
 def modifier_fournisseur(fournisseur_id, nom=None, contact=None, utilisateur_id=None):
     data = {}
     if nom: data["nom"] = nom
@@ -27,6 +29,7 @@ def modifier_fournisseur(fournisseur_id, nom=None, contact=None, utilisateur_id=
     log_action(utilisateur_id, "FOURNISSEUR_UPDATE", f"Fournisseur {fournisseur_id} mis à jour")
 
 # --- Enregistrer une livraison de produits ---
+@operation
 def enregistrer_livraison(fournisseur_id, produit_id, quantite, prix_achat_unitaire, utilisateur_id=None):
     """Ajoute du stock + mouvement + enregistrement achat"""
     total = quantite * prix_achat_unitaire
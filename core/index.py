@@ -0,0 +1,112 @@
+# core/index.py
+import re
+from sqlalchemy import event
+from models import db, User
+
+# --- Requêtes des endpoints contrôlées par verifier_plans ---
+# Toutes les routes GET de l'application sont appelées (identifiants = 1),
+# sauf celles-ci : connexion et flux SSE sans fin
+ROUTES_EXCLUES = {'static', 'index', 'login', 'logout', 'evenements.flux_evenements'}
+
+# Variantes de paramètres des routes GET (filtres, recherche, répartitions...)
+VARIANTES = [
+    '/api/abonnes?actif=false',
+    '/api/abonnes?recherche=tra',
+    '/api/abonnes/1/historique?total=true',
+    '/api/consommations?abonne_id=1&total=true',
+    '/api/consommations?abonne_id=1',
+    '/api/consommations?produit_id=1',
+    '/api/consommations?date_debut=2024-01-01&date_fin=2024-01-31',
+    '/api/consommations?facturees=false',
+    '/api/consommations/statistiques?date_debut=2024-01-01&date_fin=2024-01-31',
+    '/api/factures?statut=impayee',
+    '/api/factures?abonne_id=1',
+    '/api/factures?date_debut=2024-01-01&date_fin=2024-01-31',
+    '/api/paiements?facture_id=1',
+    '/api/paiements?mode_paiement=especes',
+    '/api/paiements?date_debut=2024-01-01&date_fin=2024-01-31',
+    '/api/paiements/statistiques?date_debut=2024-01-01&date_fin=2024-01-31',
+    '/api/paiements/series?pas=mois&date_debut=2024-01-01&date_fin=2024-12-31',
+    '/api/produits?stock_critique=true',
+    '/api/produits?recherche=fla',
+    '/api/stock/mouvements?produit_id=1',
+    '/api/stock/mouvements?date_debut=2024-01-01&date_fin=2024-01-31',
+    '/api/stock/alertes/flux?depuis=1',
+    '/api/stock/valeur?par=categorie',
+    '/api/stock/valeur?par=fournisseur',
+    '/api/stock/valeur/historique?date_debut=2024-01-01&date_fin=2024-01-31',
+]
+
+_PARAMETRE = re.compile(r'<(?:\w+:)?\w+>')
+
+
+def endpoints_verifies(app):
+    """URLs contrôlées : chaque route GET de app.url_map, puis les variantes"""
+    urls = [_PARAMETRE.sub('1', regle.rule)
+            for regle in sorted(app.url_map.iter_rules(), key=lambda r: r.rule)
+            if 'GET' in regle.methods and regle.endpoint not in ROUTES_EXCLUES]
+    return urls + VARIANTES
+
+# "SCAN produit" (ou "SCAN TABLE produit" selon la version de SQLite),
+# sans index : parcours complet de la table
+SCAN_COMPLET = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$')
+
+# --- Création idempotente des index ---
+def creer_index_manquants():
+    """Crée les index déclarés dans models.py absents d'une base existante.
+    db.create_all() ne crée les index qu'avec leur table."""
+    crees = []
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                existe = conn.exec_driver_sql(
+                    "SELECT 1 FROM sqlite_master WHERE type='index' AND name=?", (index.name,)
+                ).first()
+                if not existe:
+                    index.create(conn)
+                    crees.append(index.name)
+    return crees
+
+# --- Contrôle des plans d'exécution ---
+def verifier_plans(app, endpoints=None):
+    """Appelle chaque endpoint (par défaut endpoints_verifies(app)), passe ses
+    requêtes SELECT à EXPLAIN QUERY PLAN et retourne la liste des parcours
+    complets de table [(url, table, sql)] ; une variante refusée (400) est
+    signalée avec table=None."""
+    endpoints = endpoints or endpoints_verifies(app)
+    requetes = []
+
+    def capturer(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and not executemany:
+            requetes.append((statement, parameters))
+
+    with app.app_context():
+        admin = User.query.filter_by(role='admin').first()
+        if admin is None:
+            raise RuntimeError("Aucun administrateur : initialisez la base d'abord")
+        engine = db.engine
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(admin.id)
+        session['_fresh'] = True
+
+    problemes = []
+    event.listen(engine, 'before_cursor_execute', capturer)
+    try:
+        for url in endpoints:
+            requetes.clear()
+            statut = client.get(url).status_code
+            if statut == 400:       # paramètres refusés : la variante ne contrôle rien
+                problemes.append((url, None, f'réponse HTTP {statut}'))
+            with engine.connect() as conn:
+                for statement, parameters in list(requetes):
+                    plan = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+                    for ligne in plan:
+                        scan = SCAN_COMPLET.match(ligne[-1])
+                        # Le parcours d'une sous-requête déjà agrégée n'est pas celui d'une table
+                        if scan and scan.group(1) in db.metadata.tables:
+                            problemes.append((url, scan.group(1), statement))
+    finally:
+        event.remove(engine, 'before_cursor_execute', capturer)
+    return problemes
@@ -0,0 +1,145 @@
+# core/journal.py
+"""Écriture différée du journal (journal_log) par un thread dédié.
+
+Les lignes sont placées dans une file bornée puis écrites par lots
+(executemany, une seule transaction) dès que le lot est plein ou que
+l'intervalle est écoulé. Quand la file est pleine, les appelants attendent
+(contre-pression) ; le temps d'attente est mesuré dans les métriques.
+Un lot écrit en plus de seuil_flush secondes, ou avec une file remplie au-delà
+de seuil_profondeur, est signalé sur la sortie avec les métriques.
+"""
+import atexit
+import queue
+import threading
+import time
+
+INSERT_JOURNAL = """
+    INSERT INTO journal_log (utilisateur_id, action, description, statut)
+    VALUES (?, ?, ?, ?)
+"""
+
+_FIN = object()
+
+
+class EcrivainJournal:
+    def __init__(self, connecter, taille_lot=200, intervalle=0.5, capacite=10000,
+                 seuil_flush=0.25, seuil_profondeur=0.8):
+        self.connecter = connecter
+        self.taille_lot = taille_lot
+        self.intervalle = intervalle
+        self.seuil_flush = seuil_flush
+        self.seuil_profondeur = seuil_profondeur     # fraction de la capacité
+        self.file = queue.Queue(maxsize=capacite)
+        self._thread = None
+        self._verrou = threading.Lock()
+        self._stats = {
+            'lignes_ecrites': 0,
+            'lots_ecrits': 0,
+            'erreurs': 0,
+            'profondeur_max': 0,
+            'attente_totale': 0.0,     # secondes passées bloqué sur une file pleine
+            'flush_dernier': 0.0,      # secondes
+            'flush_max': 0.0,
+            'flush_total': 0.0,
+        }
+
+    # --- Côté appelants ---
+    def ecrire(self, lignes):
+        """Met des lignes (utilisateur_id, action, description, statut) en file"""
+        self._demarrer()
+        for ligne in lignes:
+            debut = time.perf_counter()
+            self.file.put(ligne)
+            attente = time.perf_counter() - debut
+            with self._verrou:
+                self._stats['attente_totale'] += attente
+                self._stats['profondeur_max'] = max(self._stats['profondeur_max'], self.file.qsize())
+
+    def vider(self):
+        """Attend que toutes les lignes en file soient écrites"""
+        if self._thread is not None:
+            self.file.join()
+
+    def arreter(self):
+        """Écrit les lignes restantes et arrête le thread"""
+        if self._thread is not None and self._thread.is_alive():
+            self.file.put(_FIN)
+            self._thread.join()
+        self._thread = None
+
+    def metriques(self):
+        with self._verrou:
+            stats = dict(self._stats)
+        lots = stats['lots_ecrits']
+        stats['profondeur'] = self.file.qsize()
+        stats['capacite'] = self.file.maxsize
+        stats['flush_moyen'] = stats['flush_total'] / lots if lots else 0.0
+        return stats
+
+    # --- Thread d'écriture ---
+    def _demarrer(self):
+        if self._thread is not None:
+            return
+        with self._verrou:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._boucle, name='journal', daemon=True)
+                self._thread.start()
+
+    def _boucle(self):
+        conn = self.connecter()
+        try:
+            fin = False
+            while not fin:
+                lot = []
+                echeance = time.monotonic() + self.intervalle
+                while len(lot) < self.taille_lot:
+                    try:
+                        ligne = self.file.get(timeout=max(echeance - time.monotonic(), 0))
+                    except queue.Empty:
+                        break
+                    if ligne is _FIN:
+                        self.file.task_done()
+                        fin = True
+                        break
+                    lot.append(ligne)
+                if lot:
+                    self._ecrire_lot(conn, lot)
+                    for _ in lot:
+                        self.file.task_done()
+        finally:
+            conn.close()
+
+    def _ecrire_lot(self, conn, lot):
+        debut = time.perf_counter()
+        try:
+            conn.executemany(INSERT_JOURNAL, lot)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"[ERREUR] journal: {len(lot)} ligne(s) non écrite(s): {e}")
+            with self._verrou:
+                self._stats['erreurs'] += 1
+            return
+        duree = time.perf_counter() - debut
+        with self._verrou:
+            self._stats['lignes_ecrites'] += len(lot)
+            self._stats['lots_ecrits'] += 1
+            self._stats['flush_dernier'] = duree
+            self._stats['flush_max'] = max(self._stats['flush_max'], duree)
+            self._stats['flush_total'] += duree
+        if duree >= self.seuil_flush or self.file.qsize() >= self.seuil_profondeur * self.file.maxsize:
+            self._signaler(len(lot), duree)
+
+    def _signaler(self, lignes, duree):
+        m = self.metriques()
+        print(f"[ALERTE] journal: lot de {lignes} ligne(s) écrit en {duree * 1000:.0f} ms"
+              f" (max {m['flush_max'] * 1000:.0f} ms, moyenne {m['flush_moyen'] * 1000:.0f} ms),"
+              f" file {m['profondeur']}/{m['capacite']} (max {m['profondeur_max']}),"
+              f" attente cumulée des appelants {m['attente_totale']:.2f} s")
+
+
+def creer_ecrivain(connecter, **options):
+    """Crée un écrivain vidé proprement à l'arrêt du programme"""
+    ecrivain = EcrivainJournal(connecter, **options)
+    atexit.register(ecrivain.arreter)
+    return ecrivain
@@ -0,0 +1,107 @@
+# core/json_rapide.py
+"""Encodage JSON des réponses de l'API.
+
+FournisseurJSON remplace le fournisseur par défaut de Flask (app.json) : il
+encode avec orjson quand le module est installé (dépendance optionnelle),
+sinon avec le module json de la bibliothèque standard. Dans les deux cas les
+dates sont écrites en ISO 8601 (comme isoformat()) et les flottants tels
+quels.
+
+Pour les grandes listes, reponse_liste() écrit chaque ligne de résultat
+(tuple renvoyé par un select() de colonnes) directement dans le corps de la
+réponse : un gabarit '{"id":%s,"nom":%s,...}' par forme, rempli avec les
+valeurs encodées de la ligne, sans dictionnaire intermédiaire par ligne ni
+objet ORM.
+"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from itertools import islice
+from flask import current_app
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:     # repli sur le module json
+    orjson = None
+
+_chaine = json.encoder.encode_basestring    # implémentation C si disponible
+
+
+def _defaut(o):
+    if isinstance(o, (date, datetime)):
+        return o.isoformat()
+    return DefaultJSONProvider.default(o)
+
+
+class FournisseurJSON(DefaultJSONProvider):
+    """Fournisseur JSON de l'application (orjson si disponible)"""
+
+    default = staticmethod(_defaut)
+
+    def _options(self, indenter=False):
+        options = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indenter:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:    # options propres au module json
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indenter = self.compact is False or (self.compact is None and self._app.debug)
+        corps = orjson.dumps(obj, default=self.default, option=self._options(indenter))
+        return self._app.response_class(corps, mimetype=self.mimetype)
+
+
+# --- Lignes de résultat -> JSON ---
+def _flottant(v):
+    return float.__repr__(v) if v - v == 0 else 'null'     # NaN et infinis -> null
+
+
+def _autre(v):
+    return current_app.json.dumps(v)
+
+
+_ENCODEURS = {
+    str: _chaine,
+    int: int.__repr__,
+    float: _flottant,
+    bool: lambda v: 'true' if v else 'false',
+    type(None): lambda v: 'null',
+    datetime: lambda v: f'"{v.isoformat()}"',
+    date: lambda v: f'"{v.isoformat()}"',
+    Decimal: lambda v: f'"{v}"',
+}
+
+
+def _valeur(v):
+    return _ENCODEURS.get(type(v), _autre)(v)
+
+
+def encodeur_lignes(cles):
+    """Fonction ligne -> objet JSON (str) ; la ligne porte les valeurs des clés
+    dans l'ordre, les valeurs au-delà (clés de pagination...) sont ignorées"""
+    gabarit = '{' + ','.join(_chaine(c).replace('%', '%%') + ':%s' for c in cles) + '}'
+    n = len(cles)
+    return lambda ligne: gabarit % tuple(map(_valeur, islice(ligne, n)))
+
+
+def reponse_liste(cles, lignes, **autres):
+    """Réponse {"success": true, "data": [...], **autres} écrite ligne à ligne"""
+    ligne = encodeur_lignes(cles)
+    fin = ',' + current_app.json.dumps(autres)[1:] if autres else '}'
+    corps = ''.join(('{"success":true,"data":[', ','.join([ligne(l) for l in lignes]), ']', fin))
+    return current_app.response_class(corps.encode(), mimetype=current_app.json.mimetype)
@@ -0,0 +1,39 @@
+# core/lecture.py
+"""Lectures sans ORM pour les listes, statistiques et exports.
+
+Un endpoint en lecture seule n'a pas besoin d'objets ORM : chaque objet
+chargé passe par l'identity map de la session, porte son état et ses
+attributs instrumentés, pour n'être lu qu'une fois puis jeté. Ici un
+select() de colonnes est exécuté tel quel et chaque ligne devient un
+enregistrement léger (namedtuple : tuple à __slots__ vides, détaché de la
+session et du résultat). Les lignes sont lues par paquets (yield_per) : un
+parcours complet ne garde en mémoire qu'un paquet à la fois.
+"""
+from collections import namedtuple
+from functools import lru_cache
+from models import db
+
+TAILLE_PAQUET = 1000
+
+
+@lru_cache(maxsize=128)
+def enregistrement(noms):
+    """Classe d'enregistrement pour ces noms de colonnes (noms invalides ou
+    en double renommés _0, _1...)"""
+    return namedtuple('Ligne', noms, rename=True)
+
+
+def lignes(requete, taille=TAILLE_PAQUET):
+    """Générateur des lignes du select(), lues par paquets de taille lignes"""
+    resultat = db.session.execute(requete.execution_options(yield_per=taille))
+    try:
+        classe = enregistrement(tuple(resultat.keys()))
+        for paquet in resultat.partitions():
+            yield from map(classe._make, paquet)
+    finally:
+        resultat.close()
+
+
+def toutes(requete):
+    """Liste des lignes du select()"""
+    return list(lignes(requete))
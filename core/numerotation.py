@@ -0,0 +1,156 @@
+# core/numerotation.py
+"""Attribution des numéros de documents (factures, abonnés, produits).
+
+Un compteur par (préfixe, période) dans la table sequence_numero, incrémenté
+par une seule instruction UPDATE ... RETURNING dans la transaction de
+l'appelant : deux requêtes simultanées ne peuvent pas obtenir le même numéro,
+et un numéro d'une transaction annulée est rendu.
+
+Pour les préfixes à fort débit, TAILLE_BLOC permet de réserver un bloc de
+numéros en une fois ; le reste du bloc n'est distribué qu'après la validation
+de la transaction qui l'a réservé (des trous sont possibles, pas de doublons).
+"""
+import threading
+from datetime import datetime
+from sqlalchemy import event, func, select, update, cast, Integer
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from models import db, SequenceNumero, Facture, Abonne, Produit
+
+# Préfixe -> nombre de numéros réservés à la fois (1 = pas de réservation)
+TAILLE_BLOC = {}
+
+_sequences = SequenceNumero.__table__
+_blocs = {}            # (prefixe, periode) -> [numéros réservés et validés]
+_verrou = threading.Lock()
+
+SQL_CREATION = """
+    CREATE TABLE IF NOT EXISTS sequence_numero (
+        prefixe VARCHAR(10) NOT NULL,
+        periode VARCHAR(10) NOT NULL DEFAULT '',
+        valeur INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (prefixe, periode)
+    )
+"""
+SQL_INCREMENT = """
+    UPDATE sequence_numero SET valeur = valeur + ?
+    WHERE prefixe = ? AND periode = ? RETURNING valeur
+"""
+SQL_AMORCE = """
+    INSERT INTO sequence_numero (prefixe, periode, valeur) VALUES (?, ?, ?)
+    ON CONFLICT (prefixe, periode) DO UPDATE SET valeur = valeur + ? RETURNING valeur
+"""
+
+
+# --- Couche sqlite3 (core/crud.py) ---
+def creer_table_sqlite(conn):
+    """Crée sequence_numero sur une base sqlite3 antérieure (à l'ouverture)"""
+    conn.execute(SQL_CREATION)
+    conn.commit()
+
+
+def allouer_sqlite(conn, prefixe, periode='', amorce=None):
+    """Numéro suivant sur une connexion sqlite3, dans sa transaction"""
+    ligne = conn.execute(SQL_INCREMENT, (1, prefixe, periode)).fetchone()
+    if ligne is None:
+        depart = amorce() if amorce else 0
+        ligne = conn.execute(SQL_AMORCE, (prefixe, periode, depart + 1, 1)).fetchone()
+    return ligne[0]
+
+
+# --- Couche SQLAlchemy (routes) ---
+def _reserver(prefixe, periode, n, amorce):
+    """Avance le compteur de n et retourne la dernière valeur réservée"""
+    valeur = db.session.execute(
+        update(_sequences)
+        .where(_sequences.c.prefixe == prefixe, _sequences.c.periode == periode)
+        .values(valeur=_sequences.c.valeur + n)
+        .returning(_sequences.c.valeur)
+    ).scalar()
+    if valeur is None:
+        depart = amorce() if amorce else 0
+        valeur = db.session.execute(
+            insert(_sequences)
+            .values(prefixe=prefixe, periode=periode, valeur=depart + n)
+            .on_conflict_do_update(
+                index_elements=['prefixe', 'periode'],
+                set_={'valeur': _sequences.c.valeur + n}
+            )
+            .returning(_sequences.c.valeur)
+        ).scalar()
+    return valeur
+
+
+def allouer(prefixe, periode='', amorce=None):
+    """Numéro suivant pour (prefixe, periode).
+    amorce() donne le dernier numéro déjà utilisé quand le compteur n'existe
+    pas encore (bases antérieures à la table sequence_numero)."""
+    cle = (prefixe, periode)
+    with _verrou:
+        bloc = _blocs.get(cle)
+        if bloc:
+            return bloc.pop(0)
+
+    # Bloc réservé par la transaction en cours : utilisable tout de suite,
+    # il serait annulé avec elle
+    reserves = db.session.info.setdefault('blocs_numeros', {})
+    if reserves.get(cle):
+        return reserves[cle].pop(0)
+
+    taille = TAILLE_BLOC.get(prefixe, 1)
+    fin = _reserver(prefixe, periode, taille, amorce)
+    if taille > 1:
+        reserves[cle] = list(range(fin - taille + 2, fin + 1))
+    return fin - taille + 1
+
+
+@event.listens_for(Session, 'after_commit')
+def _publier_blocs(session):
+    reserves = session.info.pop('blocs_numeros', {})
+    with _verrou:
+        for cle, numeros in reserves.items():
+            _blocs.setdefault(cle, []).extend(numeros)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _oublier_blocs(session):
+    session.info.pop('blocs_numeros', None)
+
+
+# --- Formats des documents ---
+def _amorce_facture(prefixe):
+    def amorce():
+        return db.session.execute(
+            select(func.max(cast(func.substr(Facture.numero_facture, len(prefixe) + 1), Integer)))
+            .where(Facture.numero_facture.like(f'{prefixe}%'))
+        ).scalar() or 0
+    return amorce
+
+
+def numero_facture(date=None):
+    """FAC-AAAAMM-0001, compteur mensuel"""
+    periode = (date or datetime.now()).strftime('%Y%m')
+    prefixe = f'FAC-{periode}-'
+    return f'{prefixe}{allouer("FAC", periode, _amorce_facture(prefixe)):04d}'
+
+
+def numeros_factures(n, date=None):
+    """n numéros de facture consécutifs réservés en une seule instruction"""
+    periode = (date or datetime.now()).strftime('%Y%m')
+    prefixe = f'FAC-{periode}-'
+    fin = _reserver('FAC', periode, n, _amorce_facture(prefixe))
+    return [f'{prefixe}{i:04d}' for i in range(fin - n + 1, fin + 1)]
+
+
+def _max_id(modele):
+    return lambda: db.session.execute(select(func.max(modele.id))).scalar() or 0
+
+
+def numero_abonne():
+    """ABN00001"""
+    return f'ABN{allouer("ABN", amorce=_max_id(Abonne)):05d}'
+
+
+def numero_produit():
+    """PRD00001"""
+    return f'PRD{allouer("PRD", amorce=_max_id(Produit)):05d}'
@@ -0,0 +1,115 @@
+# core/pagination.py
+"""Pagination par curseur (keyset) des listes de l'API.
+
+Les lignes sont triées sur une clé unique, par exemple (date, id) ou
+(nom, id). La page suivante reprend après la dernière clé renvoyée
+(WHERE (date, id) < (:date, :id)) au lieu de sauter N lignes avec OFFSET :
+la page 500 coûte la même descente d'index que la page 1. Le curseur renvoyé
+au client est opaque (JSON en base64). Le total n'est compté que sur
+demande, et plafonné à TOTAL_MAX lignes.
+
+paginer() accepte une Query ORM (page d'objets) ou un select() de colonnes
+(page d'enregistrements de core/lecture.py) : les colonnes de la clé sont
+alors ajoutées en fin de ligne, après les champs demandés.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime, date
+from sqlalchemy import tuple_, select, func, Select
+from sqlalchemy.orm import undefer
+from models import db
+from core import lecture
+
+LIMITE_DEFAUT = 100
+LIMITE_MAX = 1000
+TOTAL_MAX = 10000
+
+
+class CurseurInvalide(ValueError):
+    pass
+
+
+def _serialiser(valeur):
+    if isinstance(valeur, (datetime, date)):
+        return valeur.isoformat()
+    raise TypeError(f'Type non sérialisable: {type(valeur).__name__}')
+
+
+def encoder(valeurs):
+    brut = json.dumps(valeurs, default=_serialiser, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(brut).decode().rstrip('=')
+
+
+def decoder(curseur, colonnes):
+    """Valeurs de clé du curseur, converties au type des colonnes"""
+    try:
+        valeurs = json.loads(base64.urlsafe_b64decode(curseur + '=' * (-len(curseur) % 4)))
+    except (binascii.Error, ValueError):
+        raise CurseurInvalide('Curseur invalide')
+    if not isinstance(valeurs, list) or len(valeurs) != len(colonnes):
+        raise CurseurInvalide('Curseur invalide')
+    try:
+        return [
+            datetime.fromisoformat(v) if v is not None and c.type.python_type is datetime else v
+            for c, v in zip(colonnes, valeurs)
+        ]
+    except (TypeError, ValueError):
+        raise CurseurInvalide('Curseur invalide')
+
+
+def parametres(args, limite_defaut=LIMITE_DEFAUT):
+    """(curseur, limite, total) lus dans la query string ; per_page reste accepté"""
+    try:
+        limite = int(args.get('limite') or args.get('per_page') or limite_defaut)
+    except ValueError:
+        raise CurseurInvalide('Limite invalide')
+    total = args.get('total', '').lower() in ('1', 'true')
+    return args.get('curseur') or None, max(1, min(limite, LIMITE_MAX)), total
+
+
+class Page:
+    def __init__(self, elements, next_cursor, total=None):
+        self.elements = elements
+        self.next_cursor = next_cursor
+        self.total = total
+
+    def meta(self):
+        """Champs de pagination à ajouter à la réponse JSON"""
+        meta = {'next_cursor': self.next_cursor}
+        if self.total is not None:
+            meta['total'] = min(self.total, TOTAL_MAX)
+            meta['total_exact'] = self.total <= TOTAL_MAX
+        return meta
+
+
+def paginer(query, colonnes, curseur=None, limite=LIMITE_DEFAUT, descendant=False, total=False):
+    """Page de query triée sur colonnes (dernière colonne = identifiant unique).
+
+    Le tri existant de la requête est remplacé par celui de la clé."""
+    lignes = isinstance(query, Select)
+    nombre = None
+    if total and lignes:
+        compte = query.order_by(None).limit(TOTAL_MAX + 1).subquery()
+        nombre = db.session.scalar(select(func.count()).select_from(compte))
+    elif total:
+        nombre = query.enable_eagerloads(False).order_by(None).limit(TOTAL_MAX + 1).count()
+
+    cle = tuple_(*colonnes)
+    if curseur:
+        valeurs = tuple_(*decoder(curseur, colonnes))
+        query = query.filter(cle < valeurs if descendant else cle > valeurs)
+    if lignes:
+        query = query.add_columns(*colonnes)
+    else:
+        query = query.options(*[undefer(c) for c in colonnes])     # clé lue même hors des champs demandés
+    query = query.order_by(None).order_by(*[c.desc() if descendant else c.asc() for c in colonnes])
+
+    elements = lecture.toutes(query.limit(limite + 1)) if lignes else query.limit(limite + 1).all()
+    suivant = None
+    if len(elements) > limite:
+        elements = elements[:limite]
+        dernier = elements[-1]
+        suivant = encoder(list(dernier[-len(colonnes):]) if lignes
+                          else [getattr(dernier, c.key) for c in colonnes])
+    return Page(elements, suivant, nombre)
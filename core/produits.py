@@ -1,8 +1,9 @@
 # core/produits.py
 from datetime import datetime
-from core.crud import create, read, update, log_action
+from core.crud import create, read, update, log_action, operation
 
 # --- Créer un produit ---
+@operation
 def creer_produit(nom, categorie, prix_achat, prix_vente, fournisseur_id=None, utilisateur_id=None):
     data = {
         "nom": nom,
@@ -17,6 +18,7 @@ def creer_produit(nom, categorie, prix_achat, prix_vente, fournisseur_id=None, u
     return produit_id
 
 # --- Modifier un produit ---
+@operation
 def modifier_produit(produit_id, nom=None, categorie=None, prix_achat=None, prix_vente=None, fournisseur_id=None, utilisateur_id=None):
     data = {}
     if nom: data["nom"] = nom
@@ -38,6 +40,7 @@ def stock_produit(produit_id):
     return produits[0]["stock"] if produits else 0
 
 # --- Mouvement de stock interne ---
+@operation
 def _mouvement_stock(produit_id, type_mouvement, quantite, reference="", utilisateur_id=None):
     """Modifie le stock et garde une trace dans journal_log"""
     produits = read("produits", {"id": produit_id})
@@ -0,0 +1,98 @@
+# core/recherche.py
+"""Recherche plein texte (FTS5) sur les abonnés et les produits.
+
+Chaque table indexée a une table virtuelle FTS5 à contenu externe, tenue à
+jour par des triggers. La recherche se fait par préfixe sur chaque mot saisi
+et les résultats sont classés par pertinence (bm25) ; les listes paginées
+utilisent la clé (rang, id) donnée par cle_tri(). Si SQLite n'a pas été
+compilé avec FTS5, la recherche retombe sur LIKE '%terme%'.
+"""
+import re
+from sqlalchemy import table, column, literal_column, or_, Integer, Float
+from sqlalchemy.exc import OperationalError
+from models import Abonne, Produit
+
+# table indexée -> (table FTS, colonnes indexées)
+INDEX_RECHERCHE = {
+    'abonne': ('abonne_fts', ['numero_abonne', 'nom', 'prenom', 'telephone']),
+    'produit': ('produit_fts', ['code_produit', 'nom', 'type']),
+}
+
+_MODELES = {Abonne: 'abonne', Produit: 'produit'}
+# Une seule clause par table FTS : filtrer() et cle_tri() doivent désigner la même
+_INDEX = {source: table(fts, column('rowid', Integer), column('rank', Float))
+          for source, (fts, _) in INDEX_RECHERCHE.items()}
+_fts_disponible = None
+
+
+def _ddl(source, fts, colonnes):
+    cols = ', '.join(colonnes)
+    new = ', '.join(f'new.{c}' for c in colonnes)
+    old = ', '.join(f'old.{c}' for c in colonnes)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({cols}, "
+        f"content='{source}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {source} BEGIN "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {source} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {source} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END",
+    ]
+
+
+def installer_index_recherche(conn):
+    """Crée (idempotent) les tables FTS et leurs triggers, et indexe les
+    données existantes à la création. Retourne False si FTS5 est absent."""
+    global _fts_disponible
+    for source, (fts, colonnes) in INDEX_RECHERCHE.items():
+        existe = conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE name=?", (fts,)
+        ).first()
+        try:
+            for ddl in _ddl(source, fts, colonnes):
+                conn.exec_driver_sql(ddl)
+        except OperationalError:
+            # SQLite compilé sans FTS5
+            _fts_disponible = False
+            return False
+        if not existe:
+            conn.exec_driver_sql(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+    _fts_disponible = True
+    return True
+
+
+def expression_fts(terme):
+    """'Trao 7000' -> '"trao"* "7000"*' (tous les mots, par préfixe)"""
+    mots = re.findall(r'\w+', terme.lower())
+    return ' '.join(f'"{mot}"*' for mot in mots)
+
+
+def _fts_utilise(expression, fts_actif):
+    return bool(fts_actif and _fts_disponible and expression)
+
+
+def cle_tri(modele, terme, fts_actif=True):
+    """Clé de pagination des résultats de filtrer() : (rang bm25, id), ou
+    None pour la recherche LIKE (sans pertinence)"""
+    if not _fts_utilise(expression_fts(terme), fts_actif):
+        return None
+    return (_INDEX[_MODELES[modele]].c.rank, modele.id)
+
+
+def filtrer(query, modele, terme, fts_actif=True):
+    """Filtre une requête sur le terme recherché, triée par pertinence.
+    fts_actif=False force l'ancienne recherche LIKE."""
+    source = _MODELES[modele]
+    fts, colonnes = INDEX_RECHERCHE[source]
+    expression = expression_fts(terme)
+
+    if not _fts_utilise(expression, fts_actif):
+        pattern = f"%{terme}%"
+        return query.filter(or_(*[getattr(modele, c).like(pattern) for c in colonnes]))
+
+    index = _INDEX[source]
+    return (query.join(index, index.c.rowid == modele.id)
+                 .filter(literal_column(fts).op('MATCH')(expression))
+                 .order_by(index.c.rank))
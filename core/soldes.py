@@ -0,0 +1,126 @@
+# core/soldes.py
+from sqlalchemy import func, update, delete, select
+from models import db, Abonne, SoldeAbonne, Consommation, Facture, Paiement
+from core import tableau_bord
+
+# --- Ajustement incrémental d'un solde ---
+def _ajuster(abonne_id, **deltas):
+    """Applique des deltas au solde d'un abonné dans la transaction courante"""
+    deltas = {col: delta for col, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    valeurs = {col: getattr(SoldeAbonne, col) + delta for col, delta in deltas.items()}
+    resultat = db.session.execute(
+        update(SoldeAbonne)
+        .where(SoldeAbonne.abonne_id == abonne_id)
+        .values(**valeurs)
+        .execution_options(synchronize_session='evaluate')
+    )
+    if resultat.rowcount == 0:
+        # Solde absent (base antérieure) : on le reconstruit depuis les données
+        reconstruire_soldes([abonne_id])
+    # Le total dû des abonnés est le montant des factures impayées du tableau de bord
+    tableau_bord.ajuster(factures_impayees=deltas.get('montant_du'))
+
+def initialiser_solde(abonne):
+    """Crée le solde vide d'un nouvel abonné"""
+    abonne.solde = SoldeAbonne(conso_totale=0, montant_du=0, montant_paye=0)
+
+# --- Consommations ---
+def consommation_ajoutee(abonne_id, montant):
+    _ajuster(abonne_id, conso_totale=montant)
+
+def consommation_modifiee(abonne_id, ancien_montant, nouveau_montant):
+    _ajuster(abonne_id, conso_totale=nouveau_montant - ancien_montant)
+
+def consommation_supprimee(abonne_id, montant):
+    _ajuster(abonne_id, conso_totale=-montant)
+
+# --- Factures ---
+def facture_creee(facture):
+    if facture.statut != 'payee':
+        _ajuster(facture.abonne_id, montant_du=facture.montant_ttc or 0)
+
+def factures_creees(facture_ids):
+    """Report groupé de factures créées par lot (facturation mensuelle)"""
+    db.session.execute(
+        update(SoldeAbonne)
+        .where(SoldeAbonne.abonne_id == Facture.abonne_id,
+               Facture.id.in_(facture_ids),
+               Facture.statut != 'payee')
+        .values(montant_du=SoldeAbonne.montant_du + Facture.montant_ttc),
+        execution_options={'synchronize_session': False}
+    )
+    tableau_bord.invalider()
+
+def facture_supprimee(facture):
+    montant_paye = sum(p.montant for p in facture.paiements)
+    du = (facture.montant_ttc or 0) if facture.statut != 'payee' else 0
+    _ajuster(facture.abonne_id, montant_du=-du, montant_paye=-montant_paye)
+
+def mettre_a_jour_statut(facture):
+    """Met à jour le statut d'une facture et reporte le passage payée/non payée"""
+    ancien_statut = facture.statut
+    facture.mettre_a_jour_statut()
+    if (ancien_statut == 'payee') == (facture.statut == 'payee'):
+        return
+    ttc = facture.montant_ttc or 0
+    _ajuster(facture.abonne_id, montant_du=ttc if ancien_statut == 'payee' else -ttc)
+
+# --- Paiements ---
+def paiement_ajoute(facture, montant):
+    _ajuster(facture.abonne_id, montant_paye=montant)
+
+def paiement_modifie(facture, ancien_montant, nouveau_montant):
+    _ajuster(facture.abonne_id, montant_paye=nouveau_montant - ancien_montant)
+
+def paiement_supprime(facture, montant):
+    _ajuster(facture.abonne_id, montant_paye=-montant)
+
+# --- Reconstruction complète ---
+def reconstruire_soldes(abonne_ids=None):
+    """Recalcule les soldes depuis les tables sources (tous les abonnés si None).
+    Ne commit pas : à l'appelant de valider la transaction."""
+    conso = select(
+        Consommation.abonne_id, func.sum(Consommation.montant_total)
+    ).group_by(Consommation.abonne_id)
+    du = select(
+        Facture.abonne_id, func.sum(Facture.montant_ttc)
+    ).where(Facture.statut != 'payee').group_by(Facture.abonne_id)
+    paye = select(
+        Facture.abonne_id, func.sum(Paiement.montant)
+    ).join(Paiement, Paiement.facture_id == Facture.id).group_by(Facture.abonne_id)
+    ids = select(Abonne.id)
+    purge = delete(SoldeAbonne)
+
+    if abonne_ids is not None:
+        abonne_ids = list(abonne_ids)
+        conso = conso.where(Consommation.abonne_id.in_(abonne_ids))
+        du = du.where(Facture.abonne_id.in_(abonne_ids))
+        paye = paye.where(Facture.abonne_id.in_(abonne_ids))
+        ids = ids.where(Abonne.id.in_(abonne_ids))
+        purge = purge.where(SoldeAbonne.abonne_id.in_(abonne_ids))
+
+    totaux_conso = dict(db.session.execute(conso).all())
+    totaux_du = dict(db.session.execute(du).all())
+    totaux_paye = dict(db.session.execute(paye).all())
+
+    db.session.execute(purge, execution_options={'synchronize_session': 'fetch'})
+    lignes = [{
+        'abonne_id': abonne_id,
+        'conso_totale': totaux_conso.get(abonne_id) or 0,
+        'montant_du': totaux_du.get(abonne_id) or 0,
+        'montant_paye': totaux_paye.get(abonne_id) or 0
+    } for abonne_id in db.session.scalars(ids)]
+    if lignes:
+        db.session.execute(SoldeAbonne.__table__.insert(), lignes)
+    return len(lignes)
+
+def initialiser_soldes_manquants():
+    """Crée les soldes absents (bases créées avant leur introduction)"""
+    manquants = db.session.scalars(
+        select(Abonne.id).where(~Abonne.solde.has())
+    ).all()
+    if manquants:
+        reconstruire_soldes(manquants)
+    return len(manquants)
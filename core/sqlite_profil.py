@@ -0,0 +1,75 @@
+# core/sqlite_profil.py
+"""Profil de production SQLite appliqué au moteur SQLAlchemy.
+
+Les PRAGMA sont posés à chaque nouvelle connexion. Les transactions
+d'écriture démarrent par BEGIN IMMEDIATE : le verrou d'écriture est pris
+d'entrée (en respectant busy_timeout) au lieu d'échouer en cours de
+transaction, et la prise du verrou est réessayée avec un délai croissant
+si la base reste verrouillée.
+"""
+import random
+import time
+from flask import has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+PROFIL_DEFAUT = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size_kb': 64 * 1024,         # 64 Mo de cache de pages par connexion
+    'mmap_size': 256 * 1024 * 1024,     # 256 Mo lus via mmap
+    'temp_store': 'MEMORY',
+    'busy_timeout_ms': 5000,
+    'tentatives_ecriture': 5,
+    'delai_initial': 0.05,              # secondes, doublé à chaque tentative
+}
+
+METHODES_ECRITURE = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+
+def _est_ecriture(conn):
+    """Transaction d'écriture : requête HTTP de modification ou option explicite"""
+    ecriture = conn.get_execution_options().get('ecriture')
+    if ecriture is not None:
+        return ecriture
+    return has_request_context() and request.method in METHODES_ECRITURE
+
+
+def _verrouillee(erreur):
+    return 'locked' in str(erreur.orig) or 'busy' in str(erreur.orig)
+
+
+def appliquer_profil(engine, profil=None):
+    """Installe les PRAGMA et la gestion des transactions sur un moteur SQLite"""
+    profil = {**PROFIL_DEFAUT, **(profil or {})}
+
+    @event.listens_for(engine, 'connect')
+    def configurer_connexion(dbapi_connection, connection_record):
+        # Désactive le BEGIN implicite de pysqlite : il est émis par 'begin' ci-dessous
+        dbapi_connection.isolation_level = None
+        cur = dbapi_connection.cursor()
+        cur.execute(f"PRAGMA busy_timeout = {int(profil['busy_timeout_ms'])}")
+        cur.execute(f"PRAGMA journal_mode = {profil['journal_mode']}")
+        cur.execute(f"PRAGMA synchronous = {profil['synchronous']}")
+        cur.execute(f"PRAGMA cache_size = {-int(profil['cache_size_kb'])}")
+        cur.execute(f"PRAGMA mmap_size = {int(profil['mmap_size'])}")
+        cur.execute(f"PRAGMA temp_store = {profil['temp_store']}")
+        cur.close()
+
+    @event.listens_for(engine, 'begin')
+    def demarrer_transaction(conn):
+        if not _est_ecriture(conn):
+            conn.exec_driver_sql('BEGIN')
+            return
+        delai = profil['delai_initial']
+        for tentative in range(profil['tentatives_ecriture']):
+            try:
+                conn.exec_driver_sql('BEGIN IMMEDIATE')
+                return
+            except OperationalError as e:
+                if not _verrouillee(e) or tentative == profil['tentatives_ecriture'] - 1:
+                    raise
+                time.sleep(delai * (1 + random.random()))
+                delai *= 2
+
+    return profil
@@ -0,0 +1,137 @@
+# core/stock.py
+"""Mouvements de stock atomiques.
+
+Chaque mouvement est une seule instruction UPDATE ... RETURNING : une sortie
+n'est appliquée que si le stock suffit (WHERE stock >= :quantite), sans
+lecture préalable en Python. Deux ventes simultanées ne peuvent donc ni
+perdre une décrémentation ni rendre le stock négatif. Les valeurs avant/après
+du StockLog viennent de la valeur renvoyée par la base.
+"""
+import random
+import time
+from datetime import datetime
+from sqlalchemy import update, select
+from sqlalchemy.orm.attributes import set_committed_value
+from models import db, Produit, StockLog
+from core import tableau_bord, alertes, evenements
+
+
+class StockInsuffisant(Exception):
+    def __init__(self, produit_id, disponible):
+        self.produit_id = produit_id
+        self.disponible = disponible
+        super().__init__(f'Stock insuffisant (disponible: {disponible})')
+
+
+class ProduitIntrouvable(LookupError):
+    pass
+
+
+class StockConcurrent(Exception):
+    def __init__(self, produit_id):
+        self.produit_id = produit_id
+        super().__init__('Stock modifié pendant l\'ajustement, réessayez')
+
+
+# Ajustement : lectures/écritures conditionnelles tentées au plus, et pause
+# de base (secondes, doublée à chaque échec) entre deux tentatives
+TENTATIVES_AJUSTEMENT = 5
+PAUSE_AJUSTEMENT = 0.005
+
+
+def _appliquer(produit_id, variation, condition=None):
+    """Exécute l'UPDATE conditionnel et retourne le stock après, ou None"""
+    requete = (update(Produit)
+               .where(Produit.id == produit_id)
+               .values(stock=Produit.stock + variation)
+               .returning(Produit.stock, Produit.stock_alerte, Produit.actif)
+               .execution_options(synchronize_session=False))
+    if condition is not None:
+        requete = requete.where(condition)
+    ligne = db.session.execute(requete).first()
+    if ligne is None:
+        return None
+    stock_apres, stock_alerte, actif = ligne
+    tableau_bord.stock_modifie(stock_apres - variation, stock_apres, stock_alerte, actif)
+    alertes.stock_modifie(produit_id, stock_apres - variation, stock_apres, stock_alerte, actif)
+    return stock_apres
+
+
+def _synchroniser(produit_id, stock):
+    """Reporte la nouvelle valeur sur l'objet Produit déjà chargé en session"""
+    produit = db.session.identity_map.get(db.session.identity_key(Produit, produit_id))
+    if produit is not None:
+        set_committed_value(produit, 'stock', stock)
+
+
+def _journaliser(produit_id, type_mouvement, quantite, stock_avant, stock_apres, **journal):
+    """Ajoute le StockLog et l'annonce au flux d'événements"""
+    log = StockLog(produit_id=produit_id, type_mouvement=type_mouvement, quantite=quantite,
+                   stock_avant=stock_avant, stock_apres=stock_apres, date=datetime.utcnow(), **journal)
+    db.session.add(log)
+    evenements.publier('stock', 'mouvement', {
+        'produit_id': produit_id,
+        'type_mouvement': type_mouvement,
+        'quantite': quantite,
+        'stock_avant': stock_avant,
+        'stock_apres': stock_apres,
+        'date': log.date,
+        'utilisateur': log.utilisateur,
+        'commentaire': log.commentaire,
+        'reference': log.reference,
+    })
+
+
+def _disponible(produit_id):
+    stock = db.session.execute(select(Produit.stock).where(Produit.id == produit_id)).scalar()
+    if stock is None:
+        raise ProduitIntrouvable(produit_id)
+    return stock
+
+
+def mouvement(produit_id, variation, type_mouvement, utilisateur=None,
+              commentaire=None, reference=None):
+    """Applique variation (négative = sortie) et journalise le mouvement.
+    Retourne (stock_avant, stock_apres) ; lève StockInsuffisant si une sortie
+    dépasse le stock disponible."""
+    condition = Produit.stock >= -variation if variation < 0 else None
+    stock_apres = _appliquer(produit_id, variation, condition)
+    if stock_apres is None:
+        raise StockInsuffisant(produit_id, _disponible(produit_id))
+    stock_avant = stock_apres - variation
+
+    _synchroniser(produit_id, stock_apres)
+    _journaliser(produit_id, type_mouvement, abs(variation), stock_avant, stock_apres,
+                 utilisateur=utilisateur, commentaire=commentaire, reference=reference)
+    return stock_avant, stock_apres
+
+
+def sortie(produit_id, quantite, type_mouvement='sortie', **journal):
+    return mouvement(produit_id, -quantite, type_mouvement, **journal)
+
+
+def entree(produit_id, quantite, type_mouvement='entree', **journal):
+    return mouvement(produit_id, quantite, type_mouvement, **journal)
+
+
+def ajuster(produit_id, nouveau_stock, type_mouvement='ajustement', commentaire=None, **journal):
+    """Fixe le stock à une valeur (inventaire). La différence est appliquée
+    sous condition que le stock n'ait pas changé depuis sa lecture ; sinon
+    elle est recalculée, au plus TENTATIVES_AJUSTEMENT fois avant de lever
+    StockConcurrent."""
+    for tentative in range(TENTATIVES_AJUSTEMENT):
+        if tentative:
+            time.sleep(PAUSE_AJUSTEMENT * 2 ** (tentative - 1) * random.uniform(0.5, 1.5))
+        stock_avant = _disponible(produit_id)
+        difference = nouveau_stock - stock_avant
+        stock_apres = _appliquer(produit_id, difference, Produit.stock == stock_avant)
+        if stock_apres is not None:
+            break
+    else:
+        raise StockConcurrent(produit_id)
+
+    _synchroniser(produit_id, stock_apres)
+    _journaliser(produit_id, type_mouvement, abs(difference), stock_avant, stock_apres,
+                 commentaire=commentaire if commentaire is not None else f'Ajustement de stock: {difference:+d}',
+                 **journal)
+    return stock_avant, stock_apres
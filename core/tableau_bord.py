@@ -0,0 +1,182 @@
+# core/tableau_bord.py
+"""Statistiques du tableau de bord, gardées en mémoire.
+
+Les compteurs sont chargés en une seule requête puis tenus à jour par les
+écritures : chaque chemin d'écriture enregistre ses variations dans la
+session, appliquées au cache quand la transaction est validée et oubliées si
+elle est annulée. Le cache est rechargé au changement de jour (ventes_jour
+repart de zéro), après une invalidation explicite, ou au bout de TTL secondes
+(filet de sécurité pour les écritures faites par un autre processus).
+"""
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import event, select, func, true
+from sqlalchemy.orm import Session
+from models import db, Produit, Abonne, Facture, Consommation, VenteJournaliere
+
+TTL = 60            # secondes
+NB_DERNIERES = 10
+
+_etat = {'jour': None, 'expire': 0.0, 'stats': None, 'dernieres': [], 'generation': 0}
+_verrou = threading.Lock()
+
+
+# --- Chargement ---
+def _requete(debut_jour):
+    """Compteurs et dernières consommations en une seule instruction"""
+    def compter(*conditions, modele):
+        return select(func.count()).select_from(modele).where(*conditions).scalar_subquery()
+
+    compteurs = select(
+        compter(Produit.actif == True, modele=Produit).label('total_produits'),
+        compter(Abonne.actif == True, modele=Abonne).label('total_abonnes'),
+        compter(Produit.stock <= Produit.stock_alerte, Produit.actif == True,
+                modele=Produit).label('produits_stock_critique'),
+        select(func.coalesce(func.sum(VenteJournaliere.montant), 0))
+            .where(VenteJournaliere.jour == debut_jour.date()).scalar_subquery().label('ventes_jour'),
+        select(func.coalesce(func.sum(Facture.montant_ttc), 0))
+            .where(Facture.statut.in_(['impayee', 'partielle'])).scalar_subquery().label('factures_impayees'),
+    ).subquery()
+
+    dernieres = (
+        select(Consommation.id, Consommation.date, Consommation.quantite, Consommation.montant_total,
+               Abonne.nom, Abonne.prenom, Produit.nom.label('produit_nom'))
+        .join(Abonne, Abonne.id == Consommation.abonne_id)
+        .join(Produit, Produit.id == Consommation.produit_id)
+        .order_by(Consommation.date.desc(), Consommation.id.desc())
+        .limit(NB_DERNIERES)
+        .subquery()
+    )
+
+    return (select(compteurs, dernieres)
+            .select_from(compteurs.outerjoin(dernieres, true()))
+            .order_by(dernieres.c.date.desc(), dernieres.c.id.desc()))
+
+
+def _ligne(id, date, quantite, montant_total, nom_complet, produit):
+    """Ligne « dernière consommation » telle qu'utilisée par le template"""
+    return {
+        'id': id,
+        'date': date,
+        'quantite': quantite,
+        'montant_total': montant_total,
+        'abonne': {'nom_complet': nom_complet},
+        'produit': {'nom': produit},
+    }
+
+
+def _charger(jour):
+    debut_jour = datetime.combine(jour, datetime.min.time())
+    lignes = db.session.execute(_requete(debut_jour)).all()
+    premiere = lignes[0]
+    stats = {
+        'total_produits': premiere.total_produits,
+        'total_abonnes': premiere.total_abonnes,
+        'produits_stock_critique': premiere.produits_stock_critique,
+        'ventes_jour': premiere.ventes_jour,
+        'factures_impayees': premiere.factures_impayees,
+    }
+    dernieres = [
+        _ligne(l.id, l.date, l.quantite, l.montant_total,
+               f"{l.nom} {l.prenom or ''}".strip(), l.produit_nom)
+        for l in lignes if l.id is not None
+    ]
+    return stats, dernieres
+
+
+def statistiques(ttl=TTL):
+    """(stats, dernières consommations) ; au plus une requête"""
+    jour = datetime.now().date()
+    with _verrou:
+        if _etat['stats'] is not None and _etat['jour'] == jour and time.monotonic() < _etat['expire']:
+            return dict(_etat['stats']), list(_etat['dernieres'])
+        generation = _etat['generation']
+
+    stats, dernieres = _charger(jour)
+    with _verrou:
+        # Une écriture validée pendant le chargement le rend peut-être obsolète
+        if _etat['generation'] == generation:
+            _etat.update(jour=jour, expire=time.monotonic() + ttl, stats=stats, dernieres=dernieres)
+    return dict(stats), list(dernieres)
+
+
+# --- Variations enregistrées par les écritures ---
+def _en_attente():
+    return db.session.info.setdefault('tableau_bord', {'deltas': {}, 'ajouts': [], 'modifs': {}, 'invalider': False})
+
+
+def ajuster(**deltas):
+    """Variations de compteurs, appliquées à la validation de la transaction"""
+    attente = _en_attente()['deltas']
+    for cle, delta in deltas.items():
+        if delta:
+            attente[cle] = attente.get(cle, 0) + delta
+
+
+def invalider():
+    """Rechargement complet après la validation de la transaction"""
+    _en_attente()['invalider'] = True
+
+
+def consommation_ajoutee(consommation, abonne, produit):
+    _en_attente()['ajouts'].append(_ligne(
+        consommation.id, consommation.date, consommation.quantite, consommation.montant_total,
+        abonne.nom_complet, produit.nom
+    ))
+
+
+def consommation_modifiee(consommation, ancien_montant):
+    modifs = _en_attente()['modifs']
+    delta = modifs.get(consommation.id, (None, None, 0))[2]
+    modifs[consommation.id] = (
+        consommation.date, consommation.quantite, delta + consommation.montant_total - ancien_montant
+    )
+
+
+def stock_modifie(stock_avant, stock_apres, stock_alerte, actif):
+    """Entrée ou sortie du seuil critique d'un produit"""
+    if actif:
+        ajuster(produits_stock_critique=int(stock_apres <= stock_alerte) - int(stock_avant <= stock_alerte))
+
+
+def _appliquer(attente):
+    stats = _etat['stats']
+    if stats is None:
+        return
+    if attente['invalider']:
+        _etat['stats'] = None
+        return
+    debut_jour = datetime.combine(_etat['jour'], datetime.min.time())
+
+    for cle, delta in attente['deltas'].items():
+        stats[cle] += delta
+
+    for ligne in attente['ajouts']:
+        if ligne['date'] >= debut_jour:
+            stats['ventes_jour'] += ligne['montant_total']
+    if attente['ajouts']:
+        dernieres = attente['ajouts'][::-1] + _etat['dernieres']
+        dernieres.sort(key=lambda l: (l['date'], l['id']), reverse=True)
+        _etat['dernieres'] = dernieres[:NB_DERNIERES]
+
+    for conso_id, (date, quantite, delta) in attente['modifs'].items():
+        if date >= debut_jour:
+            stats['ventes_jour'] += delta
+        for ligne in _etat['dernieres']:
+            if ligne['id'] == conso_id:
+                ligne.update(quantite=quantite, montant_total=ligne['montant_total'] + delta)
+
+
+@event.listens_for(Session, 'after_commit')
+def _publier(session):
+    attente = session.info.pop('tableau_bord', None)
+    if attente:
+        with _verrou:
+            _etat['generation'] += 1
+            _appliquer(attente)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _oublier(session):
+    session.info.pop('tableau_bord', None)
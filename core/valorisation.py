@@ -0,0 +1,92 @@
+# core/valorisation.py
+"""Valorisation du stock calculée par SQLite.
+
+La valeur courante (et sa répartition par catégorie ou fournisseur) est une
+agrégation SUM(stock * prix) sur les produits actifs. L'historique garde une
+ligne par jour dans valeur_stock_journaliere : le relevé du jour est remplacé
+à chaque nouvel enregistrement, la dernière valeur de la journée fait donc
+foi. Le relevé est pris par la commande `flask releve-stock`, à planifier en
+fin de journée ; les lectures n'écrivent jamais. Les courbes de tendance
+lisent cet historique sans rejouer StockLog.
+"""
+from datetime import datetime
+from sqlalchemy import select, func, delete, insert, literal, Date, DateTime
+from models import db, Produit, Categorie, Fournisseur, ValeurStockJournaliere
+
+_historique = ValeurStockJournaliere.__table__
+
+REPARTITIONS = {
+    'categorie': (Categorie, Produit.categorie_id, 'Sans catégorie'),
+    'fournisseur': (Fournisseur, Produit.fournisseur_id, 'Sans fournisseur'),
+}
+
+
+def _agregats():
+    return (
+        func.coalesce(func.sum(Produit.stock * Produit.prix_achat), 0).label('valeur_achat'),
+        func.coalesce(func.sum(Produit.stock * Produit.prix_vente), 0).label('valeur_vente'),
+        func.count().label('total_produits'),
+        func.coalesce(func.sum(Produit.stock), 0).label('total_items'),
+    )
+
+
+def valeur_actuelle():
+    ligne = db.session.execute(select(*_agregats()).where(Produit.actif == True)).one()
+    return {
+        'valeur_achat': ligne.valeur_achat,
+        'valeur_vente': ligne.valeur_vente,
+        'marge_potentielle': ligne.valeur_vente - ligne.valeur_achat,
+        'total_produits': ligne.total_produits,
+        'total_items': ligne.total_items,
+    }
+
+
+def repartition(par):
+    """Valeur des produits actifs groupée par 'categorie' ou 'fournisseur'"""
+    modele, cle, sans_nom = REPARTITIONS[par]
+    lignes = db.session.execute(
+        select(modele.id, modele.nom, *_agregats())
+        .select_from(Produit)
+        .outerjoin(modele, modele.id == cle)
+        .where(Produit.actif == True)
+        .group_by(modele.id, modele.nom)
+        .order_by(func.sum(Produit.stock * Produit.prix_achat).desc())
+    )
+    return [{
+        'id': l.id,
+        'nom': l.nom or sans_nom,
+        'valeur_achat': l.valeur_achat,
+        'valeur_vente': l.valeur_vente,
+        'marge_potentielle': l.valeur_vente - l.valeur_achat,
+        'total_produits': l.total_produits,
+        'total_items': l.total_items,
+    } for l in lignes]
+
+
+# --- Historique journalier ---
+def enregistrer_releve(jour=None):
+    """Remplace le relevé du jour par la valeur courante, dans une transaction
+    d'écriture courte et indépendante de celle de l'appelant"""
+    jour = jour or datetime.now().date()
+    releve = select(literal(jour, Date), *_agregats(), literal(datetime.utcnow(), DateTime)).where(Produit.actif == True)
+    with db.engine.connect().execution_options(ecriture=True) as conn, conn.begin():
+        conn.execute(delete(_historique).where(_historique.c.jour == jour))
+        conn.execute(insert(_historique).from_select(
+            ['jour', 'valeur_achat', 'valeur_vente', 'total_produits', 'total_items', 'date_maj'], releve
+        ))
+
+
+def historique(jour_debut=None, jour_fin=None):
+    requete = select(_historique).order_by(_historique.c.jour)
+    if jour_debut:
+        requete = requete.where(_historique.c.jour >= jour_debut)
+    if jour_fin:
+        requete = requete.where(_historique.c.jour <= jour_fin)
+    return [{
+        'jour': l.jour.isoformat(),
+        'valeur_achat': l.valeur_achat,
+        'valeur_vente': l.valeur_vente,
+        'marge_potentielle': l.valeur_vente - l.valeur_achat,
+        'total_produits': l.total_produits,
+        'total_items': l.total_items,
+    } for l in db.session.execute(requete)]
@@ -1,10 +1,11 @@
 # core/ventes.py
 from datetime import datetime
-from core.crud import create, read, update, log_action
+from core.crud import create, read, update, log_action, operation
 from core.produits import _mouvement_stock
 from core.compta import enregistrer_recette
 
 # --- Enregistrer une consommation (vente directe ou sur compte abonné) ---
+@operation
 def enregistrer_consommation(abonne_id, produit_id, quantite, utilisateur_id=None):
     # 1. Créer une ligne consommation
     data = {
@@ -28,6 +29,7 @@ def enregistrer_consommation(abonne_id, produit_id, quantite, utilisateur_id=Non
     return conso_id
 
 # --- Création d’une facture ---
+@operation
 def creer_facture(abonne_id, utilisateur_id=None):
     data = {
         "abonne_id": abonne_id,
@@ -39,6 +41,7 @@ def creer_facture(abonne_id, utilisateur_id=None):
     return facture_id
 
 # --- Ajouter un produit à une facture ---
+@operation
 def _ajouter_produit_facture(facture_id, produit_id, quantite):
     """Calcule le total et met à jour la facture."""
     produits = read("produits", {"id": produit_id})
@@ -52,6 +55,7 @@ def _ajouter_produit_facture(facture_id, produit_id, quantite):
     update("factures", {"montant_total": nouveau_total}, {"id": facture_id})
 
 # --- Paiement d’une facture ---
+@operation
 def payer_facture(facture_id, montant, mode, utilisateur_id=None):
     data = {
         "facture_id": facture_id,
@@ -65,7 +69,7 @@ def payer_facture(facture_id, montant, mode, utilisateur_id=None):
 
     # Passage de la facture à payée
     update("factures", {"statut": "payee"}, {"id": facture_id})
-    log_action(utilisateur_id, "FACTURE_PAYEE", f"Facture {facture_id} réglée ({montant} {mode})")
+    log_action(utilisateur_id, "FACTURE_PAYEE", f"Facture {facture_id} réglée ({montant} {mode})", sync=True)
 
     return paiement_id
 
@@ -0,0 +1,155 @@
+# core/ventes_journalieres.py
+"""Cumul journalier des ventes (table ventes_journalieres).
+
+Une ligne par (jour, produit) : quantité, montant et nombre de
+consommations, mise à jour dans la transaction de chaque création,
+modification ou suppression de consommation. Les statistiques sur une
+période lisent le cumul pour les jours complets et la table consommation
+uniquement pour les fractions de jour en début et fin de période.
+"""
+from datetime import datetime, time, timedelta
+from sqlalchemy import func, select, delete, union_all, insert as insert_standard
+from sqlalchemy.dialects.sqlite import insert
+from models import db, Consommation, VenteJournaliere
+
+_cumuls = VenteJournaliere.__table__
+
+
+# --- Mise à jour incrémentale ---
+def _cumuler(variations):
+    """variations : {(jour, produit_id): (quantite, montant, nombre)}"""
+    variations = {cle: v for cle, v in variations.items() if any(v)}
+    if not variations:
+        return
+    instruction = insert(_cumuls)
+    instruction = instruction.on_conflict_do_update(
+        index_elements=['jour', 'produit_id'],
+        set_={
+            'quantite': _cumuls.c.quantite + instruction.excluded.quantite,
+            'montant': _cumuls.c.montant + instruction.excluded.montant,
+            'nombre': _cumuls.c.nombre + instruction.excluded.nombre,
+        }
+    )
+    db.session.execute(instruction, [
+        {'jour': jour, 'produit_id': produit_id, 'quantite': q, 'montant': m, 'nombre': n}
+        for (jour, produit_id), (q, m, n) in variations.items()
+    ])
+
+
+def consommations_ajoutees(consommations):
+    variations = {}
+    for c in consommations:
+        q, m, n = variations.get((c.date.date(), c.produit_id), (0, 0, 0))
+        variations[(c.date.date(), c.produit_id)] = (q + c.quantite, m + c.montant_total, n + 1)
+    _cumuler(variations)
+
+
+def consommation_ajoutee(consommation):
+    consommations_ajoutees([consommation])
+
+
+def consommation_modifiee(consommation, ancienne_quantite, ancien_montant):
+    _cumuler({(consommation.date.date(), consommation.produit_id): (
+        consommation.quantite - ancienne_quantite, consommation.montant_total - ancien_montant, 0
+    )})
+
+
+def consommation_supprimee(consommation):
+    cle = (consommation.date.date(), consommation.produit_id)
+    _cumuler({cle: (-consommation.quantite, -consommation.montant_total, -1)})
+    db.session.execute(delete(_cumuls).where(
+        _cumuls.c.jour == cle[0], _cumuls.c.produit_id == cle[1], _cumuls.c.nombre <= 0
+    ))
+
+
+# --- Reconstruction ---
+def reconstruire(jour_debut=None, jour_fin=None):
+    """Recalcule le cumul depuis la table consommation (jours inclus, tout si None).
+    Ne commit pas : à l'appelant de valider la transaction."""
+    jour = func.date(Consommation.date)
+    source = select(
+        jour, Consommation.produit_id, func.sum(Consommation.quantite),
+        func.sum(Consommation.montant_total), func.count()
+    ).group_by(jour, Consommation.produit_id)
+    purge = delete(_cumuls)
+    if jour_debut:
+        source = source.where(Consommation.date >= datetime.combine(jour_debut, time.min))
+        purge = purge.where(_cumuls.c.jour >= jour_debut)
+    if jour_fin:
+        source = source.where(Consommation.date < datetime.combine(jour_fin + timedelta(days=1), time.min))
+        purge = purge.where(_cumuls.c.jour <= jour_fin)
+
+    db.session.execute(purge)
+    return db.session.execute(insert_standard(_cumuls).from_select(
+        ['jour', 'produit_id', 'quantite', 'montant', 'nombre'], source
+    )).rowcount
+
+
+def initialiser_ventes_manquantes():
+    """Remplit le cumul sur une base antérieure à la table (cumul vide)"""
+    if db.session.execute(select(_cumuls.c.jour).limit(1)).first():
+        return 0
+    if not db.session.execute(select(Consommation.id).limit(1)).first():
+        return 0
+    return reconstruire()
+
+
+# --- Lecture ---
+def _jours_complets(debut, fin):
+    """Premier et dernier jour entièrement couverts par [debut, fin] (bornes incluses)"""
+    premier = None
+    if debut is not None:
+        premier = debut.date() if debut.time() == time.min else debut.date() + timedelta(days=1)
+    dernier = None
+    if fin is not None:
+        dernier = fin.date() if fin.time() == time.max else fin.date() - timedelta(days=1)
+    return premier, dernier
+
+
+def _brut(*conditions):
+    """Agrégat par produit lu dans la table consommation"""
+    return select(
+        Consommation.produit_id.label('produit_id'),
+        func.sum(Consommation.quantite).label('quantite'),
+        func.sum(Consommation.montant_total).label('montant'),
+        func.count().label('nombre')
+    ).where(*conditions).group_by(Consommation.produit_id)
+
+
+def requete_periode(debut=None, fin=None):
+    """Ventes par produit sur [debut, fin] (bornes incluses, None = ouvert) :
+    colonnes produit_id, quantite, montant, nombre. Le cumul couvre les jours
+    complets, la table consommation seulement les fractions de jour aux bords."""
+    premier, dernier = _jours_complets(debut, fin)
+    if premier is not None and dernier is not None and premier > dernier:
+        # Moins d'un jour complet : tout vient de la table brute
+        return _brut(Consommation.date >= debut, Consommation.date <= fin)
+
+    conditions = []
+    parties = []
+    if premier is not None:
+        conditions.append(_cumuls.c.jour >= premier)
+        if debut.date() != premier:
+            parties.append(_brut(Consommation.date >= debut,
+                                 Consommation.date < datetime.combine(premier, time.min)))
+    if dernier is not None:
+        conditions.append(_cumuls.c.jour <= dernier)
+        if fin.date() != dernier:
+            parties.append(_brut(Consommation.date >= datetime.combine(dernier + timedelta(days=1), time.min),
+                                 Consommation.date <= fin))
+    cumul = select(
+        _cumuls.c.produit_id.label('produit_id'),
+        func.sum(_cumuls.c.quantite).label('quantite'),
+        func.sum(_cumuls.c.montant).label('montant'),
+        func.sum(_cumuls.c.nombre).label('nombre')
+    ).where(*conditions).group_by(_cumuls.c.produit_id)
+    if not parties:
+        return cumul
+
+    ventes = union_all(cumul, *parties).subquery()
+    return select(
+        ventes.c.produit_id,
+        func.sum(ventes.c.quantite).label('quantite'),
+        func.sum(ventes.c.montant).label('montant'),
+        func.sum(ventes.c.nombre).label('nombre')
+    ).group_by(ventes.c.produit_id)
@@ -0,0 +1,63 @@
+# core/versions.py
+"""Compteurs de version par table, pour les ETag des listes de référence.
+
+Chaque table suivie a une ligne dans version_table, incrémentée par des
+triggers SQLite à chaque ligne insérée, modifiée ou supprimée. Le compteur
+avance donc dans la transaction qui écrit, quel que soit l'écrivain : vues
+de l'application, commandes flask, autre worker ou SQL direct ; une
+transaction annulée n'avance rien. Les compteurs étant dans la base, tous
+les processus calculent le même ETag.
+"""
+from sqlalchemy import select
+from models import db, VersionTable
+
+# Tables dont les listes portent un ETag (routes/etags.py)
+TABLES_SUIVIES = ('produit', 'categorie', 'fournisseur')
+
+# Préfixe des ETag : à changer si la forme des réponses change sans écriture
+# en base (listes constantes comme /api/paiements/modes)
+PREFIXE = 'v1'
+
+
+def _ddl(table):
+    incrementer = f"UPDATE version_table SET valeur = valeur + 1 WHERE nom = '{table}';"
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS version_{table}_{suffixe} AFTER {operation} ON {table} "
+        f"BEGIN {incrementer} END"
+        for suffixe, operation in (('ai', 'INSERT'), ('au', 'UPDATE'), ('ad', 'DELETE'))
+    ]
+
+
+def installer_compteurs(conn):
+    """Crée (idempotent) les lignes de compteur et leurs triggers"""
+    for table in TABLES_SUIVIES:
+        conn.exec_driver_sql("INSERT OR IGNORE INTO version_table (nom, valeur) VALUES (?, 0)", (table,))
+        for ddl in _ddl(table):
+            conn.exec_driver_sql(ddl)
+
+
+def _table(modele):
+    return modele if isinstance(modele, str) else modele.__tablename__
+
+
+def verifier(*modeles):
+    """Lève ValueError si une table n'est pas suivie (ETag jamais invalidé)"""
+    absentes = [t for t in map(_table, modeles) if t not in TABLES_SUIVIES]
+    if absentes:
+        raise ValueError(f"Table(s) sans compteur de version : {', '.join(absentes)}")
+
+
+def version(*modeles):
+    """Versions courantes des tables (modèles ou noms de table)"""
+    tables = [_table(m) for m in modeles]
+    if not tables:
+        return ()
+    valeurs = dict(db.session.execute(
+        select(VersionTable.nom, VersionTable.valeur).where(VersionTable.nom.in_(tables))
+    ).all())
+    return tuple(valeurs.get(t, 0) for t in tables)
+
+
+def etag(*modeles):
+    """Valeur d'ETag (sans W/) des données lues dans ces tables"""
+    return '-'.join([PREFIXE, *map(str, version(*modeles))])
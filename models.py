@@ -60,6 +60,10 @@ class Fournisseur(db.Model):
     # Relations
     produits = db.relationship('Produit', backref='fournisseur', lazy=True)
 
+    __table_args__ = (
+        db.Index('ix_fournisseur_nom', 'nom'),
+    )
+
 
 class Produit(db.Model):
     """Produits en vente"""
@@ -85,6 +89,11 @@ class Produit(db.Model):
 
     __table_args__ = (
         db.UniqueConstraint('nom', 'type', name='uq_nom_type'),
+        db.Index('ix_produit_actif_nom', 'actif', 'nom'),
+        db.Index('ix_produit_actif_stock', 'actif', 'stock'),
+        # Index partiel : produits actifs en stock critique
+        db.Index('ix_produit_stock_critique', 'stock',
+                 sqlite_where=db.and_(actif == True, stock <= stock_alerte)),
     )
     
     @property
@@ -119,6 +128,12 @@ class Abonne(db.Model):
     # Relations
     consommations = db.relationship('Consommation', backref='abonne', lazy=True)
     factures = db.relationship('Facture', backref='abonne', lazy=True)
+    solde = db.relationship('SoldeAbonne', backref='abonne', uselist=False, lazy=True)
+
+    __table_args__ = (
+        db.Index('ix_abonne_actif_nom', 'actif', 'nom'),
+        db.Index('ix_abonne_nom', 'nom'),
+    )
     
     @property
     def nom_complet(self):
@@ -126,17 +141,44 @@ class Abonne(db.Model):
     
     @property
     def conso_totale(self):
-        """Calcul de la consommation totale à partir des consommations."""
-        return sum(c.montant_total for c in self.consommations)
+        """Consommation totale (lue dans le solde maintenu si disponible)"""
+        if self.solde is not None:
+            return self.solde.conso_totale
+        return self.calculer_conso_totale()
     
     @property
     def solde_du(self):
+        """Solde dû (lu dans le solde maintenu si disponible)"""
+        if self.solde is not None:
+            return self.solde.solde_du
+        return self.calculer_solde_du()
+    
+    def calculer_conso_totale(self):
+        """Calcul de la consommation totale à partir des consommations."""
+        return sum(c.montant_total for c in self.consommations)
+    
+    def calculer_solde_du(self):
         """Calcul du solde dû (factures impayées)"""
         total_factures = sum(f.montant_ttc for f in self.factures if f.statut != 'payee')
         total_paiements = sum(p.montant for f in self.factures for p in f.paiements)
         return total_factures - total_paiements
 
 
+class SoldeAbonne(db.Model):
+    """Soldes courants des abonnés, maintenus à chaque écriture"""
+    __tablename__ = 'solde_abonne'
+    
+    abonne_id = db.Column(db.Integer, db.ForeignKey('abonne.id'), primary_key=True)
+    conso_totale = db.Column(db.Float, nullable=False, default=0)
+    montant_du = db.Column(db.Float, nullable=False, default=0)  # TTC des factures non payées
+    montant_paye = db.Column(db.Float, nullable=False, default=0)  # Total des paiements reçus
+    date_maj = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    @property
+    def solde_du(self):
+        return self.montant_du - self.montant_paye
+
+
 class Consommation(db.Model):
     """Enregistrement des consommations"""
     __tablename__ = 'consommation'
@@ -150,6 +192,16 @@ class Consommation(db.Model):
     date = db.Column(db.DateTime, default=datetime.utcnow)
     facture_id = db.Column(db.Integer, db.ForeignKey('facture.id'))
     note = db.Column(db.Text)
+
+    __table_args__ = (
+        db.Index('ix_consommation_date', 'date'),
+        db.Index('ix_consommation_abonne_date', 'abonne_id', 'date'),
+        db.Index('ix_consommation_produit_date', 'produit_id', 'date'),
+        db.Index('ix_consommation_facture', 'facture_id'),
+        # Index partiel : consommations non facturées par abonné
+        db.Index('ix_consommation_non_facturee', 'abonne_id', 'date',
+                 sqlite_where=facture_id.is_(None)),
+    )
     
     def __init__(self, **kwargs):
         super(Consommation, self).__init__(**kwargs)
@@ -159,6 +211,21 @@ class Consommation(db.Model):
             self.montant_total = self.quantite * self.prix_unitaire
 
 
+class VenteJournaliere(db.Model):
+    """Cumul des consommations par jour et par produit, maintenu à chaque écriture"""
+    __tablename__ = 'ventes_journalieres'
+    
+    jour = db.Column(db.Date, primary_key=True)
+    produit_id = db.Column(db.Integer, db.ForeignKey('produit.id'), primary_key=True)
+    quantite = db.Column(db.Integer, nullable=False, default=0)
+    montant = db.Column(db.Float, nullable=False, default=0)
+    nombre = db.Column(db.Integer, nullable=False, default=0)  # Nombre de consommations
+
+    __table_args__ = (
+        db.Index('ix_ventes_journalieres_produit_jour', 'produit_id', 'jour'),
+    )
+
+
 class Facture(db.Model):
     """Factures émises"""
     __tablename__ = 'facture'
@@ -179,6 +246,12 @@ class Facture(db.Model):
     # Relations
     consommations = db.relationship('Consommation', backref='facture', lazy=True)
     paiements = db.relationship('Paiement', backref='facture', lazy=True, cascade='all, delete-orphan')
+
+    __table_args__ = (
+        db.Index('ix_facture_date_emission', 'date_emission'),
+        db.Index('ix_facture_statut_date', 'statut', 'date_emission'),
+        db.Index('ix_facture_abonne_date', 'abonne_id', 'date_emission'),
+    )
     
     def calculer_montants(self):
         """Calcul automatique des montants HT, TVA et TTC"""
@@ -217,6 +290,12 @@ class Paiement(db.Model):
     recu_par = db.Column(db.String(100))
     note = db.Column(db.Text)
 
+    __table_args__ = (
+        db.Index('ix_paiement_date', 'date_paiement'),
+        db.Index('ix_paiement_facture', 'facture_id'),
+        db.Index('ix_paiement_mode_date', 'mode_paiement', 'date_paiement'),
+    )
+
 
 class StockLog(db.Model):
     """Journal des mouvements de stock"""
@@ -233,6 +312,54 @@ class StockLog(db.Model):
     commentaire = db.Column(db.Text)
     reference = db.Column(db.String(50))  # Référence bon de commande, facture fournisseur, etc.
 
+    __table_args__ = (
+        db.Index('ix_stock_log_date', 'date'),
+        db.Index('ix_stock_log_produit_date', 'produit_id', 'date'),
+    )
+
+
+class AlerteStock(db.Model):
+    """Franchissements du seuil d'alerte de stock (flux d'alertes)"""
+    __tablename__ = 'alerte_stock'
+    
+    id = db.Column(db.Integer, primary_key=True)  # Curseur du flux
+    produit_id = db.Column(db.Integer, db.ForeignKey('produit.id'), nullable=False)
+    type = db.Column(db.String(20), nullable=False)  # critique (passe sous le seuil), normal (repasse au-dessus)
+    stock = db.Column(db.Integer, nullable=False)
+    stock_alerte = db.Column(db.Integer, nullable=False)
+    date = db.Column(db.DateTime, default=datetime.utcnow)
+
+    produit = db.relationship('Produit')
+
+
+class ValeurStockJournaliere(db.Model):
+    """Valorisation du stock en fin de journée (historique des tendances)"""
+    __tablename__ = 'valeur_stock_journaliere'
+    
+    jour = db.Column(db.Date, primary_key=True)
+    valeur_achat = db.Column(db.Float, nullable=False, default=0)
+    valeur_vente = db.Column(db.Float, nullable=False, default=0)
+    total_produits = db.Column(db.Integer, nullable=False, default=0)
+    total_items = db.Column(db.Integer, nullable=False, default=0)
+    date_maj = db.Column(db.DateTime, default=datetime.utcnow)  # Dernier relevé de la journée
+
+
+class SequenceNumero(db.Model):
+    """Compteurs de numérotation par préfixe et par période"""
+    __tablename__ = 'sequence_numero'
+    
+    prefixe = db.Column(db.String(10), primary_key=True)  # FAC, ABN, PRD...
+    periode = db.Column(db.String(10), primary_key=True, default='')  # AAAAMM, AAAA ou '' (sans période)
+    valeur = db.Column(db.Integer, nullable=False, default=0)  # Dernier numéro attribué
+
+
+class VersionTable(db.Model):
+    """Compteur d'écritures par table, tenu par des triggers (core/versions.py)"""
+    __tablename__ = 'version_table'
+    
+    nom = db.Column(db.String(50), primary_key=True)  # Nom de la table suivie
+    valeur = db.Column(db.Integer, nullable=False, default=0)  # Lignes écrites depuis la création
+
 
 class ParametresGlobaux(db.Model):
     """Paramètres de configuration de la cave"""
@@ -2,51 +2,39 @@
 
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
-from models import db, Abonne, Facture
+from models import db, Abonne, Facture, Consommation
 from datetime import datetime
-from sqlalchemy import or_, func
+from core import soldes, numerotation, tableau_bord, pagination, json_rapide
+from core import recherche as recherche_fts
+from routes import serialiseurs
 
 abonnes_bp = Blueprint('abonnes', __name__)
 
 @abonnes_bp.route('/abonnes', methods=['GET'])
 @login_required
 def get_abonnes():
-    """Récupérer tous les abonnés"""
+    """Récupérer les abonnés par nom (pagination par curseur)"""
     try:
+        curseur, limite, total = pagination.parametres(request.args)
+        champs = serialiseurs.abonne.selection(request.args.get('fields'))
         recherche = request.args.get('recherche', '').strip()
         actif = request.args.get('actif', 'true').lower() == 'true'
 
-        query = Abonne.query
+        query = serialiseurs.abonne.requete(champs)
         if actif:
-            query = query.filter_by(actif=True)
+            query = query.filter(Abonne.actif == True)
 
+        cle = (Abonne.nom, Abonne.id)
         if recherche:
-            pattern = f"%{recherche}%"
-            query = query.filter(
-                or_(
-                    Abonne.numero_abonne.like(pattern),
-                    Abonne.nom.like(pattern),
-                    Abonne.prenom.like(pattern),
-                    Abonne.telephone.like(pattern)
-                )
-            )
-
-        abonnes = query.order_by(Abonne.nom).all()
-
-        data = []
-        for a in abonnes:
-            data.append({
-                'id': a.id,
-                'numero_abonne': a.numero_abonne,
-                'nom': a.nom,
-                'prenom': a.prenom,
-                'nom_complet': a.nom_complet,
-                'telephone': a.telephone,
-                'conso_totale': a.conso_totale,  # ⚡ nouvelle info
-                'solde_du': a.solde_du
-            })
+            query = recherche_fts.filtrer(query, Abonne, recherche)
+            # Résultats classés par pertinence, page après page
+            cle = recherche_fts.cle_tri(Abonne, recherche) or cle
+
+        page = pagination.paginer(query, cle, curseur, limite, total=total)
 
-        return jsonify({'success': True, 'data': data})
+        return json_rapide.reponse_liste(champs, page.elements, **page.meta())
+    except (pagination.CurseurInvalide, serialiseurs.ChampsInconnus) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         # Log serveur à faire ici
         return jsonify({'success': False, 'error': 'Erreur serveur'}), 500
@@ -111,9 +99,7 @@ def create_abonne():
             if Abonne.query.filter_by(numero_abonne=numero).first():
                 return jsonify({'success': False, 'error': 'Numéro d\'abonné déjà utilisé'}), 400
         else:
-            # Générer numéro unique basé sur max(id)
-            max_id = db.session.query(func.max(Abonne.id)).scalar() or 0
-            numero = f'ABN{max_id + 1:05d}'
+            numero = numerotation.numero_abonne()
 
         abonne = Abonne(
             numero_abonne=numero,
@@ -127,7 +113,9 @@ def create_abonne():
             date_inscription=datetime.utcnow()
         )
 
+        soldes.initialiser_solde(abonne)
         db.session.add(abonne)
+        tableau_bord.invalider()
         db.session.commit()
 
         return jsonify({
@@ -160,6 +148,7 @@ def update_abonne(id):
             if field in data:
                 setattr(abonne, field, data[field])
 
+        tableau_bord.invalider()
         db.session.commit()
 
         return jsonify({
@@ -191,6 +180,7 @@ def delete_abonne(id):
             return jsonify({'success': False, 'error': 'Abonné a des factures impayées'}), 400
 
         abonne.actif = False
+        tableau_bord.invalider()
         db.session.commit()
 
         return jsonify({'success': True, 'message': 'Abonné désactivé avec succès'})
@@ -205,21 +195,17 @@ def delete_abonne(id):
 def get_historique_abonne(id):
     """Récupérer l'historique des consommations d'un abonné"""
     try:
+        curseur, limite, total = pagination.parametres(request.args)
+        champs = serialiseurs.consommation_abonne.selection(request.args.get('fields'))
         abonne = Abonne.query.get_or_404(id)
+        page = pagination.paginer(
+            serialiseurs.consommation_abonne.requete(champs).filter(Consommation.abonne_id == abonne.id),
+            (Consommation.date, Consommation.id), curseur, limite, total=total
+        )
 
-        data = []
-        for c in abonne.consommations:
-            data.append({
-                'id': c.id,
-                'date': c.date.isoformat() if c.date else None,
-                'produit': c.produit.nom,
-                'quantite': c.quantite,
-                'prix_unitaire': c.prix_unitaire,
-                'montant_total': c.montant_total,
-                'facture_id': c.facture_id
-            })
-
-        return jsonify({'success': True, 'data': data})
+        return json_rapide.reponse_liste(champs, page.elements, **page.meta())
 
+    except (pagination.CurseurInvalide, serialiseurs.ChampsInconnus) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': 'Erreur serveur'}), 500
@@ -1,28 +1,34 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
-from models import db, Consommation, Produit, Abonne, StockLog
+from models import db, Consommation, Produit, Abonne, Categorie
+from sqlalchemy import select, func
 from datetime import datetime
+from core import soldes, stock, tableau_bord, ventes_journalieres, evenements, pagination, json_rapide
+from routes import serialiseurs
 
 consommations_bp = Blueprint('consommations', __name__)
 
 @consommations_bp.route('/consommations', methods=['GET'])
 @login_required
 def get_consommations():
-    """Récupérer toutes les consommations"""
+    """Récupérer les consommations, des plus récentes aux plus anciennes (pagination par curseur)"""
     try:
+        curseur, limite, total = pagination.parametres(request.args)
+        champs = serialiseurs.consommation.selection(request.args.get('fields'))
         abonne_id = request.args.get('abonne_id', '')
         produit_id = request.args.get('produit_id', '')
         date_debut = request.args.get('date_debut', '')
         date_fin = request.args.get('date_fin', '')
         facturees = request.args.get('facturees', '')
         
-        query = Consommation.query
+        # Lignes (tuples) des seules colonnes demandées, sans objets ORM
+        query = serialiseurs.consommation.requete(champs)
         
         if abonne_id:
-            query = query.filter_by(abonne_id=int(abonne_id))
+            query = query.filter(Consommation.abonne_id == int(abonne_id))
         
         if produit_id:
-            query = query.filter_by(produit_id=int(produit_id))
+            query = query.filter(Consommation.produit_id == int(produit_id))
         
         if date_debut:
             date_d = datetime.fromisoformat(date_debut)
@@ -37,25 +43,14 @@ def get_consommations():
         elif facturees == 'false':
             query = query.filter(Consommation.facture_id.is_(None))
         
-        consommations = query.order_by(Consommation.date.desc()).all()
+        page = pagination.paginer(
+            query, (Consommation.date, Consommation.id),
+            curseur, limite, descendant=True, total=total
+        )
         
-        return jsonify({
-            'success': True,
-            'data': [{
-                'id': c.id,
-                'abonne': c.abonne.nom_complet,
-                'abonne_id': c.abonne_id,
-                'produit': c.produit.nom,
-                'produit_id': c.produit_id,
-                'quantite': c.quantite,
-                'prix_unitaire': c.prix_unitaire,
-                'montant_total': c.montant_total,
-                'date': c.date.isoformat(),
-                'facture_id': c.facture_id,
-                'facture_numero': c.facture.numero_facture if c.facture else None,
-                'note': c.note
-            } for c in consommations]
-        })
+        return json_rapide.reponse_liste(champs, page.elements, **page.meta())
+    except (pagination.CurseurInvalide, serialiseurs.ChampsInconnus) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -115,10 +110,6 @@ def create_consommation():
         if quantite <= 0:
             return jsonify({'success': False, 'error': 'La quantité doit être supérieure à 0'}), 400
         
-        # Vérifier le stock
-        if produit.stock < quantite:
-            return jsonify({'success': False, 'error': f'Stock insuffisant (disponible: {produit.stock})'}), 400
-        
         # Prix unitaire
         try:
             prix_unitaire = float(data.get('prix_unitaire', produit.prix_vente))
@@ -138,23 +129,18 @@ def create_consommation():
         db.session.add(consommation)
         db.session.flush()  # Génère consommation.id avant de créer le log
         
-        # Mise à jour du stock
-        stock_avant = produit.stock
-        produit.stock -= quantite
-        
-        # Enregistrer le mouvement de stock
-        stock_log = StockLog(
-            produit_id=produit.id,
-            type_mouvement='sortie',
-            quantite=quantite,
-            stock_avant=stock_avant,
-            stock_apres=produit.stock,
+        # Sortie de stock conditionnelle (refusée si le stock ne suffit plus)
+        _, stock_restant = stock.sortie(
+            produit.id, quantite,
             utilisateur=current_user.username,
             commentaire=f'Vente à {abonne.nom_complet}',
             reference=f'Consommation #{consommation.id}'
         )
         
-        db.session.add(stock_log)
+        soldes.consommation_ajoutee(abonne.id, consommation.montant_total)
+        ventes_journalieres.consommation_ajoutee(consommation)
+        tableau_bord.consommation_ajoutee(consommation, abonne, produit)
+        evenements.publier('consommations', 'creee', serialiseurs.consommation(consommation))
         db.session.commit()
         
         return jsonify({
@@ -163,10 +149,13 @@ def create_consommation():
             'data': {
                 'id': consommation.id,
                 'montant_total': consommation.montant_total,
-                'stock_restant': produit.stock
+                'stock_restant': stock_restant
             }
         }), 201
     
+    except stock.StockInsuffisant as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         # logger l'erreur côté serveur
@@ -174,6 +163,121 @@ def create_consommation():
         return jsonify({'success': False, 'error': 'Une erreur est survenue lors de la création de la consommation'}), 500
 
 
+@consommations_bp.route('/consommations/ticket', methods=['POST'])
+@login_required
+def create_ticket():
+    """Enregistrer plusieurs consommations d'un abonné en une fois (tout ou rien)"""
+    if not current_user.has_permission('consommations'):
+        return jsonify({'success': False, 'error': 'Permission refusée'}), 403
+    
+    try:
+        data = request.get_json() or {}
+        if not isinstance(data, dict) or not isinstance(data.get('lignes') or [], list):
+            return jsonify({'success': False, 'error': 'Le corps doit être un objet avec une liste de lignes'}), 400
+        
+        # Validation des champs
+        try:
+            abonne_id = int(data.get('abonne_id'))
+            lignes = [{
+                'produit_id': int(ligne.get('produit_id')),
+                'quantite': int(ligne.get('quantite')),
+                'prix_unitaire': float(ligne['prix_unitaire']) if ligne.get('prix_unitaire') is not None else None,
+                'note': ligne.get('note', data.get('note', ''))
+            } for ligne in data.get('lignes') or []]
+        except (TypeError, ValueError, AttributeError):
+            return jsonify({'success': False, 'error': 'Abonné, produits, quantités et prix doivent être des nombres'}), 400
+        
+        if not lignes:
+            return jsonify({'success': False, 'error': 'Au moins une ligne requise'}), 400
+        
+        abonne = Abonne.query.get_or_404(abonne_id)
+        
+        # Tous les produits du ticket en une requête
+        produits = {p.id: p for p in Produit.query.filter(
+            Produit.id.in_({ligne['produit_id'] for ligne in lignes})
+        )}
+        
+        # Vérifier chaque ligne et le stock cumulé par produit
+        erreurs = []
+        demande = {}
+        for index, ligne in enumerate(lignes):
+            produit = produits.get(ligne['produit_id'])
+            if produit is None:
+                erreurs.append({'ligne': index, 'error': 'Produit introuvable'})
+                continue
+            if ligne['quantite'] <= 0:
+                erreurs.append({'ligne': index, 'error': 'La quantité doit être supérieure à 0'})
+                continue
+            demande[produit.id] = demande.get(produit.id, 0) + ligne['quantite']
+            if produit.stock < demande[produit.id]:
+                erreurs.append({'ligne': index, 'error': f'Stock insuffisant (disponible: {produit.stock})'})
+        
+        if erreurs:
+            return jsonify({'success': False, 'error': 'Ticket refusé', 'lignes': erreurs}), 400
+        
+        # Créer les consommations
+        consommations = []
+        for ligne in lignes:
+            produit = produits[ligne['produit_id']]
+            prix_unitaire = ligne['prix_unitaire'] if ligne['prix_unitaire'] is not None else produit.prix_vente
+            consommations.append(Consommation(
+                abonne_id=abonne.id,
+                produit_id=produit.id,
+                quantite=ligne['quantite'],
+                prix_unitaire=prix_unitaire,
+                montant_total=ligne['quantite'] * prix_unitaire,
+                note=ligne['note']
+            ))
+        
+        db.session.add_all(consommations)
+        db.session.flush()  # Un seul INSERT groupé, génère les id avant les logs
+        
+        # Sorties de stock conditionnelles et mouvements, ligne par ligne
+        resultats = []
+        for index, consommation in enumerate(consommations):
+            try:
+                _, stock_restant = stock.sortie(
+                    consommation.produit_id, consommation.quantite,
+                    utilisateur=current_user.username,
+                    commentaire=f'Vente à {abonne.nom_complet}',
+                    reference=f'Consommation #{consommation.id}'
+                )
+            except stock.StockInsuffisant as e:
+                # Stock vendu entre-temps par une autre caisse
+                db.session.rollback()
+                return jsonify({'success': False, 'error': 'Ticket refusé',
+                                'lignes': [{'ligne': index, 'error': str(e)}]}), 400
+            resultats.append({
+                'id': consommation.id,
+                'produit_id': consommation.produit_id,
+                'quantite': consommation.quantite,
+                'montant_total': consommation.montant_total,
+                'stock_restant': stock_restant
+            })
+        
+        montant_total = sum(c.montant_total for c in consommations)
+        soldes.consommation_ajoutee(abonne.id, montant_total)
+        ventes_journalieres.consommations_ajoutees(consommations)
+        for consommation in consommations:
+            tableau_bord.consommation_ajoutee(consommation, abonne, produits[consommation.produit_id])
+            evenements.publier('consommations', 'creee', serialiseurs.consommation(consommation))
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'message': f'{len(consommations)} consommation(s) enregistrée(s)',
+            'data': {
+                'montant_total': montant_total,
+                'lignes': resultats
+            }
+        }), 201
+    
+    except Exception as e:
+        db.session.rollback()
+        print(f"[ERREUR] create_ticket: {e}")
+        return jsonify({'success': False, 'error': "Une erreur est survenue lors de l'enregistrement du ticket"}), 500
+
+
 @consommations_bp.route('/consommations/<int:id>', methods=['PUT'])
 @login_required
 def update_consommation(id):
@@ -200,37 +304,31 @@ def update_consommation(id):
                 return jsonify({'success': False, 'error': 'Quantité invalide'}), 400
             
             difference = nouvelle_quantite - consommation.quantite
-            produit = consommation.produit
-            
-            if difference > 0 and produit.stock < difference:
-                return jsonify({
-                    'success': False,
-                    'error': f'Stock insuffisant (disponible: {produit.stock})'
-                }), 400
             
-            # Ajuster le stock
-            stock_avant = produit.stock
-            produit.stock -= difference
-            
-            # Enregistrer le mouvement
+            # Ajuster le stock (une hausse n'est appliquée que si le stock suffit)
             if difference != 0:
-                stock_log = StockLog(
-                    produit_id=produit.id,
-                    type_mouvement='ajustement',
-                    quantite=abs(difference),
-                    stock_avant=stock_avant,
-                    stock_apres=produit.stock,
-                    utilisateur=current_user.username,
-                    commentaire=f'Modification consommation #{consommation.id}'
-                )
-                db.session.add(stock_log)
+                try:
+                    stock.mouvement(
+                        consommation.produit_id, -difference, 'ajustement',
+                        utilisateur=current_user.username,
+                        commentaire=f'Modification consommation #{consommation.id}'
+                    )
+                except stock.StockInsuffisant as e:
+                    db.session.rollback()
+                    return jsonify({'success': False, 'error': str(e)}), 400
             
+            ancien_montant = consommation.montant_total
+            ancienne_quantite = consommation.quantite
             consommation.quantite = nouvelle_quantite
             consommation.montant_total = consommation.quantite * consommation.prix_unitaire
+            soldes.consommation_modifiee(consommation.abonne_id, ancien_montant, consommation.montant_total)
+            ventes_journalieres.consommation_modifiee(consommation, ancienne_quantite, ancien_montant)
+            tableau_bord.consommation_modifiee(consommation, ancien_montant)
         
         if 'note' in data:
             consommation.note = data['note']
         
+        evenements.publier('consommations', 'modifiee', serialiseurs.consommation(consommation))
         db.session.commit()
         
         return jsonify({
@@ -258,23 +356,17 @@ def delete_consommation(id):
             return jsonify({'success': False, 'error': 'Impossible de supprimer une consommation facturée'}), 400
         
         # Remettre le stock
-        produit = consommation.produit
-        stock_avant = produit.stock
-        produit.stock += consommation.quantite
-        
-        # Enregistrer le mouvement
-        stock_log = StockLog(
-            produit_id=produit.id,
-            type_mouvement='entree',
-            quantite=consommation.quantite,
-            stock_avant=stock_avant,
-            stock_apres=produit.stock,
+        stock.entree(
+            consommation.produit_id, consommation.quantite,
             utilisateur=current_user.username,
             commentaire=f'Annulation consommation #{consommation.id}'
         )
         
-        db.session.add(stock_log)
         db.session.delete(consommation)
+        soldes.consommation_supprimee(consommation.abonne_id, consommation.montant_total)
+        ventes_journalieres.consommation_supprimee(consommation)
+        tableau_bord.invalider()
+        evenements.publier('consommations', 'supprimee', {'id': id, 'abonne_id': consommation.abonne_id})
         db.session.commit()
         
         return jsonify({
@@ -293,47 +385,81 @@ def get_statistiques_consommations():
         date_debut = request.args.get('date_debut')
         date_fin = request.args.get('date_fin')
         
-        query = Consommation.query
+        date_d = datetime.fromisoformat(date_debut) if date_debut else None
+        date_f = datetime.fromisoformat(date_fin) if date_fin else None
         
-        if date_debut:
-            date_d = datetime.fromisoformat(date_debut)
-            query = query.filter(Consommation.date >= date_d)
+        try:
+            limite = min(max(int(request.args.get('limite', 10)), 1), 100)
+        except ValueError:
+            limite = 10
         
-        if date_fin:
-            date_f = datetime.fromisoformat(date_fin)
-            query = query.filter(Consommation.date <= date_f)
+        # Cumul journalier pour les jours complets, table brute pour les bords
+        ventes = ventes_journalieres.requete_periode(date_d, date_f).subquery()
         
-        consommations = query.all()
+        # Totaux
+        totaux = db.session.execute(select(
+            func.coalesce(func.sum(ventes.c.nombre), 0),
+            func.coalesce(func.sum(ventes.c.quantite), 0),
+            func.coalesce(func.sum(ventes.c.montant), 0)
+        )).one()
         
         # Produits les plus vendus
-        produits_stats = {}
-        for c in consommations:
-            if c.produit_id not in produits_stats:
-                produits_stats[c.produit_id] = {
-                    'nom': c.produit.nom,
-                    'quantite': 0,
-                    'montant': 0
-                }
-            produits_stats[c.produit_id]['quantite'] += c.quantite
-            produits_stats[c.produit_id]['montant'] += c.montant_total
-        
-        # Trier par quantité
-        top_produits = sorted(
-            produits_stats.values(),
-            key=lambda x: x['quantite'],
-            reverse=True
-        )[:10]
-        
-        total_ventes = sum(c.montant_total for c in consommations)
-        total_items = sum(c.quantite for c in consommations)
+        top_produits = [
+            {'id': l.id, 'nom': l.nom, 'quantite': l.quantite, 'montant': l.montant}
+            for l in db.session.execute(
+                select(Produit.id, Produit.nom, ventes.c.quantite, ventes.c.montant)
+                .join(Produit, Produit.id == ventes.c.produit_id)
+                .order_by(ventes.c.quantite.desc())
+                .limit(limite)
+            )
+        ]
+        
+        # Répartition par catégorie
+        par_categorie = [
+            {'id': l.id, 'nom': l.nom or 'Sans catégorie', 'quantite': l.quantite, 'montant': l.montant}
+            for l in db.session.execute(
+                select(Categorie.id, Categorie.nom,
+                       func.sum(ventes.c.quantite).label('quantite'),
+                       func.sum(ventes.c.montant).label('montant'))
+                .join(Produit, Produit.id == ventes.c.produit_id)
+                .outerjoin(Categorie, Categorie.id == Produit.categorie_id)
+                .group_by(Categorie.id, Categorie.nom)
+                .order_by(func.sum(ventes.c.montant).desc())
+            )
+        ]
+        
+        # Meilleurs abonnés (pas de cumul par abonné : agrégat sur la période)
+        par_abonne = select(
+            Consommation.abonne_id,
+            func.sum(Consommation.quantite).label('quantite'),
+            func.sum(Consommation.montant_total).label('montant'),
+            func.count().label('nombre')
+        ).group_by(Consommation.abonne_id)
+        if date_d:
+            par_abonne = par_abonne.where(Consommation.date >= date_d)
+        if date_f:
+            par_abonne = par_abonne.where(Consommation.date <= date_f)
+        par_abonne = par_abonne.order_by(func.sum(Consommation.montant_total).desc()).limit(limite).subquery()
+        top_abonnes = [
+            {'id': l.id, 'numero_abonne': l.numero_abonne, 'nom_complet': f"{l.nom} {l.prenom or ''}".strip(),
+             'quantite': l.quantite, 'montant': l.montant, 'nombre': l.nombre}
+            for l in db.session.execute(
+                select(Abonne.id, Abonne.numero_abonne, Abonne.nom, Abonne.prenom,
+                       par_abonne.c.quantite, par_abonne.c.montant, par_abonne.c.nombre)
+                .join(Abonne, Abonne.id == par_abonne.c.abonne_id)
+                .order_by(par_abonne.c.montant.desc())
+            )
+        ]
         
         return jsonify({
             'success': True,
             'data': {
-                'total_consommations': len(consommations),
-                'total_items_vendus': total_items,
-                'montant_total_ventes': total_ventes,
-                'top_produits': top_produits
+                'total_consommations': totaux[0],
+                'total_items_vendus': totaux[1],
+                'montant_total_ventes': totaux[2],
+                'top_produits': top_produits,
+                'par_categorie': par_categorie,
+                'top_abonnes': top_abonnes
             }
         })
     except Exception as e:
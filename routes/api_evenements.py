@@ -0,0 +1,37 @@
+# routes/api_evenements.py
+from flask import Blueprint, request, jsonify, Response
+from flask_login import login_required
+from models import db
+from core import evenements
+
+evenements_bp = Blueprint('evenements', __name__)
+
+# --- FLUX SSE ---
+@evenements_bp.route('/events', methods=['GET'])
+@login_required
+def flux_evenements():
+    """Flux Server-Sent Events des écritures validées.
+
+    ?sujets=consommations,stock (tous par défaut). Un client qui se reconnecte
+    envoie Last-Event-ID (ou ?dernier_id=) et reçoit les événements manqués,
+    ou un événement 'reset' s'ils ne sont plus dans le tampon."""
+    sujets = [s for s in request.args.get('sujets', '').split(',') if s] or list(evenements.SUJETS)
+    inconnus = set(sujets) - set(evenements.SUJETS)
+    if inconnus:
+        return jsonify({'success': False, 'error': f"Sujet(s) inconnu(s): {', '.join(sorted(inconnus))}"}), 400
+
+    dernier_id = request.headers.get('Last-Event-ID') or request.args.get('dernier_id')
+    try:
+        curseur = int(dernier_id) if dernier_id else None
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Last-Event-ID invalide'}), 400
+
+    # Le flux ne lit pas la base : la connexion prise par login_required est
+    # rendue au pool avant le streaming (sinon chaque flux ouvert garde une
+    # connexion et une transaction de lecture qui bloque les checkpoints WAL)
+    db.session.remove()
+    return Response(
+        evenements.abonner(sujets, curseur),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
@@ -2,7 +2,9 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
 from models import db, Facture, Consommation, Abonne
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, time
+from core import soldes, numerotation, facturation, evenements, pagination, lecture, json_rapide
+from routes import serialiseurs
 
 factures_bp = Blueprint('factures', __name__)# routes/api_consommations_factures.py
 from flask import Blueprint, request, jsonify
@@ -131,10 +133,7 @@ def create_facture():
         date_echeance = datetime.fromisoformat(data.get('date_echeance')) if data.get('date_echeance') else datetime.now() + timedelta(days=30)
 
         # Générer numéro facture unique
-        date_str = datetime.now().strftime('%Y%m')
-        dernier = Facture.query.filter(Facture.numero_facture.like(f'FAC-{date_str}-%')).order_by(Facture.id.desc()).first()
-        nouveau_num = int(dernier.numero_facture.split('-')[-1]) + 1 if dernier else 1
-        numero_facture = f'FAC-{date_str}-{nouveau_num:04d}'
+        numero_facture = numerotation.numero_facture()
 
         facture = Facture(numero_facture=numero_facture, abonne_id=abonne.id,
                           date_echeance=date_echeance, created_by_id=current_user.id,
@@ -160,20 +159,22 @@ def create_facture():
 @factures_bp.route('/factures', methods=['GET'])
 @login_required
 def get_factures():
-    """Récupérer toutes les factures"""
+    """Récupérer les factures, des plus récentes aux plus anciennes (pagination par curseur)"""
     try:
+        curseur, limite, total = pagination.parametres(request.args)
+        champs = serialiseurs.facture.selection(request.args.get('fields'))
         statut = request.args.get('statut', '')
         abonne_id = request.args.get('abonne_id', '')
         date_debut = request.args.get('date_debut', '')
         date_fin = request.args.get('date_fin', '')
         
-        query = Facture.query
+        query = serialiseurs.facture.requete(champs)
         
         if statut:
-            query = query.filter_by(statut=statut)
+            query = query.filter(Facture.statut == statut)
         
         if abonne_id:
-            query = query.filter_by(abonne_id=int(abonne_id))
+            query = query.filter(Facture.abonne_id == int(abonne_id))
         
         if date_debut:
             date_d = datetime.fromisoformat(date_debut)
@@ -183,25 +184,14 @@ def get_factures():
             date_f = datetime.fromisoformat(date_fin)
             query = query.filter(Facture.date_emission <= date_f)
         
-        factures = query.order_by(Facture.date_emission.desc()).all()
+        page = pagination.paginer(
+            query, (Facture.date_emission, Facture.id),
+            curseur, limite, descendant=True, total=total
+        )
         
-        return jsonify({
-            'success': True,
-            'data': [{
-                'id': f.id,
-                'numero_facture': f.numero_facture,
-                'abonne': f.abonne.nom_complet,
-                'abonne_id': f.abonne_id,
-                'montant_ht': f.montant_ht,
-                'montant_tva': f.montant_tva,
-                'montant_ttc': f.montant_ttc,
-                'statut': f.statut,
-                'date_emission': f.date_emission.isoformat(),
-                'date_echeance': f.date_echeance.isoformat() if f.date_echeance else None,
-                'montant_paye': f.montant_paye,
-                'reste_a_payer': f.reste_a_payer
-            } for f in factures]
-        })
+        return json_rapide.reponse_liste(champs, page.elements, **page.meta())
+    except (pagination.CurseurInvalide, serialiseurs.ChampsInconnus) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -273,18 +263,7 @@ def create_facture():
         abonne = Abonne.query.get_or_404(data['abonne_id'])
         
         # Générer numéro de facture
-        date_str = datetime.now().strftime('%Y%m')
-        dernier = Facture.query.filter(
-            Facture.numero_facture.like(f'FAC-{date_str}-%')
-        ).order_by(Facture.id.desc()).first()
-        
-        if dernier:
-            dernier_num = int(dernier.numero_facture.split('-')[-1])
-            nouveau_num = dernier_num + 1
-        else:
-            nouveau_num = 1
-        
-        numero_facture = f'FAC-{date_str}-{nouveau_num:04d}'
+        numero_facture = numerotation.numero_facture()
         
         # Créer la facture
         facture = Facture(
@@ -306,6 +285,9 @@ def create_facture():
         
         # Calculer les montants
         facture.calculer_montants()
+        soldes.facture_creee(facture)
+        evenements.publier('factures', 'creee', serialiseurs.facture(facture))
+        evenements.publier('consommations', 'facturation', {'abonne_ids': [facture.abonne_id]})
         
         db.session.commit()
         
@@ -322,6 +304,50 @@ def create_facture():
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@factures_bp.route('/factures/mensuelles', methods=['POST'])
+@login_required
+def facturer_mois():
+    """Facturer en lot toutes les consommations non facturées jusqu'à une date"""
+    if not current_user.has_permission('factures'):
+        return jsonify({'success': False, 'error': 'Permission refusée'}), 403
+    
+    try:
+        data = request.get_json() or {}
+        
+        if not data.get('date_limite'):
+            return jsonify({'success': False, 'error': 'Date limite obligatoire'}), 400
+        
+        try:
+            taille_lot = int(data.get('taille_lot', facturation.TAILLE_LOT))
+        except (ValueError, TypeError):
+            taille_lot = 0
+        if taille_lot < 1:
+            return jsonify({'success': False, 'error': 'taille_lot doit être un entier supérieur ou égal à 1'}), 400
+        
+        # Une date sans heure inclut toute la journée
+        date_limite = datetime.fromisoformat(data['date_limite'])
+        if 'T' not in data['date_limite'] and ' ' not in data['date_limite']:
+            date_limite = datetime.combine(date_limite.date(), time.max)
+        
+        rapport = facturation.facturer_periode(
+            date_limite,
+            date_echeance=datetime.fromisoformat(data['date_echeance']) if data.get('date_echeance') else None,
+            createur_id=current_user.id,
+            note=data.get('note', ''),
+            taille_lot=taille_lot
+        )
+        
+        return jsonify({
+            'success': True,
+            'message': f"{rapport['factures_creees']} facture(s) créée(s)",
+            'data': rapport
+        }), 201
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @factures_bp.route('/factures/<int:id>', methods=['PUT'])
 @login_required
 def update_facture(id):
@@ -342,6 +368,7 @@ def update_facture(id):
         if 'note' in data:
             facture.note = data['note']
         
+        evenements.publier('factures', 'modifiee', serialiseurs.facture(facture))
         db.session.commit()
         
         return jsonify({
@@ -371,6 +398,9 @@ def delete_facture(id):
             conso.facture_id = None
         
         db.session.delete(facture)
+        soldes.facture_supprimee(facture)
+        evenements.publier('factures', 'supprimee', {'id': id, 'abonne_id': facture.abonne_id})
+        evenements.publier('consommations', 'facturation', {'abonne_ids': [facture.abonne_id]})
         db.session.commit()
         
         return jsonify({
@@ -386,21 +416,14 @@ def delete_facture(id):
 def get_consommations_non_facturees(abonne_id):
     """Récupérer les consommations non facturées d'un abonné"""
     try:
-        consommations = Consommation.query.filter_by(
-            abonne_id=abonne_id,
-            facture_id=None
-        ).order_by(Consommation.date.desc()).all()
+        champs = serialiseurs.consommation_non_facturee.selection(request.args.get('fields'))
+        consommations = serialiseurs.consommation_non_facturee.requete(champs).filter(
+            Consommation.abonne_id == abonne_id,
+            Consommation.facture_id.is_(None)
+        ).order_by(Consommation.date.desc())
         
-        return jsonify({
-            'success': True,
-            'data': [{
-                'id': c.id,
-                'date': c.date.isoformat(),
-                'produit': c.produit.nom,
-                'quantite': c.quantite,
-                'prix_unitaire': c.prix_unitaire,
-                'montant_total': c.montant_total
-            } for c in consommations]
-        })
+        return json_rapide.reponse_liste(champs, lecture.lignes(consommations))
+    except serialiseurs.ChampsInconnus as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
\ No newline at end of file
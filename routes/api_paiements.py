@@ -1,27 +1,38 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
 from models import db, Paiement, Facture
-from datetime import datetime
+from datetime import datetime, timedelta
+from sqlalchemy import select, func
+from core import soldes, evenements, pagination, lecture, json_rapide
+from routes import serialiseurs
+from routes.etags import avec_etag
 
 paiements_bp = Blueprint('paiements', __name__)
 
+def _publier_paiement(type_evenement, paiement):
+    """Événements du flux SSE : le paiement, et la facture dont le reste à payer change"""
+    evenements.publier('paiements', type_evenement, serialiseurs.paiement(paiement))
+    evenements.publier('factures', 'solde', {'id': paiement.facture_id})
+
 @paiements_bp.route('/paiements', methods=['GET'])
 @login_required
 def get_paiements():
-    """Récupérer tous les paiements"""
+    """Récupérer les paiements, des plus récents aux plus anciens (pagination par curseur)"""
     try:
+        curseur, limite, total = pagination.parametres(request.args)
+        champs = serialiseurs.paiement.selection(request.args.get('fields'))
         facture_id = request.args.get('facture_id', '')
         date_debut = request.args.get('date_debut', '')
         date_fin = request.args.get('date_fin', '')
         mode_paiement = request.args.get('mode_paiement', '')
         
-        query = Paiement.query
+        query = serialiseurs.paiement.requete(champs)
         
         if facture_id:
-            query = query.filter_by(facture_id=int(facture_id))
+            query = query.filter(Paiement.facture_id == int(facture_id))
         
         if mode_paiement:
-            query = query.filter_by(mode_paiement=mode_paiement)
+            query = query.filter(Paiement.mode_paiement == mode_paiement)
         
         if date_debut:
             date_d = datetime.fromisoformat(date_debut)
@@ -31,23 +42,14 @@ def get_paiements():
             date_f = datetime.fromisoformat(date_fin)
             query = query.filter(Paiement.date_paiement <= date_f)
         
-        paiements = query.order_by(Paiement.date_paiement.desc()).all()
+        page = pagination.paginer(
+            query, (Paiement.date_paiement, Paiement.id),
+            curseur, limite, descendant=True, total=total
+        )
         
-        return jsonify({
-            'success': True,
-            'data': [{
-                'id': p.id,
-                'facture_numero': p.facture.numero_facture,
-                'facture_id': p.facture_id,
-                'abonne': p.facture.abonne.nom_complet,
-                'montant': p.montant,
-                'mode_paiement': p.mode_paiement,
-                'reference': p.reference,
-                'date_paiement': p.date_paiement.isoformat(),
-                'recu_par': p.recu_par,
-                'note': p.note
-            } for p in paiements]
-        })
+        return json_rapide.reponse_liste(champs, page.elements, **page.meta())
+    except (pagination.CurseurInvalide, serialiseurs.ChampsInconnus) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -101,6 +103,9 @@ def create_paiement():
         )
 
         db.session.add(paiement)
+        db.session.flush()
+        soldes.paiement_ajoute(paiement.facture, paiement.montant)
+        _publier_paiement('cree', paiement)
         db.session.commit()
 
         return jsonify({
@@ -138,6 +143,7 @@ def update_paiement(id):
                 }), 400
             
             paiement.montant = nouveau_montant
+            soldes.paiement_modifie(facture, ancien_montant, nouveau_montant)
         
         if 'mode_paiement' in data:
             paiement.mode_paiement = data['mode_paiement']
@@ -147,7 +153,8 @@ def update_paiement(id):
             paiement.note = data['note']
         
         # Mettre à jour le statut de la facture
-        paiement.facture.mettre_a_jour_statut()
+        soldes.mettre_a_jour_statut(paiement.facture)
+        _publier_paiement('modifie', paiement)
         
         db.session.commit()
         
@@ -171,9 +178,12 @@ def delete_paiement(id):
         facture = paiement.facture
         
         db.session.delete(paiement)
+        soldes.paiement_supprime(facture, paiement.montant)
         
         # Mettre à jour le statut de la facture
-        facture.mettre_a_jour_statut()
+        soldes.mettre_a_jour_statut(facture)
+        evenements.publier('paiements', 'supprime', {'id': id, 'facture_id': facture.id})
+        evenements.publier('factures', 'solde', {'id': facture.id})
         
         db.session.commit()
         
@@ -187,6 +197,7 @@ def delete_paiement(id):
 
 @paiements_bp.route('/paiements/modes', methods=['GET'])
 @login_required
+@avec_etag()
 def get_modes_paiement():
     """Récupérer la liste des modes de paiement disponibles"""
     modes = [
@@ -210,35 +221,121 @@ def get_statistiques_paiements():
         date_debut = request.args.get('date_debut')
         date_fin = request.args.get('date_fin')
         
-        query = Paiement.query
+        # Agrégat par mode de paiement calculé par SQLite
+        query = select(
+            Paiement.mode_paiement,
+            func.count().label('nombre'),
+            func.sum(Paiement.montant).label('montant')
+        ).group_by(Paiement.mode_paiement)
         
         if date_debut:
             date_d = datetime.fromisoformat(date_debut)
-            query = query.filter(Paiement.date_paiement >= date_d)
+            query = query.where(Paiement.date_paiement >= date_d)
         
         if date_fin:
             date_f = datetime.fromisoformat(date_fin)
-            query = query.filter(Paiement.date_paiement <= date_f)
+            query = query.where(Paiement.date_paiement <= date_f)
         
-        paiements = query.all()
+        stats_par_mode = {
+            l.mode_paiement: {'count': l.nombre, 'total': l.montant}
+            for l in lecture.lignes(query)
+        }
         
-        # Calcul par mode de paiement
-        stats_par_mode = {}
-        for p in paiements:
-            if p.mode_paiement not in stats_par_mode:
-                stats_par_mode[p.mode_paiement] = {'count': 0, 'total': 0}
-            stats_par_mode[p.mode_paiement]['count'] += 1
-            stats_par_mode[p.mode_paiement]['total'] += p.montant
+        return jsonify({
+            'success': True,
+            'data': {
+                'total_paiements': sum(s['count'] for s in stats_par_mode.values()),
+                'montant_total': sum(s['total'] for s in stats_par_mode.values()),
+                'par_mode': stats_par_mode
+            }
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+# --- Séries temporelles ---
+def _mois_suivant(d):
+    return d.replace(year=d.year + d.month // 12, month=d.month % 12 + 1)
+
+# pas -> (clé de regroupement SQL, début de période en Python, période suivante, intervalle par défaut)
+PAS_SERIES = {
+    'heure': (lambda col: func.strftime('%Y-%m-%dT%H:00', col),
+              lambda d: d.replace(minute=0, second=0, microsecond=0),
+              lambda d: d + timedelta(hours=1),
+              timedelta(days=2)),
+    'jour': (lambda col: func.strftime('%Y-%m-%d', col),
+             lambda d: d.replace(hour=0, minute=0, second=0, microsecond=0),
+             lambda d: d + timedelta(days=1),
+             timedelta(days=31)),
+    # Semaine du lundi au dimanche, identifiée par la date du lundi
+    'semaine': (lambda col: func.strftime('%Y-%m-%d', col, 'weekday 0', '-6 days'),
+                lambda d: (d - timedelta(days=d.weekday())).replace(hour=0, minute=0, second=0, microsecond=0),
+                lambda d: d + timedelta(weeks=1),
+                timedelta(weeks=26)),
+    'mois': (lambda col: func.strftime('%Y-%m', col),
+             lambda d: d.replace(day=1, hour=0, minute=0, second=0, microsecond=0),
+             _mois_suivant,
+             timedelta(days=365)),
+}
+FORMATS_SERIES = {'heure': '%Y-%m-%dT%H:00', 'jour': '%Y-%m-%d', 'semaine': '%Y-%m-%d', 'mois': '%Y-%m'}
+MAX_PERIODES = 2000
+
+@paiements_bp.route('/paiements/series', methods=['GET'])
+@login_required
+def get_series_paiements():
+    """Totaux des paiements par période (heure, jour, semaine, mois) et par mode,
+    périodes vides comprises"""
+    try:
+        pas = request.args.get('pas', 'jour')
+        if pas not in PAS_SERIES:
+            return jsonify({'success': False, 'error': f"Pas invalide (valeurs possibles: {', '.join(PAS_SERIES)})"}), 400
+        cle_sql, debut_periode, periode_suivante, duree_defaut = PAS_SERIES[pas]
+        
+        try:
+            date_f = datetime.fromisoformat(request.args['date_fin']) if request.args.get('date_fin') else datetime.now()
+            date_d = datetime.fromisoformat(request.args['date_debut']) if request.args.get('date_debut') else date_f - duree_defaut
+        except ValueError:
+            return jsonify({'success': False, 'error': 'Dates invalides'}), 400
+        if date_d > date_f:
+            return jsonify({'success': False, 'error': 'La date de début doit précéder la date de fin'}), 400
+        
+        # Toutes les périodes de l'intervalle, vides comprises
+        periodes = []
+        courante = debut_periode(date_d)
+        while courante <= date_f:
+            periodes.append(courante.strftime(FORMATS_SERIES[pas]))
+            if len(periodes) > MAX_PERIODES:
+                return jsonify({'success': False, 'error': f'Plus de {MAX_PERIODES} périodes : choisissez un pas plus grand'}), 400
+            courante = periode_suivante(courante)
+        index = {periode: i for i, periode in enumerate(periodes)}
         
-        total_general = sum(p.montant for p in paiements)
+        # Regroupement calculé par SQLite
+        periode = cle_sql(Paiement.date_paiement).label('periode')
+        requete = (select(periode, Paiement.mode_paiement, func.sum(Paiement.montant), func.count())
+                   .where(Paiement.date_paiement >= date_d, Paiement.date_paiement <= date_f)
+                   .group_by(periode, Paiement.mode_paiement))
+        if request.args.get('mode_paiement'):
+            requete = requete.where(Paiement.mode_paiement == request.args['mode_paiement'])
+        
+        series = {}
+        totaux = [0] * len(periodes)
+        nombres = [0] * len(periodes)
+        for cle, mode, montant, nombre in db.session.execute(requete):
+            i = index[cle]
+            series.setdefault(mode or 'inconnu', [0] * len(periodes))[i] += montant or 0
+            totaux[i] += montant or 0
+            nombres[i] += nombre
         
         return jsonify({
             'success': True,
             'data': {
-                'total_paiements': len(paiements),
-                'montant_total': total_general,
-                'par_mode': stats_par_mode
+                'pas': pas,
+                'date_debut': date_d.isoformat(),
+                'date_fin': date_f.isoformat(),
+                'periodes': periodes,
+                'series': series,
+                'totaux': totaux,
+                'nombres': nombres
             }
         })
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'success': False, 'error': str(e)}), 500
@@ -3,72 +3,49 @@ from flask_login import login_required, current_user
 from models import db, Produit, Categorie, Fournisseur
 from datetime import datetime
 from sqlalchemy.exc import IntegrityError
+from routes import serialiseurs
+from routes.etags import avec_etag
+from core import recherche as recherche_fts
+from core import numerotation, tableau_bord, alertes, pagination, json_rapide
 
 
 produits_bp = Blueprint('produits', __name__)
 
 @produits_bp.route('/produits', methods=['GET'])
 @login_required
+@avec_etag(Produit, Categorie, Fournisseur)
 def get_produits():
-    """Récupérer tous les produits avec filtres et pagination"""
+    """Récupérer les produits par nom avec filtres (pagination par curseur)"""
     try:
+        curseur, limite, total = pagination.parametres(request.args)
+        champs = serialiseurs.produit.selection(request.args.get('fields'))
         recherche = request.args.get('recherche', '')
         actif = request.args.get('actif', 'true').lower() == 'true'
         stock_critique = request.args.get('stock_critique', '').lower() == 'true'
         categorie_id = request.args.get('categorie_id')
         fournisseur_id = request.args.get('fournisseur_id')
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 20))
 
-        query = Produit.query
+        query = serialiseurs.produit.requete(champs)
 
         if actif:
-            query = query.filter_by(actif=True)
+            query = query.filter(Produit.actif == True)
         if stock_critique:
             query = query.filter(Produit.stock <= Produit.stock_alerte)
+        cle = (Produit.nom, Produit.id)
         if recherche:
-            pattern = f"%{recherche}%"
-            query = query.filter(
-                db.or_(
-                    Produit.code_produit.like(pattern),
-                    Produit.nom.like(pattern),
-                    Produit.type.like(pattern)
-                )
-            )
+            query = recherche_fts.filtrer(query, Produit, recherche)
+            # Résultats classés par pertinence, page après page
+            cle = recherche_fts.cle_tri(Produit, recherche) or cle
         if categorie_id:
-            query = query.filter_by(categorie_id=int(categorie_id))
+            query = query.filter(Produit.categorie_id == int(categorie_id))
         if fournisseur_id:
-            query = query.filter_by(fournisseur_id=int(fournisseur_id))
+            query = query.filter(Produit.fournisseur_id == int(fournisseur_id))
 
-        pagination = query.order_by(Produit.nom).paginate(page=page, per_page=per_page)
-        produits = pagination.items
-        for p in produits:
-            print(">>>", p.nom, p.stock, p.stock_alerte, "CRITIQUE:", p.stock_critique)
+        page = pagination.paginer(query, cle, curseur, limite, total=total)
 
-        return jsonify({
-            'success': True,
-            'total': pagination.total,
-            'pages': pagination.pages,
-            'page': page,
-            'per_page': per_page,
-            'data': [{
-                'id': p.id,
-                'code_produit': p.code_produit,
-                'nom': p.nom,
-                'type': p.type,
-                'prix_achat': p.prix_achat,
-                'prix_vente': p.prix_vente,
-                'stock': p.stock,
-                'stock_alerte': p.stock_alerte,
-                'unite': p.unite,
-                'actif': p.actif,
-                'categorie': p.categorie.nom if p.categorie else None,
-                'fournisseur': p.fournisseur.nom if p.fournisseur else None,
-                'marge': p.marge,
-                'marge_pourcentage': p.marge_pourcentage,
-                'stock_critique': p.stock_critique
-            } for p in produits]
-        })
+        return json_rapide.reponse_liste(champs, page.elements, **page.meta())
+    except (pagination.CurseurInvalide, serialiseurs.ChampsInconnus) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -135,9 +112,7 @@ def create_produit():
             if Produit.query.filter_by(code_produit=data['code_produit']).first():
                 return jsonify({'success': False, 'error': 'Code produit déjà utilisé'}), 400
         else:
-            dernier = Produit.query.order_by(Produit.id.desc()).first()
-            prochain_num = (dernier.id + 1) if dernier else 1
-            data['code_produit'] = f'PRD{prochain_num:05d}'
+            data['code_produit'] = numerotation.numero_produit()
 
         # Vérif NOM + TYPE — empêcher doublons
         if Produit.query.filter_by(nom=data['nom'], type=data.get('type')).first():
@@ -157,6 +132,9 @@ def create_produit():
         )
 
         db.session.add(produit)
+        db.session.flush()
+        alertes.produit_modifie(produit, critique_avant=False)
+        tableau_bord.invalider()
         db.session.commit()
 
         return jsonify({'success': True, 'message': 'Produit créé avec succès'})
@@ -188,6 +166,7 @@ def update_produit(id):
     try:
         produit = Produit.query.get_or_404(id)
         data = request.get_json()
+        critique_avant = alertes.etat_produit(produit)
 
         # Mise à jour numériques
         try:
@@ -214,6 +193,8 @@ def update_produit(id):
             if champ in data:
                 setattr(produit, champ, data[champ])
 
+        alertes.produit_modifie(produit, critique_avant)
+        tableau_bord.invalider()
         db.session.commit()
 
         return jsonify({
@@ -240,7 +221,10 @@ def delete_produit(id):
     
     try:
         produit = Produit.query.get_or_404(id)
+        critique_avant = alertes.etat_produit(produit)
         produit.actif = False
+        alertes.produit_modifie(produit, critique_avant)
+        tableau_bord.invalider()
         db.session.commit()
         
         return jsonify({
@@ -253,6 +237,7 @@ def delete_produit(id):
 
 @produits_bp.route('/categories', methods=['GET'])
 @login_required
+@avec_etag(Categorie)
 def get_categories():
     """Récupérer toutes les catégories"""
     try:
@@ -301,6 +286,7 @@ def create_categorie():
 
 @produits_bp.route('/fournisseurs', methods=['GET'])
 @login_required
+@avec_etag(Fournisseur)
 def get_fournisseurs():
     """Récupérer tous les fournisseurs"""
     try:
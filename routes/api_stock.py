@@ -2,6 +2,8 @@ from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
 from models import db, Produit, StockLog
 from datetime import datetime
+from routes import serialiseurs
+from core import stock, valorisation, alertes, pagination, lecture, json_rapide
 
 stock_bp = Blueprint('stock', __name__)
 
@@ -27,20 +29,19 @@ def generate_reference(prefix='STK'):
 def get_mouvements_stock():
     """Récupérer l'historique des mouvements de stock avec pagination et filtrage"""
     try:
-        query = StockLog.query
-
         produit_id = parse_int(request.args.get('produit_id'))
         type_mouvement = request.args.get('type_mouvement', '')
         utilisateur = request.args.get('utilisateur', '')
         date_debut = parse_date(request.args.get('date_debut'))
         date_fin = parse_date(request.args.get('date_fin'))
-        page = parse_int(request.args.get('page'), 1)
-        per_page = parse_int(request.args.get('per_page'), 50)
+        curseur, limite, total = pagination.parametres(request.args, limite_defaut=50)
+        champs = serialiseurs.mouvement_stock.selection(request.args.get('fields'))
+        query = serialiseurs.mouvement_stock.requete(champs)
 
         if produit_id:
-            query = query.filter_by(produit_id=produit_id)
+            query = query.filter(StockLog.produit_id == produit_id)
         if type_mouvement:
-            query = query.filter_by(type_mouvement=type_mouvement)
+            query = query.filter(StockLog.type_mouvement == type_mouvement)
         if utilisateur:
             query = query.filter(StockLog.utilisateur.like(f'%{utilisateur}%'))
         if date_debut:
@@ -48,28 +49,14 @@ def get_mouvements_stock():
         if date_fin:
             query = query.filter(StockLog.date <= date_fin)
 
-        pagination = query.order_by(StockLog.date.desc()).paginate(page=page, per_page=per_page)
-        mouvements = pagination.items
+        page = pagination.paginer(
+            query, (StockLog.date, StockLog.id),
+            curseur, limite, descendant=True, total=total
+        )
 
-        return jsonify({
-            'success': True,
-            'page': page,
-            'per_page': per_page,
-            'total': pagination.total,
-            'data': [{
-                'id': m.id,
-                'produit': m.produit.nom,
-                'produit_id': m.produit_id,
-                'type_mouvement': m.type_mouvement,
-                'quantite': m.quantite,
-                'stock_avant': m.stock_avant,
-                'stock_apres': m.stock_apres,
-                'date': m.date.isoformat(),
-                'utilisateur': m.utilisateur,
-                'commentaire': m.commentaire,
-                'reference': m.reference
-            } for m in mouvements]
-        })
+        return json_rapide.reponse_liste(champs, page.elements, **page.meta())
+    except (pagination.CurseurInvalide, serialiseurs.ChampsInconnus) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -91,27 +78,18 @@ def entree_stock():
             return jsonify({'success': False, 'error': 'Quantité doit être positive'}), 400
 
         produit = Produit.query.get_or_404(produit_id)
-        stock_avant = produit.stock
-        produit.stock += quantite  # stock_critique est calculé automatiquement
-
-        stock_log = StockLog(
-            produit_id=produit.id,
-            type_mouvement='entree',
-            quantite=quantite,
-            stock_avant=stock_avant,
-            stock_apres=produit.stock,
+        stock_avant, stock_apres = stock.entree(
+            produit.id, quantite,
             utilisateur=current_user.username,
             commentaire=data.get('commentaire', 'Réception de marchandise'),
             reference=data.get('reference', generate_reference('ENT'))
         )
-
-        db.session.add(stock_log)
         db.session.commit()
 
         return jsonify({
             'success': True,
             'message': f'Entrée de stock enregistrée: +{quantite} {produit.unite}',
-            'data': {'produit': produit.nom, 'stock_avant': stock_avant, 'stock_apres': produit.stock}
+            'data': {'produit': produit.nom, 'stock_avant': stock_avant, 'stock_apres': stock_apres}
         }), 201
     except Exception as e:
         db.session.rollback()
@@ -136,31 +114,22 @@ def sortie_stock():
             return jsonify({'success': False, 'error': 'Quantité doit être positive'}), 400
 
         produit = Produit.query.get_or_404(produit_id)
-        if produit.stock < quantite:
-            return jsonify({'success': False, 'error': f'Stock insuffisant (disponible: {produit.stock})'}), 400
-
-        stock_avant = produit.stock
-        produit.stock -= quantite  # stock_critique est calculé automatiquement
-
-        stock_log = StockLog(
-            produit_id=produit.id,
-            type_mouvement='sortie',
-            quantite=quantite,
-            stock_avant=stock_avant,
-            stock_apres=produit.stock,
+        stock_avant, stock_apres = stock.sortie(
+            produit.id, quantite,
             utilisateur=current_user.username,
             commentaire=data.get('commentaire', 'Sortie de stock'),
             reference=data.get('reference', generate_reference('SRT'))
         )
-
-        db.session.add(stock_log)
         db.session.commit()
 
         return jsonify({
             'success': True,
             'message': f'Sortie de stock enregistrée: -{quantite} {produit.unite}',
-            'data': {'produit': produit.nom, 'stock_avant': stock_avant, 'stock_apres': produit.stock}
+            'data': {'produit': produit.nom, 'stock_avant': stock_avant, 'stock_apres': stock_apres}
         }), 201
+    except stock.StockInsuffisant as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -184,29 +153,23 @@ def ajustement_stock():
             return jsonify({'success': False, 'error': 'Le stock ne peut pas être négatif'}), 400
 
         produit = Produit.query.get_or_404(produit_id)
-        stock_avant = produit.stock
-        difference = nouveau_stock - stock_avant
-        produit.stock = nouveau_stock  # stock_critique est calculé automatiquement
-
-        stock_log = StockLog(
-            produit_id=produit.id,
-            type_mouvement='ajustement',
-            quantite=abs(difference),
-            stock_avant=stock_avant,
-            stock_apres=produit.stock,
+        stock_avant, stock_apres = stock.ajuster(
+            produit.id, nouveau_stock,
             utilisateur=current_user.username,
-            commentaire=data.get('commentaire', f'Ajustement de stock: {difference:+d}'),
+            commentaire=data.get('commentaire'),
             reference=data.get('reference', generate_reference('ADJ'))
         )
-
-        db.session.add(stock_log)
+        difference = stock_apres - stock_avant
         db.session.commit()
 
         return jsonify({
             'success': True,
             'message': f'Stock ajusté: {difference:+d} {produit.unite}',
-            'data': {'produit': produit.nom, 'stock_avant': stock_avant, 'stock_apres': produit.stock, 'difference': difference}
+            'data': {'produit': produit.nom, 'stock_avant': stock_avant, 'stock_apres': stock_apres, 'difference': difference}
         }), 201
+    except stock.StockConcurrent as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 409
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -216,22 +179,35 @@ def ajustement_stock():
 @login_required
 def get_alertes_stock():
     try:
-        produits_alertes = Produit.query.filter(
-            Produit.actif == True
-        ).order_by(Produit.stock).all()
+        champs = serialiseurs.produit_alerte.selection(request.args.get('fields'))
+        # Index partiel ix_produit_stock_critique
+        produits_alertes = lecture.toutes(
+            serialiseurs.produit_alerte.requete(champs)
+            .filter(Produit.actif == True, Produit.stock <= Produit.stock_alerte)
+            .order_by(Produit.stock)
+        )
+
+        return json_rapide.reponse_liste(champs, produits_alertes, count=len(produits_alertes),
+                                         curseur=alertes.dernier_curseur())
+    except serialiseurs.ChampsInconnus as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@stock_bp.route('/stock/alertes/flux', methods=['GET'])
+@login_required
+def get_flux_alertes():
+    """Franchissements du seuil d'alerte depuis le curseur 'depuis'"""
+    try:
+        depuis = parse_int(request.args.get('depuis'), 0)
+        limite = min(max(parse_int(request.args.get('limite'), alertes.LIMITE_FLUX), 1), 500)
+        evenements, curseur, suite = alertes.flux(depuis, limite)
 
         return jsonify({
             'success': True,
-            'count': len(produits_alertes),
-            'data': [{
-                'id': p.id,
-                'code_produit': p.code_produit,
-                'nom': p.nom,
-                'stock': p.stock,
-                'stock_alerte': p.stock_alerte,
-                'unite': p.unite,
-                'fournisseur': p.fournisseur.nom if p.fournisseur else None
-            } for p in produits_alertes]
+            'curseur': curseur,
+            'suite': suite,
+            'data': evenements
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -240,20 +216,31 @@ def get_alertes_stock():
 @login_required
 def get_valeur_stock():
     try:
-        produits = Produit.query.filter_by(actif=True).all()
-        valeur_achat = sum(p.stock * p.prix_achat for p in produits)
-        valeur_vente = sum(p.stock * p.prix_vente for p in produits)
-        marge_potentielle = valeur_vente - valeur_achat
+        par = request.args.get('par', '')
+        if par and par not in valorisation.REPARTITIONS:
+            return jsonify({'success': False, 'error': "Répartition invalide (categorie ou fournisseur)"}), 400
+
+        data = valorisation.valeur_actuelle()
+        if par:
+            data['repartition'] = valorisation.repartition(par)
+
+        return jsonify({'success': True, 'data': data})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@stock_bp.route('/stock/valeur/historique', methods=['GET'])
+@login_required
+def get_historique_valeur_stock():
+    try:
+        date_debut = parse_date(request.args.get('date_debut'))
+        date_fin = parse_date(request.args.get('date_fin'))
 
         return jsonify({
             'success': True,
-            'data': {
-                'valeur_achat': valeur_achat,
-                'valeur_vente': valeur_vente,
-                'marge_potentielle': marge_potentielle,
-                'total_produits': len(produits),
-                'total_items': sum(p.stock for p in produits)
-            }
+            'data': valorisation.historique(
+                date_debut.date() if date_debut else None,
+                date_fin.date() if date_fin else None
+            )
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
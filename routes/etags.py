@@ -0,0 +1,33 @@
+# routes/etags.py
+"""GET conditionnels pour les listes de référence (catalogue, modes de paiement).
+
+L'ETag faible est calculé à partir des compteurs de core/versions.py (une
+requête sur la petite table version_table) : si If-None-Match correspond, la
+vue n'est pas exécutée et la réponse est un 304 vide. Cache-Control: no-cache fait revalider le
+navigateur à chaque fetch, qui réutilise alors sa copie sur 304.
+"""
+from functools import wraps
+from flask import request, make_response
+from core import versions
+
+
+def avec_etag(*modeles):
+    """Décorateur de vue GET dont la réponse ne dépend que de ces tables"""
+    versions.verifier(*modeles)
+
+    def decorateur(vue):
+        @wraps(vue)
+        def enveloppe(*args, **kwargs):
+            # Un ETag ne vaut que pour son URL : filtres et pagination sont déjà distingués
+            valeur = versions.etag(*modeles)
+            if request.if_none_match.contains_weak(valeur):
+                reponse = make_response('', 304)
+            else:
+                reponse = make_response(vue(*args, **kwargs))
+                if reponse.status_code != 200:
+                    return reponse
+            reponse.set_etag(valeur, weak=True)
+            reponse.headers['Cache-Control'] = 'private, no-cache'
+            return reponse
+        return enveloppe
+    return decorateur
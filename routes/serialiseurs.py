@@ -0,0 +1,262 @@
+# routes/serialiseurs.py
+"""Formes de sortie JSON des listes de l'API.
+
+Une forme est une liste de champs ; chaque champ déclare ce qu'il lit (des
+colonnes du modèle, ou un chemin de relations suivi des colonnes utiles au
+bout) et son expression SQL (la colonne, ou le paramètre sql= d'un champ
+calculé). requete() construit un select() des seuls champs demandés
+(paramètre ?fields=), avec une jointure externe par relation simple
+parcourue, pour une lecture sans ORM (core/lecture.py) dont les lignes sont
+encodées par core/json_rapide.py : c'est le chemin des listes de l'API. Les
+objets ORM déjà chargés (après une écriture, pour les événements) passent
+par __call__.
+"""
+from sqlalchemy import select, func, case, type_coerce, Boolean
+from sqlalchemy.orm import configure_mappers
+from sqlalchemy.orm.relationships import RelationshipProperty
+from models import (Abonne, Consommation, Facture, Paiement, Produit, StockLog, Categorie, Fournisseur,
+                    SoldeAbonne)
+
+# Les backrefs (Consommation.abonne...) n'existent qu'une fois les mappers configurés
+configure_mappers()
+
+
+class ChampsInconnus(ValueError):
+    pass
+
+
+class Champ:
+    """Valeur calculée sur l'objet et ce qu'elle lit.
+
+    dependances : colonnes du modèle, ou tuples (relation, ..., colonnes) ;
+    les relations simples parcourues sont jointes par requete().
+    sql : expression donnant la même valeur dans un select() (requete())."""
+
+    def __init__(self, valeur, *dependances, sql=None):
+        self.valeur = valeur
+        self.dependances = dependances
+        self.sql = sql
+
+
+def _relation(attribut):
+    return isinstance(attribut.property, RelationshipProperty)
+
+
+def _date(valeur):
+    return valeur.isoformat() if valeur else None
+
+
+class Forme:
+    """Forme de sortie d'un modèle"""
+
+    def __init__(self, nom, champs):
+        self.__name__ = nom
+        self.champs = {
+            cle: champ if isinstance(champ, Champ) else Champ(_lecture(champ.key), champ, sql=champ)
+            for cle, champ in champs.items()
+        }
+        # Modèle lu : celui des colonnes directes (l'identifiant en premier)
+        self.modele = next(d.class_ for c in self.champs.values() for d in c.dependances
+                           if not isinstance(d, tuple))
+
+    def selection(self, fields=None):
+        """Noms des champs demandés (?fields=a,b) ; tous si fields est vide"""
+        if not fields:
+            return tuple(self.champs)
+        demandes = tuple(dict.fromkeys(f.strip() for f in fields.split(',') if f.strip()))
+        inconnus = [f for f in demandes if f not in self.champs]
+        if inconnus:
+            raise ChampsInconnus(f"Champ(s) inconnu(s): {', '.join(inconnus)}")
+        return demandes or tuple(self.champs)
+
+    def requete(self, champs=None):
+        """select() des expressions SQL des champs, étiquetées par leur nom,
+        avec une jointure externe par relation simple parcourue (les
+        collections sont lues par des sous-requêtes dans l'expression)"""
+        champs = champs or tuple(self.champs)
+        colonnes, relations = [], {}
+        for cle in champs:
+            champ = self.champs[cle]
+            if champ.sql is None:
+                raise ValueError(f"Champ '{cle}' de la forme {self.__name__} sans expression SQL")
+            colonnes.append(champ.sql.label(cle))
+            for dependance in champ.dependances:
+                if isinstance(dependance, tuple):
+                    relations.update(dict.fromkeys(
+                        a for a in dependance if _relation(a) and not a.property.uselist
+                    ))
+        requete = select(*colonnes).select_from(self.modele)
+        for relation in relations:
+            requete = requete.outerjoin(relation)
+        return requete
+
+    def __call__(self, obj, champs=None):
+        return {cle: self.champs[cle].valeur(obj) for cle in (champs or self.champs)}
+
+
+def _lecture(attribut):
+    return lambda obj: getattr(obj, attribut)
+
+
+def _nom_complet(modele):
+    """Équivalent SQL de nom_complet : nom et prénom séparés par une espace"""
+    return func.trim(modele.nom + ' ' + func.coalesce(modele.prenom, ''))
+
+
+def _somme(colonne, *conditions):
+    """Sous-requête corrélée SUM(colonne), 0 sans ligne (comme sum() en Python)"""
+    return select(func.coalesce(func.sum(colonne), 0)).where(*conditions).scalar_subquery()
+
+
+# --- Abonnés ---
+abonne = Forme('abonne', {
+    'id': Abonne.id,
+    'numero_abonne': Abonne.numero_abonne,
+    'nom': Abonne.nom,
+    'prenom': Abonne.prenom,
+    'nom_complet': Champ(lambda a: a.nom_complet, Abonne.nom, Abonne.prenom, sql=_nom_complet(Abonne)),
+    'telephone': Abonne.telephone,
+    # Solde maintenu, recalculé seulement pour un abonné sans ligne de solde
+    'conso_totale': Champ(lambda a: a.conso_totale, (Abonne.solde,), sql=func.coalesce(
+        SoldeAbonne.conso_totale, _somme(Consommation.montant_total, Consommation.abonne_id == Abonne.id)
+    )),
+    'solde_du': Champ(lambda a: a.solde_du, (Abonne.solde,), sql=case(
+        (SoldeAbonne.abonne_id.isnot(None), SoldeAbonne.montant_du - SoldeAbonne.montant_paye),
+        else_=_somme(Facture.montant_ttc, Facture.abonne_id == Abonne.id, Facture.statut != 'payee')
+              - _somme(Paiement.montant, Paiement.facture_id == Facture.id, Facture.abonne_id == Abonne.id)
+    )),
+})
+
+
+# --- Consommations ---
+_abonne_nom = (Consommation.abonne, Abonne.nom, Abonne.prenom)
+
+consommation = Forme('consommation', {
+    'id': Consommation.id,
+    'abonne': Champ(lambda c: c.abonne.nom_complet, _abonne_nom, sql=_nom_complet(Abonne)),
+    'abonne_id': Consommation.abonne_id,
+    'produit': Champ(lambda c: c.produit.nom, (Consommation.produit, Produit.nom), sql=Produit.nom),
+    'produit_id': Consommation.produit_id,
+    'quantite': Consommation.quantite,
+    'prix_unitaire': Consommation.prix_unitaire,
+    'montant_total': Consommation.montant_total,
+    'date': Champ(lambda c: c.date.isoformat(), Consommation.date, sql=Consommation.date),
+    'facture_id': Consommation.facture_id,
+    'facture_numero': Champ(lambda c: c.facture.numero_facture if c.facture else None,
+                            (Consommation.facture, Facture.numero_facture), sql=Facture.numero_facture),
+    'note': Consommation.note,
+})
+
+
+# Ligne de l'historique d'un abonné
+consommation_abonne = Forme('consommation_abonne', {
+    'id': Consommation.id,
+    'date': Champ(lambda c: _date(c.date), Consommation.date, sql=Consommation.date),
+    'produit': Champ(lambda c: c.produit.nom, (Consommation.produit, Produit.nom), sql=Produit.nom),
+    'quantite': Consommation.quantite,
+    'prix_unitaire': Consommation.prix_unitaire,
+    'montant_total': Consommation.montant_total,
+    'facture_id': Consommation.facture_id,
+})
+
+
+consommation_non_facturee = Forme('consommation_non_facturee', {
+    'id': Consommation.id,
+    'date': Champ(lambda c: c.date.isoformat(), Consommation.date, sql=Consommation.date),
+    'produit': Champ(lambda c: c.produit.nom, (Consommation.produit, Produit.nom), sql=Produit.nom),
+    'quantite': Consommation.quantite,
+    'prix_unitaire': Consommation.prix_unitaire,
+    'montant_total': Consommation.montant_total,
+})
+
+
+# --- Factures ---
+_paiements = (Facture.paiements, Paiement.montant)
+_montant_paye = _somme(Paiement.montant, Paiement.facture_id == Facture.id)
+
+facture = Forme('facture', {
+    'id': Facture.id,
+    'numero_facture': Facture.numero_facture,
+    'abonne': Champ(lambda f: f.abonne.nom_complet, (Facture.abonne, Abonne.nom, Abonne.prenom),
+                    sql=_nom_complet(Abonne)),
+    'abonne_id': Facture.abonne_id,
+    'montant_ht': Facture.montant_ht,
+    'montant_tva': Facture.montant_tva,
+    'montant_ttc': Facture.montant_ttc,
+    'statut': Facture.statut,
+    'date_emission': Champ(lambda f: f.date_emission.isoformat(), Facture.date_emission, sql=Facture.date_emission),
+    'date_echeance': Champ(lambda f: _date(f.date_echeance), Facture.date_echeance, sql=Facture.date_echeance),
+    'montant_paye': Champ(lambda f: f.montant_paye, _paiements, sql=_montant_paye),
+    'reste_a_payer': Champ(lambda f: f.reste_a_payer, Facture.montant_ttc, _paiements,
+                           sql=Facture.montant_ttc - _montant_paye),
+})
+
+
+# --- Paiements ---
+paiement = Forme('paiement', {
+    'id': Paiement.id,
+    'facture_numero': Champ(lambda p: p.facture.numero_facture, (Paiement.facture, Facture.numero_facture),
+                            sql=Facture.numero_facture),
+    'facture_id': Paiement.facture_id,
+    'abonne': Champ(lambda p: p.facture.abonne.nom_complet,
+                    (Paiement.facture, Facture.abonne, Abonne.nom, Abonne.prenom), sql=_nom_complet(Abonne)),
+    'montant': Paiement.montant,
+    'mode_paiement': Paiement.mode_paiement,
+    'reference': Paiement.reference,
+    'date_paiement': Champ(lambda p: p.date_paiement.isoformat(), Paiement.date_paiement, sql=Paiement.date_paiement),
+    'recu_par': Paiement.recu_par,
+    'note': Paiement.note,
+})
+
+
+# --- Produits et stock ---
+produit = Forme('produit', {
+    'id': Produit.id,
+    'code_produit': Produit.code_produit,
+    'nom': Produit.nom,
+    'type': Produit.type,
+    'prix_achat': Produit.prix_achat,
+    'prix_vente': Produit.prix_vente,
+    'stock': Produit.stock,
+    'stock_alerte': Produit.stock_alerte,
+    'unite': Produit.unite,
+    'actif': Produit.actif,
+    'categorie': Champ(lambda p: p.categorie.nom if p.categorie else None, (Produit.categorie, Categorie.nom),
+                       sql=Categorie.nom),
+    'fournisseur': Champ(lambda p: p.fournisseur.nom if p.fournisseur else None,
+                         (Produit.fournisseur, Fournisseur.nom), sql=Fournisseur.nom),
+    'marge': Champ(lambda p: p.marge, Produit.prix_achat, Produit.prix_vente,
+                   sql=Produit.prix_vente - Produit.prix_achat),
+    'marge_pourcentage': Champ(lambda p: p.marge_pourcentage, Produit.prix_achat, Produit.prix_vente, sql=case(
+        (Produit.prix_achat > 0, (Produit.prix_vente - Produit.prix_achat) / Produit.prix_achat * 100), else_=0
+    )),
+    'stock_critique': Champ(lambda p: p.stock_critique, Produit.stock, Produit.stock_alerte,
+                            sql=type_coerce(Produit.stock <= Produit.stock_alerte, Boolean)),
+})
+
+
+produit_alerte = Forme('produit_alerte', {
+    'id': Produit.id,
+    'code_produit': Produit.code_produit,
+    'nom': Produit.nom,
+    'stock': Produit.stock,
+    'stock_alerte': Produit.stock_alerte,
+    'unite': Produit.unite,
+    'fournisseur': Champ(lambda p: p.fournisseur.nom if p.fournisseur else None,
+                         (Produit.fournisseur, Fournisseur.nom), sql=Fournisseur.nom),
+})
+
+
+mouvement_stock = Forme('mouvement_stock', {
+    'id': StockLog.id,
+    'produit': Champ(lambda m: m.produit.nom, (StockLog.produit, Produit.nom), sql=Produit.nom),
+    'produit_id': StockLog.produit_id,
+    'type_mouvement': StockLog.type_mouvement,
+    'quantite': StockLog.quantite,
+    'stock_avant': StockLog.stock_avant,
+    'stock_apres': StockLog.stock_apres,
+    'date': Champ(lambda m: m.date.isoformat(), StockLog.date, sql=StockLog.date),
+    'utilisateur': StockLog.utilisateur,
+    'commentaire': StockLog.commentaire,
+    'reference': StockLog.reference,
+})
@@ -4,8 +4,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
 async function chargerAbonnes(recherche = '') {
     try {
-        const response = await fetch(`/api/abonnes?recherche=${recherche}`);
-        const data = await response.json();
+        const data = await toutesLesPages(`/api/abonnes?recherche=${recherche}`);
 
         if (data.success) afficherAbonnes(data.data);
         else alert('Erreur: ' + data.error);
@@ -11,12 +11,23 @@ document.addEventListener('DOMContentLoaded', () => {
     document.getElementById('prix').addEventListener('input', calculerTotal);
     document.getElementById('produit').addEventListener('change', updatePrix);
     document.getElementById('searchAbonne').addEventListener('input', chargerConsommations);
+
+    // Ventes des autres caisses et stocks en direct
+    ecouterEvenements(['consommations', 'stock'], {
+        consommations: {
+            creee: ajouterLigneConsommation,
+            modifiee: ajouterLigneConsommation,
+            supprimee: c => retirerLigneConsommation(c.id),
+            facturation: chargerConsommations
+        },
+        stock: { mouvement: majStockProduit },
+        reset: () => { chargerProduits(); chargerConsommations(); }
+    });
 });
 
 async function chargerAbonnes() {
     try {
-        const res = await fetch('/api/abonnes');
-        const data = await res.json();
+        const data = await toutesLesPages('/api/abonnes?fields=id,numero_abonne,nom_complet');
         if (data.success) {
             const select = document.getElementById('abonne');
             select.innerHTML = '<option value="">Sélectionner un abonné</option>';
@@ -37,8 +48,7 @@ async function chargerAbonnes() {
 
 async function chargerProduits() {
     try {
-        const res = await fetch('/api/produits');
-        const data = await res.json();
+        const data = await toutesLesPages('/api/produits?fields=id,nom,prix_vente,stock');
         if (!data.success) return;
         produits = data.data;
         const select = document.getElementById('produit');
@@ -48,12 +58,27 @@ async function chargerProduits() {
             opt.value = p.id;
             opt.dataset.prix = p.prix_vente;
             opt.dataset.stock = p.stock;
-            opt.textContent = `${p.nom} (Stock: ${p.stock} - ${p.prix_vente} FCFA)`;
+            opt.textContent = libelleProduit(p);
             select.appendChild(opt);
         });
     } catch (e) { console.error(e); }
 }
 
+function libelleProduit(p) {
+    return `${p.nom} (Stock: ${p.stock} - ${p.prix_vente} FCFA)`;
+}
+
+function majStockProduit(m) {
+    const p = produits.find(p => p.id === m.produit_id);
+    if (!p) return;
+    p.stock = m.stock_apres;
+    const opt = document.querySelector(`#produit option[value="${p.id}"]`);
+    if (opt) {
+        opt.dataset.stock = p.stock;
+        opt.textContent = libelleProduit(p);
+    }
+}
+
 function updatePrix() {
     const select = document.getElementById('produit');
     const selected = select.options[select.selectedIndex];
@@ -91,8 +116,6 @@ async function enregistrerVente(event) {
         if (result.success) {
             alert('✅ Vente enregistrée avec succès!');
             resetForm();
-            chargerConsommations();
-            chargerProduits();
         } else alert('❌ Erreur: ' + result.error);
     } catch (e) {
         console.error(e);
@@ -115,26 +138,46 @@ async function chargerConsommations() {
             filtered = data.data.filter(c => c.abonne.toLowerCase().includes(searchValue));
         }
 
-        filtered.forEach(c => {
-            const tr = document.createElement('tr');
-            const date = new Date(c.date);
-            tr.innerHTML = `
-                <td>${date.toLocaleString('fr-FR')}</td>
-                <td>${c.abonne}</td>
-                <td>${c.produit}</td>
-                <td>${c.quantite}</td>
-                <td>${c.prix_unitaire.toLocaleString()} FCFA</td>
-                <td><strong>${c.montant_total.toLocaleString()} FCFA</strong></td>
-                <td>${c.facture_id ? '✅ Facturée' : '⏳ En attente'}</td>
-                <td>
-                    ${!c.facture_id ? `<button class="btn btn-sm btn-danger" onclick="supprimerConsommation(${c.id})">🗑️</button>` : ''}
-                </td>
-            `;
-            tbody.appendChild(tr);
-        });
+        filtered.forEach(c => tbody.appendChild(ligneConsommation(c)));
     } catch (e) { console.error(e); }
 }
 
+function ligneConsommation(c) {
+    const tr = document.createElement('tr');
+    tr.dataset.id = c.id;
+    const date = new Date(c.date);
+    tr.innerHTML = `
+        <td>${date.toLocaleString('fr-FR')}</td>
+        <td>${c.abonne}</td>
+        <td>${c.produit}</td>
+        <td>${c.quantite}</td>
+        <td>${c.prix_unitaire.toLocaleString()} FCFA</td>
+        <td><strong>${c.montant_total.toLocaleString()} FCFA</strong></td>
+        <td>${c.facture_id ? '✅ Facturée' : '⏳ En attente'}</td>
+        <td>
+            ${!c.facture_id ? `<button class="btn btn-sm btn-danger" onclick="supprimerConsommation(${c.id})">🗑️</button>` : ''}
+        </td>
+    `;
+    return tr;
+}
+
+function ajouterLigneConsommation(c) {
+    const tbody = document.getElementById('consommationsTable');
+    const existante = tbody.querySelector(`tr[data-id="${c.id}"]`);
+    const searchValue = document.getElementById('searchAbonne').value.toLowerCase();
+    if (c.facture_id || (searchValue && !c.abonne.toLowerCase().includes(searchValue))) {
+        if (existante) existante.remove();
+        return;
+    }
+    if (existante) existante.replaceWith(ligneConsommation(c));
+    else tbody.prepend(ligneConsommation(c));
+}
+
+function retirerLigneConsommation(id) {
+    const tr = document.querySelector(`#consommationsTable tr[data-id="${id}"]`);
+    if (tr) tr.remove();
+}
+
 async function supprimerConsommation(id) {
     if (!confirm('Voulez-vous vraiment supprimer cette consommation ?')) return;
     try {
@@ -142,8 +185,6 @@ async function supprimerConsommation(id) {
         const result = await res.json();
         if (result.success) {
             alert('Consommation supprimée');
-            chargerConsommations();
-            chargerProduits();
         } else alert('Erreur: ' + result.error);
     } catch (e) { console.error(e); }
 }
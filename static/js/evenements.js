@@ -0,0 +1,25 @@
+// Flux d'événements du serveur (/api/events)
+//
+// ecouterEvenements(['stock'], {
+//     stock: { mouvement: data => ..., alerte: data => ... },
+//     reset: () => ...   // événements perdus : tout recharger
+// });
+//
+// EventSource se reconnecte seul et renvoie Last-Event-ID : le serveur rejoue
+// les événements manqués, ou envoie 'reset' s'ils ne sont plus disponibles.
+function ecouterEvenements(sujets, gestionnaires) {
+    if (!window.EventSource) return null;
+    const source = new EventSource('/api/events?sujets=' + sujets.join(','));
+
+    sujets.forEach(sujet => {
+        source.addEventListener(sujet, e => {
+            const message = JSON.parse(e.data);
+            const gestionnaire = (gestionnaires[sujet] || {})[message.type];
+            if (gestionnaire) gestionnaire(message.data);
+        });
+    });
+    source.addEventListener('reset', () => {
+        if (gestionnaires.reset) gestionnaires.reset();
+    });
+    return source;
+}
@@ -8,8 +8,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
 async function chargerAbonnes() {
     try {
-        const res = await fetch('/api/abonnes');
-        const data = await res.json();
+        const data = await toutesLesPages('/api/abonnes?fields=id,numero_abonne,nom_complet');
         if(data.success) {
             const select = document.getElementById('abonneFacture');
             data.data.forEach(a => {
@@ -25,8 +24,7 @@ async function chargerAbonnes() {
 async function chargerFactures() {
     try {
         const statut = document.getElementById('filtreStatut').value;
-        const res = await fetch(`/api/factures?statut=${statut}`);
-        const data = await res.json();
+        const data = await toutesLesPages(`/api/factures?statut=${statut}`);
         if(data.success){
             window.facturesImpayees = data.data; // ⚡ mettre à jour la variable globale
             afficherFactures();                 // pas besoin de passer de paramètre
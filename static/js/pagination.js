@@ -0,0 +1,19 @@
+// Listes paginées par curseur (next_cursor)
+//
+// Les listes de l'API renvoient une page à la fois ; toutesLesPages suit
+// next_cursor jusqu'au bout pour les sélecteurs et tableaux complets.
+async function toutesLesPages(url, limite = 1000) {
+    const separateur = url.includes('?') ? '&' : '?';
+    let elements = [];
+    let curseur = null;
+    do {
+        let page = `${url}${separateur}limite=${limite}`;
+        if (curseur) page += `&curseur=${encodeURIComponent(curseur)}`;
+        const res = await fetch(page);
+        const data = await res.json();
+        if (!data.success) return data;
+        elements = elements.concat(data.data);
+        curseur = data.next_cursor;
+    } while (curseur);
+    return { success: true, data: elements };
+}
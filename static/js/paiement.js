@@ -8,8 +8,7 @@ document.addEventListener('DOMContentLoaded', () => {
 // --- Charger toutes les factures depuis l'API ---
 async function chargerFactures() {
     try {
-        const response = await fetch('/api/factures');
-        const data = await response.json();
+        const data = await toutesLesPages('/api/factures');
         if (data.success) {
             window.facturesImpayees = data.data;
             afficherFactures();
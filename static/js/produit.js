@@ -10,8 +10,7 @@ async function chargerProduits() {
         let url = `/api/produits?recherche=${recherche}`;
         if (filtreStockCritique) url += '&stock_critique=true';
 
-        const response = await fetch(url);
-        const data = await response.json();
+        const data = await toutesLesPages(url);
 
         if (data.success) {
             afficherProduits(data.data);
@@ -1,15 +1,22 @@
 let produits = [];
+let curseurAlertes = 0; // dernier événement du flux d'alertes déjà pris en compte
 
 document.addEventListener('DOMContentLoaded', () => {
     chargerProduits();
     chargerAlertes();
     chargerMouvements();
+
+    // Mouvements de toutes les caisses en direct ; sinon, sondage du flux d'alertes
+    const source = ecouterEvenements(['stock'], {
+        stock: { mouvement: appliquerMouvement, alerte: chargerAlertes },
+        reset: () => { chargerProduits(); chargerAlertes(); chargerMouvements(); }
+    });
+    if (!source) setInterval(verifierFluxAlertes, 30000);
 });
 
 async function chargerProduits() {
     try {
-        const response = await fetch('/api/produits');
-        const data = await response.json();
+        const data = await toutesLesPages('/api/produits?fields=id,nom,stock,unite');
         
         if (data.success) {
             produits = data.data;
@@ -21,7 +28,7 @@ async function chargerProduits() {
                     const option = document.createElement('option');
                     option.value = p.id;
                     option.dataset.stock = p.stock;
-                    option.textContent = `${p.nom} (Stock: ${p.stock})`;
+                    option.textContent = libelleProduit(p);
                     select.appendChild(option);
                 });
             });
@@ -32,18 +39,44 @@ async function chargerProduits() {
 }
 
 
+function libelleProduit(p) {
+    return `${p.nom} (Stock: ${p.stock})`;
+}
+
+function appliquerMouvement(m) {
+    const p = produits.find(p => p.id === m.produit_id);
+    if (!p) return;
+    p.stock = m.stock_apres;
+    ['produitEntree', 'produitSortie', 'produitAjust'].forEach(selectId => {
+        const option = document.querySelector(`#${selectId} option[value="${p.id}"]`);
+        if (option) {
+            option.dataset.stock = p.stock;
+            option.textContent = libelleProduit(p);
+        }
+    });
+    afficherStockActuel();
+
+    const cellule = document.querySelector(`#alertesTable tr[data-id="${p.id}"] .stock-actuel`);
+    if (cellule) cellule.innerHTML = `<strong>${p.stock} ${p.unite}</strong>`;
+
+    const tbody = document.getElementById('mouvementsTable');
+    tbody.prepend(ligneMouvement({ ...m, produit: p.nom }));
+    while (tbody.rows.length > 20) tbody.deleteRow(-1);
+}
+
 async function chargerAlertes() {
     try {
         const response = await fetch('/api/stock/alertes');
         const data = await response.json();
 
         if (data.success) {
+            curseurAlertes = data.curseur;
 
             const tbody = document.getElementById('alertesTable');
             tbody.innerHTML = '';
 
-            // ⚠️ AJOUT DU FILTRE ICI
-            const alertes = data.data.filter(p => p.stock <= p.stock_alerte);
+            // Le serveur ne renvoie que les produits en stock critique
+            const alertes = data.data;
 
             if (alertes.length === 0) {
                 tbody.innerHTML = '<tr><td colspan="4" style="text-align:center;">✅ Aucun stock critique</td></tr>';
@@ -53,10 +86,11 @@ async function chargerAlertes() {
             alertes.forEach(p => {
                 const tr = document.createElement('tr');
                 tr.className = 'row-alert';
+                tr.dataset.id = p.id;
 
                 tr.innerHTML = `
                     <td>${p.nom}</td>
-                    <td><strong>${p.stock} ${p.unite}</strong></td>
+                    <td class="stock-actuel"><strong>${p.stock} ${p.unite}</strong></td>
                     <td>${p.stock_alerte} ${p.unite}</td>
                     <td>
                         <button class="btn btn-sm btn-success" onclick="reapprovisionnerRapide(${p.id})">📥 Réappro</button>
@@ -70,37 +104,54 @@ async function chargerAlertes() {
     }
 }
 
+// --- Flux d'alertes : ne recharge la liste que si un seuil a été franchi ---
+async function verifierFluxAlertes() {
+    try {
+        const response = await fetch(`/api/stock/alertes/flux?depuis=${curseurAlertes}`);
+        const data = await response.json();
+
+        if (data.success && data.data.length > 0) {
+            curseurAlertes = data.curseur;
+            chargerAlertes();
+        }
+    } catch (error) {
+        console.error('Erreur:', error);
+    }
+}
+
 async function chargerMouvements() {
     try {
-        const response = await fetch('/api/stock/mouvements');
+        const response = await fetch('/api/stock/mouvements?limite=20');
         const data = await response.json();
         
         if (data.success) {
             const tbody = document.getElementById('mouvementsTable');
             tbody.innerHTML = '';
             
-            data.data.slice(0, 20).forEach(m => {
-                const tr = document.createElement('tr');
-                const date = new Date(m.date);
-                const typeClass = m.type_mouvement === 'entree' ? 'success' : 'warning';
-                tr.innerHTML = `
-                    <td>${date.toLocaleString('fr-FR')}</td>
-                    <td>${m.produit}</td>
-                    <td><span class="badge badge-${typeClass}">${m.type_mouvement}</span></td>
-                    <td>${m.quantite}</td>
-                    <td>${m.stock_avant}</td>
-                    <td><strong>${m.stock_apres}</strong></td>
-                    <td>${m.utilisateur}</td>
-                    <td>${m.commentaire}</td>
-                `;
-                tbody.appendChild(tr);
-            });
+            data.data.slice(0, 20).forEach(m => tbody.appendChild(ligneMouvement(m)));
         }
     } catch (error) {
         console.error('Erreur:', error);
     }
 }
 
+function ligneMouvement(m) {
+    const tr = document.createElement('tr');
+    const date = new Date(m.date);
+    const typeClass = m.type_mouvement === 'entree' ? 'success' : 'warning';
+    tr.innerHTML = `
+        <td>${date.toLocaleString('fr-FR')}</td>
+        <td>${m.produit}</td>
+        <td><span class="badge badge-${typeClass}">${m.type_mouvement}</span></td>
+        <td>${m.quantite}</td>
+        <td>${m.stock_avant}</td>
+        <td><strong>${m.stock_apres}</strong></td>
+        <td>${m.utilisateur}</td>
+        <td>${m.commentaire}</td>
+    `;
+    return tr;
+}
+
 async function enregistrerEntree(event) {
     event.preventDefault();
     
@@ -124,9 +175,6 @@ async function enregistrerEntree(event) {
             alert('✅ ' + result.message);
             closeModal('entreeModal');
             document.getElementById('entreeForm').reset();
-            chargerProduits();
-            chargerAlertes();
-            chargerMouvements();
         } else {
             alert('❌ Erreur: ' + result.error);
         }
@@ -157,9 +205,6 @@ async function enregistrerSortie(event) {
             alert('✅ ' + result.message);
             closeModal('sortieModal');
             document.getElementById('sortieForm').reset();
-            chargerProduits();
-            chargerAlertes();
-            chargerMouvements();
         } else {
             alert('❌ Erreur: ' + result.error);
         }
@@ -190,9 +235,6 @@ async function enregistrerAjustement(event) {
             alert('✅ ' + result.message);
             closeModal('ajustementModal');
             document.getElementById('ajustementForm').reset();
-            chargerProduits();
-            chargerAlertes();
-            chargerMouvements();
         } else {
             alert('❌ Erreur: ' + result.error);
         }